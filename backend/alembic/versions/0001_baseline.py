@@ -0,0 +1,204 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+Databases created by the old Base.metadata.create_all at startup already have some or all of
+these tables, and create_all never added columns to existing tables. The baseline therefore
+only creates what is missing, so it can be applied to both fresh and existing databases.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _create_table_if_missing(existing_tables, name, *columns, indexes=()):
+    if name in existing_tables:
+        return
+    op.create_table(name, *columns)
+    # Integer ids are declared with index=True on the models
+    if any(c.name == "id" and isinstance(c.type, sa.Integer) for c in columns):
+        op.create_index(f"ix_{name}_id", name, ["id"])
+    for index_name, index_columns, unique in indexes:
+        op.create_index(index_name, name, index_columns, unique=unique)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    existing_tables = set(inspector.get_table_names())
+
+    _create_table_if_missing(
+        existing_tables, "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(255), nullable=False, unique=True),
+        sa.Column("username", sa.String(100), nullable=False, unique=True),
+        sa.Column("first_name", sa.String(100), nullable=False),
+        sa.Column("mid_init", sa.String(1), nullable=True),
+        sa.Column("last_name", sa.String(100), nullable=False),
+        sa.Column("phone_number", sa.String(20), nullable=False),
+        sa.Column("active_status", sa.Boolean(), nullable=False),
+        sa.Column("hashed_password", sa.String(255), nullable=False),
+    )
+    _create_table_if_missing(
+        existing_tables, "courses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("title", sa.String(255), nullable=False, unique=True),
+        sa.Column("description", sa.String(1000), nullable=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+    )
+    _create_table_if_missing(
+        existing_tables, "chapters",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("chapter_title", sa.String(255), nullable=False),
+        sa.Column("chapter_description", sa.String(1000), nullable=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+    )
+    _create_table_if_missing(
+        existing_tables, "blobs",
+        sa.Column("content_hash", sa.String(64), primary_key=True),
+        sa.Column("storage_key", sa.String(500), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    _create_table_if_missing(
+        existing_tables, "chapter_files",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("file_name", sa.String(255), nullable=False),
+        sa.Column("file_path", sa.String(500), nullable=False),
+        sa.Column("file_type", sa.String(50), nullable=False),
+        sa.Column("mime_type", sa.String(100), nullable=False),
+        sa.Column("file_size", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(64), sa.ForeignKey("blobs.content_hash"), nullable=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), nullable=False),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("uploaded_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        indexes=[("ix_chapter_files_content_hash", ["content_hash"], False)],
+    )
+    if "chapter_files" in existing_tables:
+        # Added with content-addressed storage; create_all could not add it to the existing table
+        columns = {c["name"] for c in inspector.get_columns("chapter_files")}
+        if "content_hash" not in columns:
+            op.add_column("chapter_files", sa.Column("content_hash", sa.String(64), nullable=True))
+            op.create_foreign_key("fk_chapter_files_content_hash", "chapter_files", "blobs", ["content_hash"], ["content_hash"])
+            op.create_index("ix_chapter_files_content_hash", "chapter_files", ["content_hash"])
+    _create_table_if_missing(
+        existing_tables, "learning_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), nullable=False),
+        sa.Column("activity_type", sa.String(50), nullable=False),
+        sa.Column("session_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("session_end", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("duration_seconds", sa.Integer(), nullable=False),
+        sa.Column("is_valid", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    _create_table_if_missing(
+        existing_tables, "mcq_attempts",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), nullable=False),
+        sa.Column("total_questions", sa.Integer(), nullable=False),
+        sa.Column("correct_answers", sa.Integer(), nullable=False),
+        sa.Column("score_percentage", sa.Float(), nullable=False),
+        sa.Column("time_spent_seconds", sa.Integer(), nullable=True),
+        sa.Column("attempted_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    _create_table_if_missing(
+        existing_tables, "file_documents",
+        sa.Column("content_hash", sa.String(64), sa.ForeignKey("blobs.content_hash"), primary_key=True),
+        sa.Column("token_count", sa.Integer(), nullable=False),
+        sa.Column("page_count", sa.Integer(), nullable=False),
+        sa.Column("indexed_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    _create_table_if_missing(
+        existing_tables, "file_pages",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("content_hash", sa.String(64), sa.ForeignKey("blobs.content_hash"), nullable=False),
+        sa.Column("page_number", sa.Integer(), nullable=False),
+        sa.Column("char_offset", sa.Integer(), nullable=False),
+        sa.Column("char_length", sa.Integer(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        indexes=[("ix_file_pages_hash_page", ["content_hash", "page_number"], True)],
+    )
+    _create_table_if_missing(
+        existing_tables, "file_term_postings",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("content_hash", sa.String(64), sa.ForeignKey("blobs.content_hash"), nullable=False),
+        sa.Column("term", sa.String(100), nullable=False),
+        sa.Column("term_frequency", sa.Integer(), nullable=False),
+        sa.Column("positions", sa.Text(), nullable=False),
+        indexes=[("ix_file_term_postings_hash_term", ["content_hash", "term"], True)],
+    )
+    _create_table_if_missing(
+        existing_tables, "upload_sessions",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), nullable=False),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), nullable=False),
+        sa.Column("file_name", sa.String(255), nullable=False),
+        sa.Column("mime_type", sa.String(100), nullable=False),
+        sa.Column("file_size", sa.BigInteger(), nullable=False),
+        sa.Column("part_size", sa.Integer(), nullable=False),
+        sa.Column("total_parts", sa.Integer(), nullable=False),
+        sa.Column("storage_key", sa.String(500), nullable=False),
+        sa.Column("storage_upload_id", sa.String(255), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        indexes=[
+            ("ix_upload_sessions_owner_id", ["owner_id"], False),
+            ("ix_upload_sessions_expires_at", ["expires_at"], False),
+        ],
+    )
+    _create_table_if_missing(
+        existing_tables, "purge_jobs",
+        sa.Column("id", sa.String(36), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("target_type", sa.String(20), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("stage", sa.String(50), nullable=True),
+        sa.Column("rows_deleted", sa.Integer(), nullable=False),
+        sa.Column("objects_deleted", sa.Integer(), nullable=False),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+        indexes=[
+            ("ix_purge_jobs_owner_id", ["owner_id"], False),
+            ("ix_purge_jobs_status", ["status"], False),
+        ],
+    )
+
+
+def downgrade():
+    for name in (
+        "purge_jobs",
+        "upload_sessions",
+        "file_term_postings",
+        "file_pages",
+        "file_documents",
+        "mcq_attempts",
+        "learning_sessions",
+        "chapter_files",
+        "blobs",
+        "chapters",
+        "courses",
+        "users",
+    ):
+        op.drop_table(name)
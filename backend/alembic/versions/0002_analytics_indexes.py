@@ -0,0 +1,40 @@
+"""Composite indexes for the insights and recommendation queries
+
+Revision ID: 0002_analytics_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19
+
+Insights and recommendations filter learning_sessions on
+(owner_id, course_id, chapter_id, activity_type, is_valid) and mcq_attempts on
+(owner_id, course_id, chapter_id), then aggregate durations, scores and timestamps.
+On PostgreSQL the aggregated columns are included in the index so those queries are
+answered by index-only scans; other databases get the plain composite index.
+"""
+
+from alembic import op
+
+
+revision = "0002_analytics_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_learning_sessions_owner_course_chapter_activity",
+        "learning_sessions",
+        ["owner_id", "course_id", "chapter_id", "activity_type", "is_valid"],
+        postgresql_include=["duration_seconds", "session_end"],
+    )
+    op.create_index(
+        "ix_mcq_attempts_owner_course_chapter",
+        "mcq_attempts",
+        ["owner_id", "course_id", "chapter_id"],
+        postgresql_include=["score_percentage", "attempted_at"],
+    )
+
+
+def downgrade():
+    op.drop_index("ix_mcq_attempts_owner_course_chapter", table_name="mcq_attempts")
+    op.drop_index("ix_learning_sessions_owner_course_chapter_activity", table_name="learning_sessions")
@@ -0,0 +1,45 @@
+"""Activity rollups
+
+Revision ID: 0003_activity_rollups
+Revises: 0002_analytics_indexes
+Create Date: 2026-10-19
+
+Per (owner, course, chapter, activity_type) totals of valid learning sessions, backfilled from
+the existing history. From here on the application keeps them current on every insert.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_activity_rollups"
+down_revision = "0002_analytics_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "activity_rollups",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), primary_key=True),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), primary_key=True),
+        sa.Column("activity_type", sa.String(50), primary_key=True),
+        sa.Column("total_duration_seconds", sa.BigInteger(), nullable=False),
+        sa.Column("session_count", sa.Integer(), nullable=False),
+        sa.Column("last_activity", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.execute(
+        """
+        INSERT INTO activity_rollups
+            (owner_id, course_id, chapter_id, activity_type, total_duration_seconds, session_count, last_activity)
+        SELECT owner_id, course_id, chapter_id, activity_type, SUM(duration_seconds), COUNT(id), MAX(session_end)
+        FROM learning_sessions
+        WHERE is_valid = TRUE
+        GROUP BY owner_id, course_id, chapter_id, activity_type
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("activity_rollups")
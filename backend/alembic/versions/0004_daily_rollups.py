@@ -0,0 +1,75 @@
+"""Daily activity and MCQ rollups
+
+Revision ID: 0004_daily_rollups
+Revises: 0003_activity_rollups
+Create Date: 2026-10-19
+
+Per-user, per-UTC-day totals behind the date-range insights, backfilled from the history.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_daily_rollups"
+down_revision = "0003_activity_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_activity_rollups",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("activity_date", sa.Date(), primary_key=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), primary_key=True),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), primary_key=True),
+        sa.Column("activity_type", sa.String(50), primary_key=True),
+        sa.Column("total_duration_seconds", sa.BigInteger(), nullable=False),
+        sa.Column("session_count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "daily_mcq_rollups",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("activity_date", sa.Date(), primary_key=True),
+        sa.Column("course_id", sa.Integer(), sa.ForeignKey("courses.id"), primary_key=True),
+        sa.Column("chapter_id", sa.Integer(), sa.ForeignKey("chapters.id"), primary_key=True),
+        sa.Column("attempt_count", sa.Integer(), nullable=False),
+        sa.Column("score_total", sa.Float(), nullable=False),
+        sa.Column("best_score", sa.Float(), nullable=True),
+        sa.Column("correct_answers", sa.Integer(), nullable=False),
+        sa.Column("total_questions", sa.Integer(), nullable=False),
+    )
+
+    if op.get_bind().dialect.name == "postgresql":
+        session_day = "CAST(timezone('UTC', session_end) AS DATE)"
+        attempt_day = "CAST(timezone('UTC', attempted_at) AS DATE)"
+    else:
+        session_day = "DATE(session_end)"
+        attempt_day = "DATE(attempted_at)"
+
+    op.execute(
+        f"""
+        INSERT INTO daily_activity_rollups
+            (owner_id, activity_date, course_id, chapter_id, activity_type, total_duration_seconds, session_count)
+        SELECT owner_id, {session_day}, course_id, chapter_id, activity_type, SUM(duration_seconds), COUNT(id)
+        FROM learning_sessions
+        WHERE is_valid = TRUE
+        GROUP BY owner_id, {session_day}, course_id, chapter_id, activity_type
+        """
+    )
+    op.execute(
+        f"""
+        INSERT INTO daily_mcq_rollups
+            (owner_id, activity_date, course_id, chapter_id, attempt_count, score_total, best_score, correct_answers, total_questions)
+        SELECT owner_id, {attempt_day}, course_id, chapter_id, COUNT(id), SUM(score_percentage), MAX(score_percentage),
+               SUM(correct_answers), SUM(total_questions)
+        FROM mcq_attempts
+        GROUP BY owner_id, {attempt_day}, course_id, chapter_id
+        """
+    )
+
+
+def downgrade():
+    op.drop_table("daily_mcq_rollups")
+    op.drop_table("daily_activity_rollups")
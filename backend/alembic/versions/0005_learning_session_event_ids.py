@@ -0,0 +1,27 @@
+"""Client event ids on learning sessions
+
+Revision ID: 0005_learning_session_event_ids
+Revises: 0004_daily_rollups
+Create Date: 2026-10-19
+
+Idempotency keys for the bulk events API, unique per user.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_learning_session_event_ids"
+down_revision = "0004_daily_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("learning_sessions", sa.Column("client_event_id", sa.String(64), nullable=True))
+    op.create_index("ix_learning_sessions_owner_event", "learning_sessions", ["owner_id", "client_event_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_learning_sessions_owner_event", table_name="learning_sessions")
+    op.drop_column("learning_sessions", "client_event_id")
@@ -0,0 +1,27 @@
+"""Client event ids on MCQ attempts
+
+Revision ID: 0006_mcq_attempt_event_ids
+Revises: 0005_learning_session_event_ids
+Create Date: 2026-10-19
+
+Lets the write-behind buffer replay its spool file without inserting an attempt twice.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_mcq_attempt_event_ids"
+down_revision = "0005_learning_session_event_ids"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("mcq_attempts", sa.Column("client_event_id", sa.String(64), nullable=True))
+    op.create_index("ix_mcq_attempts_owner_event", "mcq_attempts", ["owner_id", "client_event_id"], unique=True)
+
+
+def downgrade():
+    op.drop_index("ix_mcq_attempts_owner_event", table_name="mcq_attempts")
+    op.drop_column("mcq_attempts", "client_event_id")
@@ -0,0 +1,29 @@
+"""Keyset indexes for the paginated list endpoints
+
+Revision ID: 0007_keyset_list_indexes
+Revises: 0006_mcq_attempt_event_ids
+Create Date: 2026-10-19
+
+The course, chapter and file lists filter on their parent and page by id > cursor ORDER BY id,
+so each page is one range scan of (parent, id) regardless of how far into the list it is.
+"""
+
+from alembic import op
+
+
+revision = "0007_keyset_list_indexes"
+down_revision = "0006_mcq_attempt_event_ids"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_courses_owner_id_id", "courses", ["owner_id", "id"])
+    op.create_index("ix_chapters_course_id_id", "chapters", ["course_id", "id"])
+    op.create_index("ix_chapter_files_chapter_id_id", "chapter_files", ["chapter_id", "id"])
+
+
+def downgrade():
+    op.drop_index("ix_chapter_files_chapter_id_id", table_name="chapter_files")
+    op.drop_index("ix_chapters_course_id_id", table_name="chapters")
+    op.drop_index("ix_courses_owner_id_id", table_name="courses")
@@ -0,0 +1,32 @@
+"""User data versions
+
+Revision ID: 0008_user_data_versions
+Revises: 0007_keyset_list_indexes
+Create Date: 2026-10-19
+
+One counter per user, bumped in the same transaction as every write to their activity,
+courses, chapters or files. Insight, recommendation and list responses carry an ETag
+derived from it, so an unchanged poll is answered with 304 after a primary-key lookup.
+Users start without a row, which reads as version 0.
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008_user_data_versions"
+down_revision = "0007_keyset_list_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_data_versions",
+        sa.Column("owner_id", sa.Integer(), primary_key=True, autoincrement=False),
+        sa.Column("version", sa.BigInteger(), nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("user_data_versions")
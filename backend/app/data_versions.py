@@ -0,0 +1,47 @@
+"""
+Per-user data versions for conditional requests.
+
+Every write that changes what a user's insights, recommendations or course, chapter and file
+lists show bumps the user's version in the same transaction. A response derived from that
+data can then be identified by (user, version, request), and a client asking again with the
+ETag it got can be answered with 304 after one primary-key lookup, without re-running the
+aggregations or the model (see app.routes.etags).
+
+Bumps are upserts, so a user's row is created by their first write; no row reads as version 0.
+"""
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.user_data_versions import UserDataVersions
+
+
+def bump_data_versions(db: Session, owner_ids):
+    """ Bump the data version of each owner. The caller commits, together with the write. """
+    # activity_rollups bumps versions on every insert, so it cannot be imported at module level
+    from app.insights.services.activity_rollups import upsert_increments
+
+    # Sorted, so concurrent batches take the row locks in the same order
+    upsert_increments(
+        db,
+        UserDataVersions,
+        ["owner_id"],
+        [{"owner_id": owner_id, "version": 1} for owner_id in sorted(set(owner_ids))],
+        sum_columns=["version"],
+        max_columns=[]
+    )
+
+
+def bump_data_version(db: Session, owner_id: int):
+    bump_data_versions(db, [owner_id])
+
+
+def bump_all_data_versions(db: Session):
+    """ After a bulk recomputation (e.g. a rollup rebuild): invalidate every user's ETags. The caller commits. """
+    db.execute(update(UserDataVersions).values(version=UserDataVersions.version + 1))
+
+
+async def get_data_version(db: AsyncSession, owner_id: int) -> int:
+    version = await db.scalar(select(UserDataVersions.version).where(UserDataVersions.owner_id == owner_id))
+    return version or 0
@@ -0,0 +1,47 @@
+"""
+Export learning history to CSV or Parquet for offline analysis and model retraining.
+
+    python -m app.insights.export_activity learning_sessions -o sessions.parquet
+    python -m app.insights.export_activity mcq_attempts --format csv --owner-id 7 --course-id 3 \
+        --start-date 2026-01-01 --end-date 2026-06-30 > attempts.csv
+
+Rows are streamed from a server-side cursor and written batch by batch, so exports of any
+size run in constant memory.
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from app.database import SessionLocal
+from app.insights.services.export import DATASETS, FORMATS, export_stream
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export learning_sessions or mcq_attempts to CSV or Parquet.")
+    parser.add_argument("dataset", choices=list(DATASETS))
+    parser.add_argument("--format", choices=list(FORMATS), default=None, help="Default: from the output file extension, else csv")
+    parser.add_argument("-o", "--output", default=None, help="Output file; stdout when omitted")
+    parser.add_argument("--owner-id", type=int, default=None, help="Only this user's rows")
+    parser.add_argument("--course-id", type=int, default=None, help="Only this course's rows")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=None, help="First UTC day to include (YYYY-MM-DD)")
+    parser.add_argument("--end-date", type=date.fromisoformat, default=None, help="Last UTC day to include (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    export_format = args.format
+    if export_format is None:
+        export_format = "parquet" if args.output and args.output.endswith(".parquet") else "csv"
+
+    db = SessionLocal()
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export_stream(db, args.dataset, export_format, owner_id=args.owner_id, course_id=args.course_id, start_date=args.start_date, end_date=args.end_date):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
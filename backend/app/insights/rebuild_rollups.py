@@ -0,0 +1,31 @@
+"""
+Recompute the insight rollup tables from the raw activity history.
+
+    python -m app.insights.rebuild_rollups              # every user
+    python -m app.insights.rebuild_rollups --owner-id 7 # one user
+"""
+
+import argparse
+
+from app.database import SessionLocal
+from app.insights.services.activity_rollups import rebuild_activity_rollups, rebuild_daily_rollups
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild insight rollups from learning_sessions and mcq_attempts.")
+    parser.add_argument("--owner-id", type=int, default=None, help="Only rebuild this user's rollups")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        rows = rebuild_activity_rollups(db, owner_id=args.owner_id)
+        print(f"activity_rollups: {rows} rows")
+        activity_rows, mcq_rows = rebuild_daily_rollups(db, owner_id=args.owner_id)
+        print(f"daily_activity_rollups: {activity_rows} rows")
+        print(f"daily_mcq_rollups: {mcq_rows} rows")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, Query, status, HTTPException
-from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from sqlalchemy import select
 
-from app.routes.auth import db_dependency
+from app.routes.auth import read_db_dependency
 from app.routes.users import user_dependency
+from app.routes.etags import data_etag
 from app.insights.services.activity_time_tracker import get_activity_time_by_chapter
 from app.models import Chapters, Courses
 
@@ -13,9 +15,15 @@ router = APIRouter(
 )
 
 
-@router.get("/activity-time")
-def activity_time_insights(
-    db: db_dependency, 
+class ChapterActivityTime(BaseModel):
+    chapter_id: int
+    chapter_name: str
+    time_spent_seconds: int
+
+
+@router.get("/activity-time", response_model=list[ChapterActivityTime], dependencies=[data_etag])
+async def activity_time_insights(
+    db: read_db_dependency, 
     user: user_dependency, 
     course_id: Annotated[int, Query(gt=0)],
     activity_type: Annotated[str, Query()] = "summary"
@@ -25,12 +33,12 @@ def activity_time_insights(
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id')))
     
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
     
     try:
-        return get_activity_time_by_chapter(db=db, owner_id=user.get("id"), course_id=course_id, activity_type=activity_type)
+        return await get_activity_time_by_chapter(db=db, owner_id=user.get("id"), course_id=course_id, activity_type=activity_type)
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
\ No newline at end of file
@@ -0,0 +1,76 @@
+from typing import Annotated
+from fastapi import APIRouter, Query, status, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from app.routes.auth import read_db_dependency
+from app.routes.users import user_dependency
+from app.insights.services.dashboard import get_dashboard
+from app.ml.route.recommendation import Recommendation, model_data_etag
+from app.models import Courses
+
+router = APIRouter(
+    prefix="/insights",
+    tags=["Insights"]
+)
+
+
+class DashboardTotals(BaseModel):
+    view_content_seconds: int
+    summary_seconds: int
+    ask_seconds: int
+    mcq_seconds: int
+    total_seconds: int
+    mcq_attempts: int
+    mcq_avg_score: float
+
+
+class DashboardChapter(BaseModel):
+    chapter_id: int
+    chapter_name: str
+    view_content_seconds: int
+    summary_seconds: int
+    ask_seconds: int
+    mcq_seconds: int
+    total_seconds: int
+    mcq_attempts: int
+    mcq_avg_score: float
+    mcq_best_score: float | None
+    last_mcq_attempt: str | None
+    last_activity: str | None
+
+
+class DashboardResponse(BaseModel):
+    course_id: int
+    course_title: str
+    chapters: list[DashboardChapter]
+    totals: DashboardTotals
+    recommendations: list[Recommendation] | None
+    recommendations_error: str | None
+    model_version: str | None
+
+
+@router.get("/dashboard", response_model=DashboardResponse, dependencies=[model_data_etag])
+async def dashboard_insights(
+    db: read_db_dependency,
+    user: user_dependency,
+    course_id: Annotated[int, Query(gt=0)],
+    include_recommendations: Annotated[bool, Query()] = True
+):
+    """ Chapter-wise time per activity, MCQ stats, course totals and recommendations in one response """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    # Verify that the course exists and belongs to the user
+    course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id')))
+
+    if not course:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+
+    dashboard = await get_dashboard(db=db, owner_id=user.get("id"), course_id=course_id, include_recommendations=include_recommendations)
+
+    return {
+        "course_id": course.id,
+        "course_title": course.title,
+        **dashboard
+    }
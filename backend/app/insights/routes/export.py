@@ -0,0 +1,54 @@
+from typing import Annotated, Literal
+from datetime import date
+from fastapi import APIRouter, Query, Path, status, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal
+from app.routes.auth import db_dependency
+from app.routes.users import user_dependency
+from app.insights.services.export import FORMATS, export_stream
+from app.models import Courses
+
+router = APIRouter(
+    prefix="/insights/export",
+    tags=["Insights"]
+)
+
+
+@router.get("/{dataset}", status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+def export_learning_history(
+    db: db_dependency,
+    user: user_dependency,
+    dataset: Annotated[Literal["learning_sessions", "mcq_attempts"], Path()],
+    format: Annotated[Literal["csv", "parquet"], Query()] = "csv",
+    course_id: Annotated[int | None, Query(gt=0)] = None,
+    start_date: Annotated[date | None, Query()] = None,
+    end_date: Annotated[date | None, Query()] = None
+):
+    """ Download the user's learning sessions or MCQ attempts as CSV or Parquet, streamed in constant memory """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    if course_id is not None:
+        course = db.query(Courses.id).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+        if course is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+
+    if start_date is not None and end_date is not None and start_date > end_date:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start_date must not be after end_date")
+
+    owner_id = user.get('id')
+
+    def export_chunks():
+        # The request session is closed once the response starts, so the stream owns its own
+        export_db = SessionLocal()
+        try:
+            yield from export_stream(export_db, dataset, format, owner_id=owner_id, course_id=course_id, start_date=start_date, end_date=end_date)
+        finally:
+            export_db.close()
+
+    return StreamingResponse(
+        export_chunks(),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
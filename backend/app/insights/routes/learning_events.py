@@ -0,0 +1,53 @@
+from datetime import datetime
+from fastapi import APIRouter, status, HTTPException
+from pydantic import BaseModel, Field
+
+from app.routes.auth import db_dependency
+from app.routes.users import user_dependency
+from app.insights.services.event_ingestion import ingest_learning_events, MAX_EVENTS_PER_BATCH
+
+router = APIRouter(
+    prefix="/events",
+    tags=["Events"]
+)
+
+
+class LearningSessionEvent(BaseModel):
+    event_id: str = Field(min_length=1, max_length=64)
+    course_id: int = Field(gt=0)
+    chapter_id: int = Field(gt=0)
+    activity_type: str
+    duration_seconds: int
+    session_end: datetime | None = None
+
+
+class LearningSessionEventBatch(BaseModel):
+    events: list[LearningSessionEvent] = Field(min_length=1, max_length=MAX_EVENTS_PER_BATCH)
+
+
+class RejectedEvent(BaseModel):
+    index: int
+    event_id: str
+    detail: str
+
+
+class IngestLearningEventsResponse(BaseModel):
+    accepted: int
+    duplicates: int
+    rejected: list[RejectedEvent]
+
+
+@router.post("/learning-sessions", status_code=status.HTTP_200_OK, response_model=IngestLearningEventsResponse)
+def ingest_learning_session_events(db: db_dependency, user: user_dependency, batch: LearningSessionEventBatch):
+    """ Record many learning-session events at once. event_id makes retries idempotent; invalid events are reported, not stored """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    try:
+        return ingest_learning_events(db, user.get("id"), [event.model_dump() for event in batch.events])
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to record events: {str(e)}"
+        )
@@ -1,10 +1,11 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, Query, status, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from pydantic import BaseModel
+from sqlalchemy import select, func
 
-from app.routes.auth import db_dependency
+from app.routes.auth import read_db_dependency
 from app.routes.users import user_dependency
+from app.routes.etags import data_etag
 from app.models.mcq_attempt import MCQAttempt
 from app.models.chapters import Chapters
 from app.models.courses import Courses
@@ -15,9 +16,17 @@ router = APIRouter(
 )
 
 
-@router.get("/mcq-attempts")
-def mcq_attempts_insights(
-    db: db_dependency, 
+class ChapterMCQAttempts(BaseModel):
+    chapter_id: int
+    chapter_name: str
+    attempts: int
+    avg_score: float
+    last_attempt: str | None
+
+
+@router.get("/mcq-attempts", response_model=list[ChapterMCQAttempts], dependencies=[data_etag])
+async def mcq_attempts_insights(
+    db: read_db_dependency, 
     user: user_dependency,
     course_id: Annotated[int, Query(gt=0)]
 ):
@@ -26,16 +35,13 @@ def mcq_attempts_insights(
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id')))
     
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
     
-    # Get all chapters for the course
-    chapters = db.query(Chapters).filter(Chapters.course_id == course_id).all()
-    
     # Get MCQ attempts grouped by chapter
-    results = (db.query(
+    results = (await db.execute(select(
             Chapters.id.label("chapter_id"),
             Chapters.chapter_title.label("chapter_name"),
             func.count(MCQAttempt.id).label("attempts"),
@@ -48,7 +54,7 @@ def mcq_attempts_insights(
             (MCQAttempt.owner_id == user.get('id')) &
             (MCQAttempt.course_id == course_id)
         )
-        .filter(
+        .where(
             Chapters.course_id == course_id
         )
         .group_by(
@@ -56,8 +62,7 @@ def mcq_attempts_insights(
             Chapters.chapter_title
         )
         .order_by(Chapters.id)
-        .all()
-    )
+    )).all()
     
     return [
         {
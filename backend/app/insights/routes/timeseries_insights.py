@@ -0,0 +1,114 @@
+from typing import Annotated
+from datetime import date, datetime, timezone, timedelta
+from fastapi import APIRouter, Query, status, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+
+from app.routes.auth import read_db_dependency
+from app.routes.users import user_dependency
+from app.routes.etags import data_etag
+from app.insights.services.timeseries import get_activity_timeseries, get_mcq_timeseries
+from app.models import Courses
+
+router = APIRouter(
+    prefix="/insights/timeseries",
+    tags=["Insights"]
+)
+
+
+class ActivityBucket(BaseModel):
+    period_start: str
+    time_spent_seconds: int
+    session_count: int
+    by_activity: dict[str, int]
+
+
+class MCQBucket(BaseModel):
+    period_start: str
+    attempts: int
+    avg_score: float
+    best_score: float | None
+    correct_answers: int
+    total_questions: int
+
+
+class ActivityTimeseriesResponse(BaseModel):
+    start_date: str
+    end_date: str
+    granularity: str
+    buckets: list[ActivityBucket]
+
+
+class MCQTimeseriesResponse(BaseModel):
+    start_date: str
+    end_date: str
+    granularity: str
+    buckets: list[MCQBucket]
+
+
+async def _resolve_range(db, user: dict, start_date: date | None, end_date: date | None, course_id: int | None):
+    """ Default to the last 30 days and check course ownership when scoped to a course """
+    if course_id is not None:
+        course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id')))
+        if not course:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
+
+    if end_date is None:
+        end_date = datetime.now(timezone.utc).date()
+    if start_date is None:
+        start_date = end_date - timedelta(days=29)
+    return start_date, end_date
+
+
+@router.get("/activity", response_model=ActivityTimeseriesResponse, dependencies=[data_etag])
+async def activity_timeseries(
+    db: read_db_dependency,
+    user: user_dependency,
+    start_date: Annotated[date | None, Query()] = None,
+    end_date: Annotated[date | None, Query()] = None,
+    granularity: Annotated[str, Query()] = "day",
+    course_id: Annotated[int | None, Query(gt=0)] = None
+):
+    """ Time spent per day | week | month in a date range, split by activity type """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    start_date, end_date = await _resolve_range(db, user, start_date, end_date, course_id)
+    try:
+        buckets = await get_activity_timeseries(db=db, owner_id=user.get("id"), start_date=start_date, end_date=end_date, granularity=granularity, course_id=course_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "granularity": granularity,
+        "buckets": buckets
+    }
+
+
+@router.get("/mcq", response_model=MCQTimeseriesResponse, dependencies=[data_etag])
+async def mcq_timeseries(
+    db: read_db_dependency,
+    user: user_dependency,
+    start_date: Annotated[date | None, Query()] = None,
+    end_date: Annotated[date | None, Query()] = None,
+    granularity: Annotated[str, Query()] = "day",
+    course_id: Annotated[int | None, Query(gt=0)] = None
+):
+    """ MCQ attempts, average and best score per day | week | month in a date range """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    start_date, end_date = await _resolve_range(db, user, start_date, end_date, course_id)
+    try:
+        buckets = await get_mcq_timeseries(db=db, owner_id=user.get("id"), start_date=start_date, end_date=end_date, granularity=granularity, course_id=course_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "granularity": granularity,
+        "buckets": buckets
+    }
@@ -1,9 +1,11 @@
 from typing import Annotated
 from fastapi import APIRouter, Depends, status, HTTPException
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.routes.auth import db_dependency
+from app.routes.auth import read_db_dependency
 from app.routes.users import user_dependency
+from app.routes.etags import data_etag
 from app.insights.services.total_time_spent import get_total_time_spent_by_course
 
 router = APIRouter(
@@ -12,9 +14,15 @@ router = APIRouter(
 )
 
 
-@router.get("/total-time")
-def total_time_insights(
-    db: db_dependency, 
+class CourseTotalTime(BaseModel):
+    course_id: int
+    course_title: str
+    total_time_spent_seconds: int
+
+
+@router.get("/total-time", response_model=list[CourseTotalTime], dependencies=[data_etag])
+async def total_time_insights(
+    db: read_db_dependency, 
     user: user_dependency
 ):
     """ Returns course-wise total time spent on all activities (summary, ask, mcq) """
@@ -22,7 +30,7 @@ def total_time_insights(
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     try:
-        return get_total_time_spent_by_course(db=db, owner_id=user.get("id"))
+        return await get_total_time_spent_by_course(db=db, owner_id=user.get("id"))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -0,0 +1,332 @@
+"""
+Incrementally maintained activity totals.
+
+Every LearningSessions insert goes through record_learning_session(s), and every MCQAttempt
+insert through record_mcq_attempt. They add the raw rows and bump the matching rollup rows
+(all-time per chapter and activity, plus per UTC day) and the owner's data version in the same
+transaction, so insight queries read rollups instead of aggregating the full history.
+rebuild_activity_rollups and rebuild_daily_rollups recompute them if they ever drift.
+"""
+
+from collections import defaultdict
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy import Date, cast, func, delete, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.learning_sessions import LearningSessions
+from app.models.mcq_attempt import MCQAttempt
+from app.models.activity_rollups import ActivityRollups
+from app.models.daily_rollups import DailyActivityRollups, DailyMCQRollups
+from app.data_versions import bump_data_versions, bump_data_version, bump_all_data_versions
+
+
+def upsert_increments(db: Session, model, key_columns: list, rows: list, sum_columns: list, max_columns: list):
+    """
+    Add rows into a rollup table: on key conflict the sum_columns are added to the stored
+    values and max_columns keep the larger value. Rows must have distinct keys. Uses the
+    database's native upsert so concurrent writers never lose an increment.
+    """
+    if not rows:
+        return
+
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        new = stmt.excluded
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={
+                **{c: table.c[c] + new[c] for c in sum_columns},
+                **{c: func.greatest(table.c[c], new[c]) for c in max_columns},
+            }
+        ))
+    elif dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+        stmt = dialect_insert(table).values(rows)
+        new = stmt.inserted
+        # GREATEST is NULL if either side is NULL on MySQL
+        db.execute(stmt.on_duplicate_key_update(
+            **{c: table.c[c] + new[c] for c in sum_columns},
+            **{c: func.greatest(func.coalesce(table.c[c], new[c]), new[c]) for c in max_columns},
+        ))
+    else:
+        for row in rows:
+            current = db.query(model).filter(
+                *[getattr(model, c) == row[c] for c in key_columns]
+            ).with_for_update().first()
+            if current is None:
+                db.add(model(**row))
+                continue
+            for c in sum_columns:
+                setattr(current, c, (getattr(current, c) or 0) + row[c])
+            for c in max_columns:
+                stored = getattr(current, c)
+                setattr(current, c, row[c] if stored is None else max(stored, row[c]))
+        db.flush()
+
+
+def utc_day(moment: datetime):
+    """ The UTC calendar day rollups file a timestamp under. """
+    return moment.astimezone(timezone.utc).date()
+
+
+def _fold_into_rollups(db: Session, rows: list):
+    """ Add learning session rows (dicts of column values) to the all-time and daily rollups. """
+    bump_data_versions(db, [row["owner_id"] for row in rows])
+    totals = defaultdict(lambda: {"total_duration_seconds": 0, "session_count": 0, "last_activity": None})
+    daily = defaultdict(lambda: {"total_duration_seconds": 0, "session_count": 0})
+    for row in rows:
+        if not row["is_valid"]:
+            continue
+        entry = totals[(row["owner_id"], row["course_id"], row["chapter_id"], row["activity_type"])]
+        entry["total_duration_seconds"] += row["duration_seconds"]
+        entry["session_count"] += 1
+        if entry["last_activity"] is None or row["session_end"] > entry["last_activity"]:
+            entry["last_activity"] = row["session_end"]
+
+        day_entry = daily[(row["owner_id"], utc_day(row["session_end"]), row["course_id"], row["chapter_id"], row["activity_type"])]
+        day_entry["total_duration_seconds"] += row["duration_seconds"]
+        day_entry["session_count"] += 1
+
+    upsert_increments(
+        db,
+        ActivityRollups,
+        ["owner_id", "course_id", "chapter_id", "activity_type"],
+        [
+            {"owner_id": o, "course_id": c, "chapter_id": ch, "activity_type": a, **entry}
+            for (o, c, ch, a), entry in totals.items()
+        ],
+        sum_columns=["total_duration_seconds", "session_count"],
+        max_columns=["last_activity"]
+    )
+    upsert_increments(
+        db,
+        DailyActivityRollups,
+        ["owner_id", "activity_date", "course_id", "chapter_id", "activity_type"],
+        [
+            {"owner_id": o, "activity_date": d, "course_id": c, "chapter_id": ch, "activity_type": a, **entry}
+            for (o, d, c, ch, a), entry in daily.items()
+        ],
+        sum_columns=["total_duration_seconds", "session_count"],
+        max_columns=[]
+    )
+
+
+def record_learning_sessions(db: Session, sessions: list):
+    """
+    Add LearningSessions rows and fold the valid ones into the activity rollups.
+    The caller commits, which makes both visible together.
+    """
+    db.add_all(sessions)
+    _fold_into_rollups(db, [
+        {c: getattr(session, c) for c in ("owner_id", "course_id", "chapter_id", "activity_type", "duration_seconds", "session_end", "is_valid")}
+        for session in sessions
+    ])
+
+
+def insert_learning_sessions(db: Session, rows: list):
+    """
+    Bulk variant of record_learning_sessions for many rows given as column dicts: one
+    multi-row INSERT without building ORM objects. The caller commits.
+    """
+    if not rows:
+        return
+    db.execute(insert(LearningSessions), rows)
+    _fold_into_rollups(db, rows)
+
+
+def learning_session_row(owner_id: int, course_id: int, chapter_id: int, activity_type: str, duration_seconds: int, session_end: datetime | None = None) -> dict:
+    """ Column values of a valid session that ended at session_end (default: now). """
+    if session_end is None:
+        session_end = datetime.now(timezone.utc)
+
+    return {
+        "owner_id": owner_id,
+        "course_id": course_id,
+        "chapter_id": chapter_id,
+        "activity_type": activity_type,
+        "session_start": session_end - timedelta(seconds=duration_seconds),
+        "session_end": session_end,
+        "duration_seconds": duration_seconds,
+        "is_valid": True,
+        "updated_at": session_end
+    }
+
+
+def record_learning_session(db: Session, owner_id: int, course_id: int, chapter_id: int, activity_type: str, duration_seconds: int, session_end: datetime | None = None) -> LearningSessions:
+    """ Record one valid session that ended at session_end (default: now). The caller commits. """
+    learning_session = LearningSessions(**learning_session_row(owner_id, course_id, chapter_id, activity_type, duration_seconds, session_end))
+    record_learning_sessions(db, [learning_session])
+    return learning_session
+
+
+def _fold_mcq_into_rollups(db: Session, rows: list):
+    """ Add MCQ attempt rows (dicts of column values) to the daily MCQ rollup. """
+    bump_data_versions(db, [row["owner_id"] for row in rows])
+    daily = defaultdict(lambda: {"attempt_count": 0, "score_total": 0.0, "best_score": None, "correct_answers": 0, "total_questions": 0})
+    for row in rows:
+        entry = daily[(row["owner_id"], utc_day(row["attempted_at"]), row["course_id"], row["chapter_id"])]
+        entry["attempt_count"] += 1
+        entry["score_total"] += row["score_percentage"]
+        entry["correct_answers"] += row["correct_answers"]
+        entry["total_questions"] += row["total_questions"]
+        if entry["best_score"] is None or row["score_percentage"] > entry["best_score"]:
+            entry["best_score"] = row["score_percentage"]
+
+    upsert_increments(
+        db,
+        DailyMCQRollups,
+        ["owner_id", "activity_date", "course_id", "chapter_id"],
+        [
+            {"owner_id": o, "activity_date": d, "course_id": c, "chapter_id": ch, **entry}
+            for (o, d, c, ch), entry in daily.items()
+        ],
+        sum_columns=["attempt_count", "score_total", "correct_answers", "total_questions"],
+        max_columns=["best_score"]
+    )
+
+
+def mcq_attempt_row(owner_id: int, course_id: int, chapter_id: int, total_questions: int, correct_answers: int, score_percentage: float, time_spent_seconds: int | None = None, attempted_at: datetime | None = None) -> dict:
+    """ Column values of an MCQ attempt made at attempted_at (default: now). """
+    return {
+        "owner_id": owner_id,
+        "course_id": course_id,
+        "chapter_id": chapter_id,
+        "total_questions": total_questions,
+        "correct_answers": correct_answers,
+        "score_percentage": score_percentage,
+        "time_spent_seconds": time_spent_seconds,
+        "attempted_at": attempted_at or datetime.now(timezone.utc)
+    }
+
+
+def record_mcq_attempt(db: Session, owner_id: int, course_id: int, chapter_id: int, total_questions: int, correct_answers: int, score_percentage: float, time_spent_seconds: int | None = None) -> MCQAttempt:
+    """ Record one MCQ attempt made now and add it to the daily MCQ rollup. The caller commits. """
+    row = mcq_attempt_row(owner_id, course_id, chapter_id, total_questions, correct_answers, score_percentage, time_spent_seconds)
+    mcq_attempt = MCQAttempt(**row)
+    db.add(mcq_attempt)
+    _fold_mcq_into_rollups(db, [row])
+    return mcq_attempt
+
+
+def insert_mcq_attempts(db: Session, rows: list):
+    """ Bulk variant of record_mcq_attempt for rows given as column dicts. The caller commits. """
+    if not rows:
+        return
+    db.execute(insert(MCQAttempt), rows)
+    _fold_mcq_into_rollups(db, rows)
+
+
+def _bump_rebuilt(db: Session, owner_id: int | None):
+    """ Rebuilt rollups may differ from what was served: invalidate the ETags of whoever was rebuilt. """
+    if owner_id is None:
+        bump_all_data_versions(db)
+    else:
+        bump_data_version(db, owner_id)
+
+
+def rebuild_activity_rollups(db: Session, owner_id: int | None = None) -> int:
+    """ Recompute the rollups from learning_sessions, for everyone or one user. Commits. Returns the row count. """
+    clear = delete(ActivityRollups)
+    source = select(
+        LearningSessions.owner_id,
+        LearningSessions.course_id,
+        LearningSessions.chapter_id,
+        LearningSessions.activity_type,
+        func.sum(LearningSessions.duration_seconds),
+        func.count(LearningSessions.id),
+        func.max(LearningSessions.session_end)
+    ).where(
+        LearningSessions.is_valid == True
+    ).group_by(
+        LearningSessions.owner_id,
+        LearningSessions.course_id,
+        LearningSessions.chapter_id,
+        LearningSessions.activity_type
+    )
+    if owner_id is not None:
+        clear = clear.where(ActivityRollups.owner_id == owner_id)
+        source = source.where(LearningSessions.owner_id == owner_id)
+
+    db.execute(clear)
+    result = db.execute(insert(ActivityRollups).from_select(
+        ["owner_id", "course_id", "chapter_id", "activity_type", "total_duration_seconds", "session_count", "last_activity"],
+        source
+    ))
+    _bump_rebuilt(db, owner_id)
+    db.commit()
+    return result.rowcount
+
+
+def _utc_date(db: Session, column):
+    """ SQL expression for the UTC calendar day of a timestamp column, matching utc_day. """
+    if db.get_bind().dialect.name == "postgresql":
+        return cast(func.timezone("UTC", column), Date)
+    # MySQL DATETIME columns carry no zone and are written in UTC
+    return func.date(column)
+
+
+def rebuild_daily_rollups(db: Session, owner_id: int | None = None) -> tuple:
+    """ Recompute the daily activity and MCQ rollups, for everyone or one user. Commits. Returns both row counts. """
+    session_day = _utc_date(db, LearningSessions.session_end)
+    activity_source = select(
+        LearningSessions.owner_id,
+        session_day,
+        LearningSessions.course_id,
+        LearningSessions.chapter_id,
+        LearningSessions.activity_type,
+        func.sum(LearningSessions.duration_seconds),
+        func.count(LearningSessions.id)
+    ).where(
+        LearningSessions.is_valid == True
+    ).group_by(
+        LearningSessions.owner_id,
+        session_day,
+        LearningSessions.course_id,
+        LearningSessions.chapter_id,
+        LearningSessions.activity_type
+    )
+
+    attempt_day = _utc_date(db, MCQAttempt.attempted_at)
+    mcq_source = select(
+        MCQAttempt.owner_id,
+        attempt_day,
+        MCQAttempt.course_id,
+        MCQAttempt.chapter_id,
+        func.count(MCQAttempt.id),
+        func.sum(MCQAttempt.score_percentage),
+        func.max(MCQAttempt.score_percentage),
+        func.sum(MCQAttempt.correct_answers),
+        func.sum(MCQAttempt.total_questions)
+    ).group_by(
+        MCQAttempt.owner_id,
+        attempt_day,
+        MCQAttempt.course_id,
+        MCQAttempt.chapter_id
+    )
+
+    clear_activity = delete(DailyActivityRollups)
+    clear_mcq = delete(DailyMCQRollups)
+    if owner_id is not None:
+        clear_activity = clear_activity.where(DailyActivityRollups.owner_id == owner_id)
+        clear_mcq = clear_mcq.where(DailyMCQRollups.owner_id == owner_id)
+        activity_source = activity_source.where(LearningSessions.owner_id == owner_id)
+        mcq_source = mcq_source.where(MCQAttempt.owner_id == owner_id)
+
+    db.execute(clear_activity)
+    db.execute(clear_mcq)
+    activity_rows = db.execute(insert(DailyActivityRollups).from_select(
+        ["owner_id", "activity_date", "course_id", "chapter_id", "activity_type", "total_duration_seconds", "session_count"],
+        activity_source
+    )).rowcount
+    mcq_rows = db.execute(insert(DailyMCQRollups).from_select(
+        ["owner_id", "activity_date", "course_id", "chapter_id", "attempt_count", "score_total", "best_score", "correct_answers", "total_questions"],
+        mcq_source
+    )).rowcount
+    _bump_rebuilt(db, owner_id)
+    db.commit()
+    return activity_rows, mcq_rows
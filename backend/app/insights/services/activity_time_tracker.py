@@ -1,10 +1,10 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
-from app.models.learning_sessions import LearningSessions
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, and_
+from app.models.activity_rollups import ActivityRollups
 from app.models.chapters import Chapters
 
 
-def get_activity_time_by_chapter(db: Session, owner_id: int, course_id: int, activity_type: str):
+async def get_activity_time_by_chapter(db: AsyncSession, owner_id: int, course_id: int, activity_type: str):
     """ Returns chapter-wise total time spent for a given activity: summary | ask | mcq | view_content """
     
     # Normalize activity_type - handle both "ask" and "ask_question"
@@ -18,24 +18,23 @@ def get_activity_time_by_chapter(db: Session, owner_id: int, course_id: int, act
     if activity_type not in valid_activity_types:
         raise ValueError(f"activity_type must be one of {valid_activity_types}, got: {activity_type}")
 
-    results = (db.query(
+    results = (await db.execute(select(
             Chapters.id.label("chapter_id"),
             Chapters.chapter_title.label("chapter_name"),
             func.coalesce(
-                func.sum(LearningSessions.duration_seconds), 0
+                func.sum(ActivityRollups.total_duration_seconds), 0
             ).label("time_spent_seconds")
         )
         .outerjoin(
-            LearningSessions,
+            ActivityRollups,
             and_(
-                LearningSessions.chapter_id == Chapters.id,
-                LearningSessions.owner_id == owner_id,
-                LearningSessions.course_id == course_id,
-                LearningSessions.activity_type.in_(activity_types),
-                LearningSessions.is_valid == True
+                ActivityRollups.chapter_id == Chapters.id,
+                ActivityRollups.owner_id == owner_id,
+                ActivityRollups.course_id == course_id,
+                ActivityRollups.activity_type.in_(activity_types)
             )
         )
-        .filter(
+        .where(
             Chapters.course_id == course_id
         )
         .group_by(
@@ -43,8 +42,7 @@ def get_activity_time_by_chapter(db: Session, owner_id: int, course_id: int, act
             Chapters.chapter_title
         )
         .order_by(Chapters.id)
-        .all()
-    )
+    )).all()
 
     return [
         {
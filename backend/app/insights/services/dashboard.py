@@ -0,0 +1,152 @@
+import anyio
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case
+
+from app.models.activity_rollups import ActivityRollups
+from app.models.mcq_attempt import MCQAttempt
+from app.models.chapters import Chapters
+from app.ml.service.recommendation_service import recommend_from_data
+
+
+def _activity_seconds(*activity_types):
+    return func.sum(
+        case(
+            (ActivityRollups.activity_type.in_(activity_types), ActivityRollups.total_duration_seconds),
+            else_=0
+        )
+    )
+
+
+async def get_dashboard(db: AsyncSession, owner_id: int, course_id: int, include_recommendations: bool = True):
+    """
+    Everything the insights dashboard shows for one course, from a single query: chapter-wise time
+    per activity (pivoted from the activity rollups) joined with chapter-wise MCQ stats. The
+    recommendation model is fed from the same rows instead of re-reading the tables.
+    """
+    activity = select(
+            ActivityRollups.chapter_id.label("chapter_id"),
+            _activity_seconds("view_content").label("view_content"),
+            _activity_seconds("summary").label("summary"),
+            _activity_seconds("ask", "ask_question").label("ask"),
+            # The recommendation model was trained on ask_question time only
+            _activity_seconds("ask_question").label("ask_question"),
+            _activity_seconds("mcq").label("mcq"),
+            func.max(ActivityRollups.last_activity).label("last_activity")
+        ).where(
+            ActivityRollups.owner_id == owner_id,
+            ActivityRollups.course_id == course_id
+        ).group_by(
+            ActivityRollups.chapter_id
+        ).subquery()
+
+    mcq = select(
+            MCQAttempt.chapter_id.label("chapter_id"),
+            func.count(MCQAttempt.id).label("attempts"),
+            func.avg(MCQAttempt.score_percentage).label("avg_score"),
+            func.max(MCQAttempt.score_percentage).label("best_score"),
+            func.max(MCQAttempt.attempted_at).label("last_attempt")
+        ).where(
+            MCQAttempt.owner_id == owner_id,
+            MCQAttempt.course_id == course_id
+        ).group_by(
+            MCQAttempt.chapter_id
+        ).subquery()
+
+    rows = (await db.execute(select(
+            Chapters.id.label("chapter_id"),
+            Chapters.chapter_title.label("chapter_name"),
+            activity.c.view_content,
+            activity.c.summary,
+            activity.c.ask,
+            activity.c.ask_question,
+            activity.c.mcq,
+            activity.c.last_activity,
+            mcq.c.attempts,
+            mcq.c.avg_score,
+            mcq.c.best_score,
+            mcq.c.last_attempt
+        )
+        .outerjoin(activity, activity.c.chapter_id == Chapters.id)
+        .outerjoin(mcq, mcq.c.chapter_id == Chapters.id)
+        .where(
+            Chapters.course_id == course_id
+        )
+        .order_by(Chapters.id)
+    )).all()
+
+    chapters = []
+    totals = {
+        "view_content_seconds": 0,
+        "summary_seconds": 0,
+        "ask_seconds": 0,
+        "mcq_seconds": 0,
+        "total_seconds": 0,
+        "mcq_attempts": 0
+    }
+    score_sum = 0.0
+    for row in rows:
+        chapter = {
+            "chapter_id": row.chapter_id,
+            "chapter_name": row.chapter_name,
+            "view_content_seconds": int(row.view_content or 0),
+            "summary_seconds": int(row.summary or 0),
+            "ask_seconds": int(row.ask or 0),
+            "mcq_seconds": int(row.mcq or 0),
+            "mcq_attempts": int(row.attempts or 0),
+            "mcq_avg_score": round(row.avg_score, 2) if row.avg_score else 0,
+            "mcq_best_score": round(row.best_score, 2) if row.best_score is not None else None,
+            "last_mcq_attempt": row.last_attempt.isoformat() if row.last_attempt else None,
+            "last_activity": row.last_activity.isoformat() if row.last_activity else None
+        }
+        chapter["total_seconds"] = chapter["view_content_seconds"] + chapter["summary_seconds"] + chapter["ask_seconds"] + chapter["mcq_seconds"]
+        chapters.append(chapter)
+
+        for key in totals:
+            totals[key] += chapter[key]
+        score_sum += float(row.avg_score or 0) * chapter["mcq_attempts"]
+
+    totals["mcq_avg_score"] = round(score_sum / totals["mcq_attempts"], 2) if totals["mcq_attempts"] else 0
+
+    result = {
+        "chapters": chapters,
+        "totals": totals,
+        "recommendations": None,
+        "recommendations_error": None,
+        "model_version": None
+    }
+
+    if include_recommendations:
+        chapters_list = [
+            {"chapter_id": row.chapter_id, "chapter_name": row.chapter_name, "course_id": course_id, "user_id": owner_id}
+            for row in rows
+        ]
+        time_list = [
+            {
+                "chapter_id": row.chapter_id,
+                "user_id": owner_id,
+                "view_content": int(row.view_content or 0),
+                "time_summary": int(row.summary or 0),
+                "time_ask": int(row.ask_question or 0),
+                "time_mcq": int(row.mcq or 0),
+                "last_activity": row.last_activity
+            }
+            for row in rows if row.last_activity is not None
+        ]
+        mcq_list = [
+            {
+                "chapter_id": row.chapter_id,
+                "user_id": owner_id,
+                "mcq_attempts": int(row.attempts),
+                "mcq_avg_score": float(row.avg_score or 0),
+                "last_mcq_attempt": row.last_attempt
+            }
+            for row in rows if row.attempts
+        ]
+        try:
+            # Model inference is CPU-bound; keep it off the event loop
+            result["recommendations"], result["model_version"] = await anyio.to_thread.run_sync(recommend_from_data, chapters_list, time_list, mcq_list)
+        except FileNotFoundError:
+            # The charts are still useful without the model
+            result["recommendations_error"] = "ML model not available. Please train the model first."
+
+    return result
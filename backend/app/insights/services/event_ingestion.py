@@ -0,0 +1,117 @@
+"""
+Bulk ingestion of learning-session events sent by clients.
+
+A batch is validated with a constant number of queries (one for chapter ownership, one for
+already-seen idempotency keys) and stored with one multi-row INSERT plus one rollup upsert per
+table, however many events it carries.
+"""
+
+from datetime import datetime, timezone, timedelta
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.chapters import Chapters
+from app.models.learning_sessions import LearningSessions
+from app.insights.services.activity_rollups import insert_learning_sessions
+from app.purge.services.purge import not_purging
+
+VALID_ACTIVITY_TYPES = ("summary", "ask_question", "mcq", "view_content")
+MAX_EVENTS_PER_BATCH = 1000
+MAX_EVENT_DURATION_SECONDS = 4 * 3600
+# Clients may buffer events offline for a while, but not backfill history
+MAX_EVENT_AGE = timedelta(days=7)
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+def _owned_chapters(db: Session, owner_id: int, events: list) -> set:
+    chapter_ids = {event["chapter_id"] for event in events}
+    rows = db.query(Chapters.id, Chapters.course_id).filter(
+        Chapters.owner_id == owner_id,
+        Chapters.id.in_(chapter_ids),
+        *not_purging(Chapters.owner_id, Chapters.course_id, Chapters.id)
+    ).all()
+    return {(row.course_id, row.id) for row in rows}
+
+
+def _seen_event_ids(db: Session, owner_id: int, events: list) -> set:
+    rows = db.query(LearningSessions.client_event_id).filter(
+        LearningSessions.owner_id == owner_id,
+        LearningSessions.client_event_id.in_({event["event_id"] for event in events})
+    ).all()
+    return {row.client_event_id for row in rows}
+
+
+def _prepare_rows(db: Session, owner_id: int, events: list):
+    """ Split a batch into rows to insert, duplicate event ids and rejected events. """
+    now = datetime.now(timezone.utc)
+    owned = _owned_chapters(db, owner_id, events)
+    seen = _seen_event_ids(db, owner_id, events)
+
+    rows, duplicates, rejected = [], [], []
+    for index, event in enumerate(events):
+        event_id = event["event_id"]
+        if event_id in seen:
+            duplicates.append(event_id)
+            continue
+
+        session_end = event.get("session_end") or now
+        if session_end.tzinfo is None:
+            session_end = session_end.replace(tzinfo=timezone.utc)
+
+        if (event["course_id"], event["chapter_id"]) not in owned:
+            detail = "Chapter not found"
+        elif event["activity_type"] not in VALID_ACTIVITY_TYPES:
+            detail = f"activity_type must be one of {VALID_ACTIVITY_TYPES}"
+        elif not 1 <= event["duration_seconds"] <= MAX_EVENT_DURATION_SECONDS:
+            detail = f"duration_seconds must be between 1 and {MAX_EVENT_DURATION_SECONDS}"
+        elif session_end > now + MAX_CLOCK_SKEW or session_end < now - MAX_EVENT_AGE:
+            detail = "session_end is outside the accepted time window"
+        else:
+            detail = None
+
+        if detail is not None:
+            rejected.append({"index": index, "event_id": event_id, "detail": detail})
+            continue
+
+        # Repeated ids inside one batch count once
+        seen.add(event_id)
+        rows.append({
+            "owner_id": owner_id,
+            "course_id": event["course_id"],
+            "chapter_id": event["chapter_id"],
+            "activity_type": event["activity_type"],
+            "session_start": session_end - timedelta(seconds=event["duration_seconds"]),
+            "session_end": session_end,
+            "duration_seconds": event["duration_seconds"],
+            "is_valid": True,
+            "updated_at": now,
+            "client_event_id": event_id
+        })
+    return rows, duplicates, rejected
+
+
+def ingest_learning_events(db: Session, owner_id: int, events: list) -> dict:
+    """
+    Validate and store a batch of events (dicts with event_id, course_id, chapter_id,
+    activity_type, duration_seconds and optional session_end). Events whose event_id was
+    already stored are skipped, so clients can safely resend a batch after a timeout.
+    Commits. Returns counts of accepted and duplicate events and the rejected ones.
+    """
+    for attempt in range(2):
+        rows, duplicates, rejected = _prepare_rows(db, owner_id, events)
+        try:
+            insert_learning_sessions(db, rows)
+            db.commit()
+            break
+        except IntegrityError:
+            # A concurrent retry of the same batch stored some ids first; re-check once
+            db.rollback()
+            if attempt == 1:
+                raise
+
+    return {
+        "accepted": len(rows),
+        "duplicates": len(duplicates),
+        "rejected": rejected
+    }
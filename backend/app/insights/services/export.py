@@ -0,0 +1,169 @@
+"""
+Streaming export of learning history (learning sessions and MCQ attempts) to CSV or Parquet.
+
+Rows are read through a server-side cursor (yield_per) in batches of EXPORT_BATCH_ROWS and
+encoded batch by batch: CSV as text chunks, Parquet as one row group per batch, with the
+bytes handed on as soon as the row group is written. Memory therefore stays at about one
+batch however many rows are exported. Used by the export route and the export_activity CLI.
+"""
+
+import csv
+import io
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.learning_sessions import LearningSessions
+from app.models.mcq_attempt import MCQAttempt
+
+EXPORT_BATCH_ROWS = int(os.getenv("EXPORT_BATCH_ROWS", "10000"))
+
+FORMATS = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# dataset -> (model, time column the date range applies to, exported columns and their types)
+DATASETS = {
+    "learning_sessions": (LearningSessions, "session_end", {
+        "id": "int",
+        "owner_id": "int",
+        "course_id": "int",
+        "chapter_id": "int",
+        "activity_type": "str",
+        "session_start": "datetime",
+        "session_end": "datetime",
+        "duration_seconds": "int",
+        "is_valid": "bool",
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    }),
+    "mcq_attempts": (MCQAttempt, "attempted_at", {
+        "id": "int",
+        "owner_id": "int",
+        "course_id": "int",
+        "chapter_id": "int",
+        "total_questions": "int",
+        "correct_answers": "int",
+        "score_percentage": "float",
+        "time_spent_seconds": "int",
+        "attempted_at": "datetime",
+    }),
+}
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+def export_batches(db: Session, dataset: str, owner_id: int | None = None, course_id: int | None = None, start_date: date | None = None, end_date: date | None = None) -> Iterator[list]:
+    """
+    Batches of row tuples (in DATASETS column order) for a user, or everyone when owner_id is
+    None, optionally limited to a course and to an inclusive range of UTC days. Rows come in
+    storage order, without sorting the result set first.
+    """
+    model, time_column, columns = DATASETS[dataset]
+    stmt = select(*[getattr(model, name) for name in columns])
+    if owner_id is not None:
+        stmt = stmt.where(model.owner_id == owner_id)
+    if course_id is not None:
+        stmt = stmt.where(model.course_id == course_id)
+    if start_date is not None:
+        stmt = stmt.where(getattr(model, time_column) >= _day_start(start_date))
+    if end_date is not None:
+        stmt = stmt.where(getattr(model, time_column) < _day_start(end_date + timedelta(days=1)))
+
+    # yield_per streams from a server-side cursor instead of buffering the whole result
+    result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_ROWS))
+    for partition in result.partitions():
+        yield partition
+
+
+def encode_csv(batches: Iterator[list], dataset: str) -> Iterator[bytes]:
+    """ A header, then one chunk of CSV lines per batch. """
+    columns = DATASETS[dataset][2]
+    datetime_indexes = [index for index, kind in enumerate(columns.values()) if kind == "datetime"]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(columns)
+    for batch in batches:
+        for row in batch:
+            if datetime_indexes:
+                row = list(row)
+                for index in datetime_indexes:
+                    if row[index] is not None:
+                        row[index] = row[index].isoformat()
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only when there were no rows
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+class _ChunkSink(io.RawIOBase):
+    """ Write-only file for ParquetWriter that keeps written bytes until they are taken. """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def encode_parquet(batches: Iterator[list], dataset: str) -> Iterator[bytes]:
+    """ One row group per batch, yielded as soon as it is written, then the footer. """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    types = {
+        "int": pa.int64(),
+        "str": pa.string(),
+        "bool": pa.bool_(),
+        "float": pa.float64(),
+        "datetime": pa.timestamp("us", tz="UTC"),
+    }
+    columns = DATASETS[dataset][2]
+    schema = pa.schema([(name, types[kind]) for name, kind in columns.items()])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for batch in batches:
+            # Row tuples to columns; the batch is the only thing held in memory
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*batch), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+ENCODERS = {
+    "csv": encode_csv,
+    "parquet": encode_parquet,
+}
+
+
+def export_stream(db: Session, dataset: str, export_format: str, **filters) -> Iterator[bytes]:
+    """ Encoded chunks of a dataset export; filters as for export_batches. """
+    return ENCODERS[export_format](export_batches(db, dataset, **filters), dataset)
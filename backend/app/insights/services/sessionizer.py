@@ -0,0 +1,187 @@
+"""
+Server-side sessionization of file viewing from client heartbeats.
+
+While a file is open the client sends a heartbeat every HEARTBEAT_INTERVAL_SECONDS. Heartbeats
+for the same (user, file) are merged into one open session as long as they arrive within
+SESSION_IDLE_GAP_SECONDS of each other; a longer gap closes the session and the next heartbeat
+opens a new one. Time is measured on the server: each heartbeat credits the time since the
+previous one, capped at the heartbeat interval, and the last heartbeat of a session credits
+one interval. A client that misses heartbeats therefore never gets time it did not spend,
+and a client that sends them too often gets no more than real time.
+
+Only closed sessions are written, in one batch per sweep. Open sessions live in memory,
+bounded by MAX_OPEN_SESSIONS: when full, the least recently active session is closed early
+and written with the next batch (it simply continues as a new session on its next heartbeat).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+import anyio
+
+from sqlalchemy.exc import IntegrityError
+
+from app.database import SessionLocal
+from app.insights.services.activity_rollups import insert_learning_sessions
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL_SECONDS = int(os.getenv("HEARTBEAT_INTERVAL_SECONDS", "30"))
+SESSION_IDLE_GAP_SECONDS = int(os.getenv("SESSION_IDLE_GAP_SECONDS", "90"))
+MAX_OPEN_SESSIONS = int(os.getenv("MAX_OPEN_SESSIONS", "50000"))
+SESSION_SWEEP_SECONDS = int(os.getenv("SESSION_SWEEP_SECONDS", "15"))
+
+ACTIVITY_TYPE = "view_content"
+
+
+@dataclass
+class OpenSession:
+    course_id: int
+    chapter_id: int
+    started_at: datetime
+    last_seen: datetime
+    active_seconds: float = 0.0
+
+
+class Sessionizer:
+
+    def __init__(self, interval_seconds: int, idle_gap_seconds: int, max_open: int):
+        self.interval = timedelta(seconds=interval_seconds)
+        self.idle_gap = timedelta(seconds=idle_gap_seconds)
+        self.max_open = max_open
+        # (owner_id, file_id) -> OpenSession, least recently active first
+        self._open: OrderedDict = OrderedDict()
+        self._closed: list = []
+        self._lock = threading.Lock()
+
+    def is_open(self, owner_id: int, file_id: int, course_id: int, chapter_id: int) -> bool:
+        """ Whether an open session exists for the file under this course and chapter (ownership was checked when it opened). """
+        with self._lock:
+            session = self._open.get((owner_id, file_id))
+            return session is not None and (session.course_id, session.chapter_id) == (course_id, chapter_id)
+
+    def heartbeat(self, owner_id: int, file_id: int, course_id: int, chapter_id: int, ended: bool = False, now: datetime | None = None):
+        """ Merge a heartbeat into the (user, file) session; ended=True closes it right away. """
+        if now is None:
+            now = datetime.now(timezone.utc)
+        key = (owner_id, file_id)
+
+        with self._lock:
+            session = self._open.get(key)
+            if session is not None and (now - session.last_seen > self.idle_gap or session.chapter_id != chapter_id):
+                self._close(key)
+                session = None
+
+            if session is None:
+                session = OpenSession(course_id=course_id, chapter_id=chapter_id, started_at=now, last_seen=now)
+                self._open[key] = session
+                while len(self._open) > self.max_open:
+                    self._close(next(iter(self._open)))
+            else:
+                session.active_seconds += min((now - session.last_seen).total_seconds(), self.interval.total_seconds())
+                session.last_seen = now
+                self._open.move_to_end(key)
+
+            if ended:
+                self._close(key, credit_interval=False)
+
+    def _close(self, key: tuple, credit_interval: bool = True):
+        """ Move an open session to the write batch. Must hold the lock. """
+        owner_id, _ = key
+        session = self._open.pop(key)
+        duration = session.active_seconds
+        session_end = session.last_seen
+        if credit_interval:
+            duration += self.interval.total_seconds()
+            session_end += self.interval
+        duration = int(duration)
+        if duration < 1:
+            return
+        self._closed.append({
+            "owner_id": owner_id,
+            "course_id": session.course_id,
+            "chapter_id": session.chapter_id,
+            "activity_type": ACTIVITY_TYPE,
+            "session_start": session.started_at,
+            "session_end": session_end,
+            "duration_seconds": duration,
+            "is_valid": True,
+            "updated_at": session_end
+        })
+
+    def sweep(self, now: datetime | None = None, close_all: bool = False) -> list:
+        """ Close sessions idle past the gap (or all of them) and take every closed session. """
+        if now is None:
+            now = datetime.now(timezone.utc)
+        with self._lock:
+            # Least recently active first: stop at the first session still within the gap
+            for key, session in list(self._open.items()):
+                if not close_all and now - session.last_seen <= self.idle_gap:
+                    break
+                self._close(key)
+            closed, self._closed = self._closed, []
+        return closed
+
+    def requeue(self, rows: list):
+        """ Put closed sessions that could not be written back at the front of the next batch. """
+        with self._lock:
+            self._closed[:0] = rows
+
+
+sessionizer = Sessionizer(HEARTBEAT_INTERVAL_SECONDS, SESSION_IDLE_GAP_SECONDS, MAX_OPEN_SESSIONS)
+
+
+def _write_sessions(rows: list):
+    db = SessionLocal()
+    try:
+        insert_learning_sessions(db, rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def flush_closed_sessions(close_all: bool = False) -> int:
+    """ Write every closed session in one transaction, with its rollups. Returns the number written. """
+    rows = sessionizer.sweep(close_all=close_all)
+    if not rows:
+        return 0
+    try:
+        _write_sessions(rows)
+        return len(rows)
+    except IntegrityError:
+        pass
+    except Exception:
+        # Database unavailable: keep the sessions for the next sweep
+        sessionizer.requeue(rows)
+        raise
+
+    # A session whose chapter was deleted meanwhile can never be written; drop only those
+    written = 0
+    for index, row in enumerate(rows):
+        try:
+            _write_sessions([row])
+            written += 1
+        except IntegrityError:
+            logger.warning("Dropping unwritable viewing session of user %s on chapter %s", row["owner_id"], row["chapter_id"])
+        except Exception:
+            sessionizer.requeue(rows[index:])
+            raise
+    return written
+
+
+async def sessionizer_worker():
+    """ Startup task: periodically closes idle sessions and writes the closed ones. """
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_SECONDS)
+        try:
+            await anyio.to_thread.run_sync(flush_closed_sessions)
+        except Exception:
+            logger.exception("Writing closed viewing sessions failed; retrying on the next sweep")
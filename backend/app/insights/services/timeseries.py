@@ -0,0 +1,139 @@
+from datetime import date, timedelta
+from collections import defaultdict
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+
+from app.models.daily_rollups import DailyActivityRollups, DailyMCQRollups
+
+
+GRANULARITIES = ("day", "week", "month")
+MAX_RANGE_DAYS = 3 * 366
+
+
+def _period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        # ISO weeks start on Monday
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _periods(start_date: date, end_date: date, granularity: str) -> list:
+    """ Start of every period overlapping the range, so empty periods still show up in charts """
+    periods = []
+    current = _period_start(start_date, granularity)
+    while current <= end_date:
+        periods.append(current)
+        current = _next_period(current, granularity)
+    return periods
+
+
+def _validate_range(start_date: date, end_date: date, granularity: str):
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {GRANULARITIES}, got: {granularity}")
+    if start_date > end_date:
+        raise ValueError("start_date must not be after end_date")
+    if (end_date - start_date).days > MAX_RANGE_DAYS:
+        raise ValueError(f"Date range must not exceed {MAX_RANGE_DAYS} days")
+
+
+async def get_activity_timeseries(db: AsyncSession, owner_id: int, start_date: date, end_date: date, granularity: str = "day", course_id: int | None = None):
+    """
+    Time spent per period between start_date and end_date (inclusive, UTC days), split by activity.
+    Reads only the daily rollups: at most one row per day, chapter and activity in the range.
+    """
+    _validate_range(start_date, end_date, granularity)
+
+    query = select(
+            DailyActivityRollups.activity_date,
+            DailyActivityRollups.activity_type,
+            func.sum(DailyActivityRollups.total_duration_seconds).label("time_spent_seconds"),
+            func.sum(DailyActivityRollups.session_count).label("session_count")
+        ).where(
+            DailyActivityRollups.owner_id == owner_id,
+            DailyActivityRollups.activity_date >= start_date,
+            DailyActivityRollups.activity_date <= end_date
+        )
+    if course_id is not None:
+        query = query.where(DailyActivityRollups.course_id == course_id)
+
+    rows = (await db.execute(query.group_by(
+        DailyActivityRollups.activity_date,
+        DailyActivityRollups.activity_type
+    ))).all()
+
+    buckets = {
+        period: {"time_spent_seconds": 0, "session_count": 0, "by_activity": defaultdict(int)}
+        for period in _periods(start_date, end_date, granularity)
+    }
+    for row in rows:
+        bucket = buckets[_period_start(row.activity_date, granularity)]
+        bucket["time_spent_seconds"] += int(row.time_spent_seconds or 0)
+        bucket["session_count"] += int(row.session_count or 0)
+        bucket["by_activity"][row.activity_type] += int(row.time_spent_seconds or 0)
+
+    return [
+        {
+            "period_start": period.isoformat(),
+            "time_spent_seconds": bucket["time_spent_seconds"],
+            "session_count": bucket["session_count"],
+            "by_activity": dict(bucket["by_activity"])
+        }
+        for period, bucket in buckets.items()
+    ]
+
+
+async def get_mcq_timeseries(db: AsyncSession, owner_id: int, start_date: date, end_date: date, granularity: str = "day", course_id: int | None = None):
+    """ MCQ attempts and scores per period between start_date and end_date (inclusive, UTC days), from the daily rollups. """
+    _validate_range(start_date, end_date, granularity)
+
+    query = select(
+            DailyMCQRollups.activity_date,
+            func.sum(DailyMCQRollups.attempt_count).label("attempts"),
+            func.sum(DailyMCQRollups.score_total).label("score_total"),
+            func.max(DailyMCQRollups.best_score).label("best_score"),
+            func.sum(DailyMCQRollups.correct_answers).label("correct_answers"),
+            func.sum(DailyMCQRollups.total_questions).label("total_questions")
+        ).where(
+            DailyMCQRollups.owner_id == owner_id,
+            DailyMCQRollups.activity_date >= start_date,
+            DailyMCQRollups.activity_date <= end_date
+        )
+    if course_id is not None:
+        query = query.where(DailyMCQRollups.course_id == course_id)
+
+    rows = (await db.execute(query.group_by(DailyMCQRollups.activity_date))).all()
+
+    buckets = {
+        period: {"attempts": 0, "score_total": 0.0, "best_score": None, "correct_answers": 0, "total_questions": 0}
+        for period in _periods(start_date, end_date, granularity)
+    }
+    for row in rows:
+        bucket = buckets[_period_start(row.activity_date, granularity)]
+        bucket["attempts"] += int(row.attempts or 0)
+        bucket["score_total"] += float(row.score_total or 0)
+        bucket["correct_answers"] += int(row.correct_answers or 0)
+        bucket["total_questions"] += int(row.total_questions or 0)
+        if row.best_score is not None and (bucket["best_score"] is None or row.best_score > bucket["best_score"]):
+            bucket["best_score"] = float(row.best_score)
+
+    return [
+        {
+            "period_start": period.isoformat(),
+            "attempts": bucket["attempts"],
+            "avg_score": round(bucket["score_total"] / bucket["attempts"], 2) if bucket["attempts"] else 0,
+            "best_score": round(bucket["best_score"], 2) if bucket["best_score"] is not None else None,
+            "correct_answers": bucket["correct_answers"],
+            "total_questions": bucket["total_questions"]
+        }
+        for period, bucket in buckets.items()
+    ]
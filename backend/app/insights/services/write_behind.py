@@ -0,0 +1,377 @@
+"""
+Write-behind buffer for activity inserts (learning sessions and MCQ attempts).
+
+Request handlers hand rows to the buffer and return without waiting for the database. A
+background thread drains a bounded queue and writes everything it collected, up to
+WRITE_BEHIND_BATCH_SIZE rows or WRITE_BEHIND_FLUSH_SECONDS, in one transaction together with
+the rollup updates. When the queue is full the caller waits briefly and then writes
+synchronously itself, so a slow database pushes back on request throughput instead of
+growing memory.
+
+When the database is unavailable, a failed batch goes back to the front of the flusher's
+queue and is retried with backoff until it is written; only rows the database rejects
+(integrity or data errors, e.g. their chapter was deleted meanwhile) are dropped. The queue
+is not drained during an outage, so it fills up and requests fall back to writing themselves.
+
+With WRITE_BEHIND_SPOOL_DIR set, every accepted row is first appended to a spool, and replayed
+at the next start if the process died or stopped before flushing it. The spool is a series of
+segment files: once the current one holds WRITE_BEHIND_SPOOL_SEGMENT_ROWS rows a new one is
+started, and a closed segment is deleted as soon as every row accepted before it was closed has
+been flushed. Rows leave the flusher in the order they were accepted (retries go back to the
+front), so that only takes a count, and the spool stays bounded under steady load instead of
+waiting for an idle moment. Each row carries a client_event_id, so a replay or retry never
+inserts a row that did reach the database.
+"""
+
+import fcntl
+import itertools
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError, DataError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.learning_sessions import LearningSessions
+from app.models.mcq_attempt import MCQAttempt
+from app.insights.services.activity_rollups import (
+    insert_learning_sessions,
+    insert_mcq_attempts,
+    learning_session_row,
+    mcq_attempt_row,
+)
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "true").lower() == "true"
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "500"))
+WRITE_BEHIND_FLUSH_SECONDS = float(os.getenv("WRITE_BEHIND_FLUSH_SECONDS", "1.0"))
+# How long a request waits for queue space before writing synchronously
+WRITE_BEHIND_PUT_TIMEOUT = float(os.getenv("WRITE_BEHIND_PUT_TIMEOUT", "0.25"))
+WRITE_BEHIND_SPOOL_DIR = os.getenv("WRITE_BEHIND_SPOOL_DIR", "")
+# fsync after every spooled row: survives power loss, not just process crashes, at a latency cost
+WRITE_BEHIND_SPOOL_FSYNC = os.getenv("WRITE_BEHIND_SPOOL_FSYNC", "false").lower() == "true"
+WRITE_BEHIND_SPOOL_SEGMENT_ROWS = int(os.getenv("WRITE_BEHIND_SPOOL_SEGMENT_ROWS", "10000"))
+
+# Longest wait between flush attempts while the database is unavailable
+MAX_RETRY_BACKOFF_SECONDS = 30
+
+LEARNING_SESSION = "learning_session"
+MCQ_ATTEMPT = "mcq_attempt"
+
+MODELS = {
+    LEARNING_SESSION: LearningSessions,
+    MCQ_ATTEMPT: MCQAttempt,
+}
+
+DATETIME_COLUMNS = ("session_start", "session_end", "updated_at", "attempted_at")
+
+
+def _encode(kind: str, row: dict) -> str:
+    return json.dumps({
+        "kind": kind,
+        "row": {k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()}
+    })
+
+
+def _decode(line: str):
+    record = json.loads(line)
+    row = record["row"]
+    for column in DATETIME_COLUMNS:
+        if row.get(column) is not None:
+            row[column] = datetime.fromisoformat(row[column])
+    return record["kind"], row
+
+
+def _write_batch(db: Session, batch: list):
+    """ Insert a batch of (kind, row) records with their rollups. The caller commits. """
+    insert_learning_sessions(db, [row for kind, row in batch if kind == LEARNING_SESSION])
+    insert_mcq_attempts(db, [row for kind, row in batch if kind == MCQ_ATTEMPT])
+
+
+def _drop_stored(db: Session, batch: list) -> list:
+    """ Records of a replayed batch whose client_event_id is not in the database yet. """
+    remaining = []
+    for kind, model in MODELS.items():
+        rows = [row for k, row in batch if k == kind]
+        by_owner = {}
+        for row in rows:
+            by_owner.setdefault(row["owner_id"], []).append(row)
+        for owner_id, owner_rows in by_owner.items():
+            stored = {
+                r.client_event_id for r in db.query(model.client_event_id).filter(
+                    model.owner_id == owner_id,
+                    model.client_event_id.in_([row["client_event_id"] for row in owner_rows])
+                ).all()
+            }
+            remaining.extend((kind, row) for row in owner_rows if row["client_event_id"] not in stored)
+    return remaining
+
+
+class WriteBehindBuffer:
+
+    def __init__(self, max_pending: int, batch_size: int, flush_seconds: float, spool_dir: str = "", spool_segment_rows: int = WRITE_BEHIND_SPOOL_SEGMENT_ROWS):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.spool_dir = spool_dir
+        self.spool_segment_rows = spool_segment_rows
+        self._queue = queue.Queue(maxsize=max_pending)
+        # Records that are not written yet although they left the queue (failed flushes, spool
+        # replay); only the flusher thread touches it once started
+        self._retry = []
+        # Records accepted (spooled or replayed) and records done with (written or dropped)
+        # since start; every record accepted before the done-th one is done as well
+        self._accepted = 0
+        self._done = 0
+        self._spool_lock_file = None
+        self._spool_slot = None
+        self._spool = None
+        self._spool_generation = 0
+        self._spool_rows = 0
+        # (path, accepted count when it was closed) of spool segments still needed for replay
+        self._closed_segments = []
+        # Serializes spool appends with segment rotation and deletion
+        self._spool_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # Lifecycle
+
+    def start(self):
+        """ Claim a spool and queue what a previous process left in it, then start the flusher thread. """
+        if self.spool_dir:
+            self._claim_spool()
+            self._retry = self._read_spool()
+            self._accepted = len(self._retry)
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0):
+        """ Flush everything still queued and stop the flusher. """
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._spool is not None:
+            self._spool.close()
+            self._spool_lock_file.close()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopping.is_set()
+
+    # Producers
+
+    def submit(self, kind: str, row: dict) -> bool:
+        """
+        Queue a row for the next flush. Returns False if the buffer is stopped or stayed full
+        for WRITE_BEHIND_PUT_TIMEOUT; the caller must then write the row itself.
+        """
+        if not self.running:
+            return False
+        row = {**row, "client_event_id": uuid.uuid4().hex}
+        with self._spool_lock:
+            try:
+                self._queue.put((kind, row), timeout=WRITE_BEHIND_PUT_TIMEOUT)
+            except queue.Full:
+                return False
+            self._accepted += 1
+            if self._spool is not None:
+                self._spool.write(_encode(kind, row) + "\n")
+                self._spool.flush()
+                if WRITE_BEHIND_SPOOL_FSYNC:
+                    os.fsync(self._spool.fileno())
+                self._spool_rows += 1
+        return True
+
+    # Flusher
+
+    def _next_batch(self) -> tuple:
+        """
+        (records, replay). Records that were not written before come first; they may have
+        reached the database (a spool replay, a commit whose reply was lost), so replay is set.
+        """
+        if self._retry:
+            batch, self._retry = self._retry[:self.batch_size], self._retry[self.batch_size:]
+            return batch, True
+
+        batch = []
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch, False
+
+    def _run(self):
+        failures = 0
+        while not (self._stopping.is_set() and self._queue.empty() and not self._retry):
+            batch, replay = self._next_batch()
+            if batch:
+                # _flush takes back from the count whatever it requeues
+                self._done += len(batch)
+                if self._flush(batch, replay):
+                    failures = 0
+                elif self._stopping.is_set():
+                    # Shutting down while the database is unavailable: what is left stays in the spool
+                    logger.error("Stopping write-behind with %d rows unwritten", len(self._retry) + self._queue.qsize())
+                    return
+                else:
+                    # stop() cuts the wait short
+                    self._stopping.wait(min(2 ** failures, MAX_RETRY_BACKOFF_SECONDS))
+                    failures += 1
+            self._compact_spool()
+
+    def _requeue(self, records: list):
+        self._retry[:0] = records
+        self._done -= len(records)
+
+    def _flush(self, batch: list, replay: bool = False) -> bool:
+        """
+        Write a batch in one transaction. Returns False if the database failed for another
+        reason than rejecting a row; the unwritten records are then requeued for a retry.
+        """
+        db = SessionLocal()
+        try:
+            if replay:
+                batch = _drop_stored(db, batch)
+            _write_batch(db, batch)
+            db.commit()
+            return True
+        except (IntegrityError, DataError):
+            db.rollback()
+        except Exception:
+            db.rollback()
+            logger.exception("Write-behind flush of %d rows failed; retrying", len(batch))
+            self._requeue(batch)
+            return False
+        finally:
+            db.close()
+
+        # A row is permanently invalid (e.g. its chapter was deleted meanwhile);
+        # write the rest one by one so it cannot hold the whole batch back
+        for index, record in enumerate(batch):
+            db = SessionLocal()
+            try:
+                _write_batch(db, [record])
+                db.commit()
+            except (IntegrityError, DataError):
+                db.rollback()
+                logger.exception("Dropping unwritable %s row: %s", record[0], _encode(*record))
+            except Exception:
+                db.rollback()
+                logger.exception("Write-behind flush of %d rows failed; retrying", len(batch) - index)
+                self._requeue(batch[index:])
+                return False
+            finally:
+                db.close()
+        return True
+
+    # Spool
+
+    def _claim_spool(self):
+        """ Lock the first free spool slot; slots held by live workers are skipped, dead workers' are reclaimed. """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        for slot in itertools.count():
+            lock_file = open(os.path.join(self.spool_dir, f"spool-{slot}.lock"), "a")
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                lock_file.close()
+                continue
+            self._spool_lock_file, self._spool_slot = lock_file, slot
+            return
+
+    def _segment_path(self, generation: int) -> str:
+        return os.path.join(self.spool_dir, f"spool-{self._spool_slot}.{generation}.jsonl")
+
+    def _read_spool(self) -> list:
+        """ Records left in the claimed slot's segments, oldest first; the segments stay until they are written. """
+        prefix = f"spool-{self._spool_slot}."
+        generations = sorted(
+            int(name[len(prefix):-len(".jsonl")]) for name in os.listdir(self.spool_dir)
+            if name.startswith(prefix) and name.endswith(".jsonl")
+        )
+        records = []
+        for generation in generations:
+            path = self._segment_path(generation)
+            with open(path) as segment:
+                records.extend(_decode(line) for line in segment if line.strip())
+            self._closed_segments.append((path, len(records)))
+        self._spool_generation = generations[-1] + 1 if generations else 0
+        if records:
+            logger.info("Replaying %d spooled write-behind rows", len(records))
+        return records
+
+    def _open_segment(self):
+        self._spool = open(self._segment_path(self._spool_generation), "a")
+        self._spool_rows = 0
+
+    def _compact_spool(self):
+        """ Delete the segments whose rows were all flushed, and start a new one when the current one is full. """
+        if self._spool is None:
+            return
+        with self._spool_lock:
+            while self._closed_segments and self._closed_segments[0][1] <= self._done:
+                os.remove(self._closed_segments.pop(0)[0])
+            if self._done == self._accepted:
+                # Fully drained: the current segment can simply be emptied
+                if self._spool_rows:
+                    self._spool.truncate(0)
+                    self._spool_rows = 0
+            elif self._spool_rows >= self.spool_segment_rows:
+                self._spool.close()
+                self._closed_segments.append((self._segment_path(self._spool_generation), self._accepted))
+                self._spool_generation += 1
+                self._open_segment()
+
+
+_buffer: WriteBehindBuffer | None = None
+
+
+def start_write_behind():
+    global _buffer
+    if WRITE_BEHIND_ENABLED and _buffer is None:
+        _buffer = WriteBehindBuffer(
+            max_pending=WRITE_BEHIND_MAX_PENDING,
+            batch_size=WRITE_BEHIND_BATCH_SIZE,
+            flush_seconds=WRITE_BEHIND_FLUSH_SECONDS,
+            spool_dir=WRITE_BEHIND_SPOOL_DIR
+        )
+        _buffer.start()
+
+
+def stop_write_behind():
+    global _buffer
+    if _buffer is not None:
+        _buffer.stop()
+        _buffer = None
+
+
+def _submit_or_write(db: Session, kind: str, row: dict):
+    if _buffer is not None and _buffer.submit(kind, row):
+        return
+    # Buffer disabled, stopped or full: write in the request instead
+    _write_batch(db, [(kind, row)])
+    db.commit()
+
+
+def queue_learning_session(db: Session, owner_id: int, course_id: int, chapter_id: int, activity_type: str, duration_seconds: int):
+    """ Record a valid session that ended now, through the buffer when possible. Commits when it writes directly. """
+    _submit_or_write(db, LEARNING_SESSION, learning_session_row(owner_id, course_id, chapter_id, activity_type, duration_seconds))
+
+
+def queue_mcq_attempt(db: Session, owner_id: int, course_id: int, chapter_id: int, total_questions: int, correct_answers: int, score_percentage: float, time_spent_seconds: int | None = None):
+    """ Record an MCQ attempt made now, through the buffer when possible. Commits when it writes directly. """
+    _submit_or_write(db, MCQ_ATTEMPT, mcq_attempt_row(owner_id, course_id, chapter_id, total_questions, correct_answers, score_percentage, time_spent_seconds))
@@ -1,18 +1,29 @@
 """FastAPI application setup and router registration."""
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.models import Base
-from app.database import engine
-from app.routes import auth, users, courses, chapters, chapter_file
+from app.routes import auth, users, courses, chapters, chapter_file, upload_sessions
 from app.rag.routes import summarize, create_mcq, ask_question
-from app.insights.routes import activity_insights, total_time_insights, mcq_insights
+from app.insights.routes import activity_insights, total_time_insights, mcq_insights, timeseries_insights, dashboard_insights, learning_events, export
 from app.ml.route import recommendation
+from app.search.routes import search
+from app.purge.routes import purge_jobs
+from app.purge.services.purge import purge_worker
+from app.insights.services.write_behind import start_write_behind, stop_write_behind
+from app.insights.services.sessionizer import sessionizer_worker, flush_closed_sessions
+from app.ml.service.model_store import preload_model, model_reload_worker
+from app.storage import close_storage
+from app.database import async_engine, replica_engines
+from app.replicas import LAST_WRITE_HEADER
+import asyncio
+import anyio
 import os
 from dotenv import load_dotenv
 
-app = FastAPI()
+# orjson renders the validated response models several times faster than the stdlib encoder
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Configure CORS for the frontend origins
 origins = os.getenv("CORS_ORIGINS", "")
@@ -24,10 +35,61 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Read by the frontend for read-your-writes across workers (see app.replicas)
+    expose_headers=[LAST_WRITE_HEADER],
 )
 
-# Create database tables if they do not exist
-Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+async def start_purge_worker():
+    # Picks up purge jobs left unfinished by a previous process
+    app.state.purge_worker = asyncio.create_task(purge_worker())
+
+
+@app.on_event("startup")
+async def start_activity_write_behind():
+    # Replays rows spooled by a previous process before accepting new ones
+    await anyio.to_thread.run_sync(start_write_behind)
+
+
+@app.on_event("shutdown")
+async def flush_activity_write_behind():
+    await anyio.to_thread.run_sync(stop_write_behind)
+
+
+@app.on_event("startup")
+async def start_sessionizer_worker():
+    app.state.sessionizer_worker = asyncio.create_task(sessionizer_worker())
+
+
+@app.on_event("shutdown")
+async def close_viewing_sessions():
+    # Open viewing sessions only live in memory; write them out before exiting
+    app.state.sessionizer_worker.cancel()
+    await anyio.to_thread.run_sync(flush_closed_sessions, True)
+
+
+@app.on_event("startup")
+async def start_model_reload_worker():
+    # Unpickle the recommendation model once, before the first request needs it
+    await anyio.to_thread.run_sync(preload_model)
+    app.state.model_reload_worker = asyncio.create_task(model_reload_worker())
+
+
+@app.on_event("shutdown")
+async def stop_model_reload_worker():
+    app.state.model_reload_worker.cancel()
+
+
+@app.on_event("shutdown")
+async def shutdown_storage():
+    await close_storage()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+    for replica_engine in replica_engines:
+        await replica_engine.dispose()
 
 
 @app.get("/")
@@ -39,10 +101,17 @@ app.include_router(users.router)
 app.include_router(courses.router)
 app.include_router(chapters.router)
 app.include_router(chapter_file.router)
+app.include_router(upload_sessions.router)
 app.include_router(summarize.router)
 app.include_router(create_mcq.router)
 app.include_router(ask_question.router)
 app.include_router(activity_insights.router)
 app.include_router(total_time_insights.router)
 app.include_router(mcq_insights.router)
-app.include_router(recommendation.router)
\ No newline at end of file
+app.include_router(timeseries_insights.router)
+app.include_router(dashboard_insights.router)
+app.include_router(learning_events.router)
+app.include_router(export.router)
+app.include_router(recommendation.router)
+app.include_router(search.router)
+app.include_router(purge_jobs.router)
\ No newline at end of file
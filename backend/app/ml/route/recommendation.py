@@ -2,11 +2,14 @@
 
 from typing import Annotated
 from fastapi import APIRouter, Depends, status, HTTPException, Query
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 
-from app.routes.auth import db_dependency
+from app.routes.auth import read_db_dependency
 from app.routes.users import user_dependency
+from app.routes.etags import data_etag_dependency
 from app.ml.service.recommendation_service import get_recommendations
+from app.ml.service.model_store import model_holder
 
 router = APIRouter(
     prefix="/insights",
@@ -14,9 +17,29 @@ router = APIRouter(
 )
 
 
-@router.get("/recommendation")
-def get_chapter_recommendations(
-    db: db_dependency,
+class Recommendation(BaseModel):
+    chapter_id: int
+    chapter_name: str
+    course_id: int
+    recommendation: str
+    predicted_state: str
+    priority: int
+    inactive_days: int
+
+
+class RecommendationsResponse(BaseModel):
+    recommendations: list[Recommendation]
+    count: int
+    model_version: str | None  # None only when there were no chapters to score
+
+
+# Recommendations change with the model too: a reload invalidates the tags
+model_data_etag = data_etag_dependency(lambda: model_holder.version)
+
+
+@router.get("/recommendation", response_model=RecommendationsResponse, dependencies=[model_data_etag])
+async def get_chapter_recommendations(
+    db: read_db_dependency,
     user: user_dependency,
     course_id: Annotated[int, Query(gt=0, description="Course ID to get recommendations for")]
 ):
@@ -36,10 +59,11 @@ def get_chapter_recommendations(
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     try:
-        recommendations = get_recommendations(db=db, user_id=user.get("id"), course_id=course_id)
+        recommendations, model_version = await get_recommendations(db=db, user_id=user.get("id"), course_id=course_id)
         return {
             "recommendations": recommendations,
-            "count": len(recommendations)
+            "count": len(recommendations),
+            "model_version": model_version
         }
     except FileNotFoundError as e:
         raise HTTPException(
@@ -0,0 +1,127 @@
+"""
+Process-wide holder of the recommendation model and its label encoder.
+
+The artifacts are unpickled once and shared by every request. A startup task polls the
+artifact files every MODEL_RELOAD_SECONDS and, when they changed, loads the new pair in a
+worker thread and swaps it in with a single reference assignment: a request always sees a
+model and encoder from the same load, and requests keep being served from the old pair while
+the new one loads. A pair that fails to load (e.g. still being written) is retried on the
+next poll; the old one stays in service meanwhile.
+
+Changes are detected by file mtime and size. If MODEL_DIR holds a manifest.json, only the
+manifest is watched: training should write both pickles first and the manifest last, so a
+half-written pair is never picked up. The manifest's "version" then names the model; without
+one the version is a hash of the two artifact files.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+
+import anyio
+import joblib
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = os.getenv("MODEL_DIR", os.path.join(os.path.dirname(__file__), "../ml_model"))
+MODEL_RELOAD_SECONDS = float(os.getenv("MODEL_RELOAD_SECONDS", "10"))
+
+MODEL_FILE = "model.pkl"
+LABEL_ENCODER_FILE = "label_encoder.pkl"
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    model: object
+    label_encoder: object
+    version: str
+
+
+def _content_version(paths: list) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+class ModelHolder:
+
+    def __init__(self, model_dir: str):
+        self.model_path = os.path.join(model_dir, MODEL_FILE)
+        self.label_encoder_path = os.path.join(model_dir, LABEL_ENCODER_FILE)
+        self.manifest_path = os.path.join(model_dir, MANIFEST_FILE)
+        self._loaded: LoadedModel | None = None
+        self._signature = None
+        # One load at a time; readers never take it
+        self._load_lock = threading.Lock()
+
+    @property
+    def version(self) -> str | None:
+        loaded = self._loaded
+        return loaded.version if loaded is not None else None
+
+    def _current_signature(self):
+        """ What identifies the artifacts on disk right now; None while they are missing. """
+        watched = [self.manifest_path] if os.path.exists(self.manifest_path) else [self.model_path, self.label_encoder_path]
+        try:
+            return tuple((path, stat.st_mtime_ns, stat.st_size) for path, stat in ((path, os.stat(path)) for path in watched))
+        except FileNotFoundError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """ Load the artifacts if they changed since the last load. Returns whether a new pair was swapped in. """
+        with self._load_lock:
+            signature = self._current_signature()
+            if signature is None or signature == self._signature:
+                return False
+
+            model = joblib.load(self.model_path)
+            label_encoder = joblib.load(self.label_encoder_path)
+            if os.path.exists(self.manifest_path):
+                with open(self.manifest_path) as f:
+                    version = str(json.load(f)["version"])
+            else:
+                version = _content_version([self.model_path, self.label_encoder_path])
+
+            self._loaded = LoadedModel(model=model, label_encoder=label_encoder, version=version)
+            self._signature = signature
+            logger.info("Loaded recommendation model version %s", version)
+            return True
+
+    def get(self) -> LoadedModel:
+        """ The current model and encoder. Loads them on first use; raises FileNotFoundError if never trained. """
+        loaded = self._loaded
+        if loaded is not None:
+            return loaded
+        self.reload_if_changed()
+        if self._loaded is None:
+            raise FileNotFoundError("Model files not found. Please train the model first.")
+        return self._loaded
+
+
+model_holder = ModelHolder(MODEL_DIR)
+
+
+def preload_model():
+    """ Startup: load the model before the first request needs it, if it was trained. """
+    try:
+        model_holder.reload_if_changed()
+    except Exception:
+        logger.exception("Loading the recommendation model failed; retrying on the next poll")
+
+
+async def model_reload_worker():
+    """ Startup task: swaps in retrained artifacts without a restart. """
+    while True:
+        await asyncio.sleep(MODEL_RELOAD_SECONDS)
+        try:
+            await anyio.to_thread.run_sync(model_holder.reload_if_changed)
+        except Exception:
+            logger.exception("Reloading the recommendation model failed; keeping version %s", model_holder.version)
@@ -1,47 +1,60 @@
 """Recommendation Service for ML-based chapter recommendations."""
 
-import os
-import joblib
-import pandas as pd
-from datetime import timezone
-from sqlalchemy.orm import Session
-from sqlalchemy import func, case
+import warnings
+
+import anyio
+import numpy as np
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, case
 
 from app.models.chapters import Chapters
-from app.models.learning_sessions import LearningSessions
+from app.models.activity_rollups import ActivityRollups
 from app.models.mcq_attempt import MCQAttempt
+from app.ml.service.model_store import model_holder
 
+# Model inputs, in training order
+FEATURE_COLUMNS = ["time_summary", "time_ask", "time_mcq", "mcq_attempts", "inactive_days"]
 
-def _load_model():
-    """Load the trained model and label encoder from disk."""
-    MODEL_DIR = os.path.join(os.path.dirname(__file__), "../ml_model")
-    MODEL_PATH = os.path.join(MODEL_DIR, "model.pkl")
-    LABEL_ENCODER_PATH = os.path.join(MODEL_DIR, "label_encoder.pkl")
-    
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(LABEL_ENCODER_PATH):
-        raise FileNotFoundError("Model files not found. Please train the model first.")
-    
-    model = joblib.load(MODEL_PATH)
-    label_encoder = joblib.load(LABEL_ENCODER_PATH)
-    
-    return model, label_encoder
+# Map states to priority (lower number = higher priority)
+PRIORITY_MAP = {
+    "revise_urgent": 0,
+    "practice_more": 1,
+    "on_track": 2,
+    "mastered": 3
+}
+
+# Activity time columns and how messages name them, in message order
+ACTIVITY_LABELS = {
+    "view_content": "Viewing Content",
+    "time_summary": "Summarizing",
+    "time_ask": "Asking Questions",
+    "time_mcq": "MCQ Practice"
+}
 
+# Per-chapter columns the recommendation records are built from
+RECORD_COLUMNS = ["chapter_id", "chapter_name", "course_id", "mcq_avg_score", "total_time", "inactive_days", *ACTIVITY_LABELS]
 
-def _fetch_latest_data_from_db(db: Session, user_id: int, course_id: int):
+# The model was fitted on a DataFrame and is scored on the FEATURE_COLUMNS array;
+# _predict checks the column order, so sklearn's warning about unnamed columns is noise
+warnings.filterwarnings("ignore", message="X does not have valid feature names", category=UserWarning)
+
+
+async def _fetch_latest_data_from_db(db: AsyncSession, user_id: int, course_id: int):
     """
     Fetch latest data from database.
     Returns chapters data, time data, and MCQ data.
     """
     # Fetch chapter data
-    chapters_data = db.query(
+    chapters_data = (await db.execute(select(
         Chapters.id.label("chapter_id"),
         Chapters.chapter_title.label("chapter_name"),
         Chapters.course_id,
         Chapters.owner_id.label("user_id")
-    ).filter(
+    ).where(
         Chapters.owner_id == user_id,
         Chapters.course_id == course_id
-    ).all()
+    ))).all()
     
     chapters_list = [
         {
@@ -53,49 +66,48 @@ def _fetch_latest_data_from_db(db: Session, user_id: int, course_id: int):
         for row in chapters_data
     ]
     
-    # Fetch time/activity data
-    time_data = db.query(
-    LearningSessions.chapter_id,
-    LearningSessions.owner_id.label("user_id"),
+    # Fetch time/activity data, pivoted from the per-activity rollups
+    time_data = (await db.execute(select(
+    ActivityRollups.chapter_id,
+    ActivityRollups.owner_id.label("user_id"),
 
     func.sum(
         case(
-            (LearningSessions.activity_type == "view_content", LearningSessions.duration_seconds),
+            (ActivityRollups.activity_type == "view_content", ActivityRollups.total_duration_seconds),
             else_=0
         )
     ).label("view_content"),
 
     func.sum(
         case(
-            (LearningSessions.activity_type == "summary", LearningSessions.duration_seconds),
+            (ActivityRollups.activity_type == "summary", ActivityRollups.total_duration_seconds),
             else_=0
         )
     ).label("time_summary"),
 
     func.sum(
         case(
-            (LearningSessions.activity_type == "ask_question", LearningSessions.duration_seconds),
+            (ActivityRollups.activity_type == "ask_question", ActivityRollups.total_duration_seconds),
             else_=0
         )
     ).label("time_ask"),
 
     func.sum(
         case(
-            (LearningSessions.activity_type == "mcq", LearningSessions.duration_seconds),
+            (ActivityRollups.activity_type == "mcq", ActivityRollups.total_duration_seconds),
             else_=0
         )
     ).label("time_mcq"),
 
-    func.max(LearningSessions.session_end).label("last_activity")
+    func.max(ActivityRollups.last_activity).label("last_activity")
 
-).filter(
-    LearningSessions.owner_id == user_id,
-    LearningSessions.course_id == course_id,
-    LearningSessions.is_valid == True
+).where(
+    ActivityRollups.owner_id == user_id,
+    ActivityRollups.course_id == course_id
 ).group_by(
-    LearningSessions.chapter_id,
-    LearningSessions.owner_id
-).all()
+    ActivityRollups.chapter_id,
+    ActivityRollups.owner_id
+))).all()
 
     
     time_list = [
@@ -112,19 +124,19 @@ def _fetch_latest_data_from_db(db: Session, user_id: int, course_id: int):
     ]
     
     # Fetch MCQ data
-    mcq_data = db.query(
+    mcq_data = (await db.execute(select(
         MCQAttempt.chapter_id,
         MCQAttempt.owner_id.label("user_id"),
         func.count().label("mcq_attempts"),
         func.avg(MCQAttempt.score_percentage).label("mcq_avg_score"),
         func.max(MCQAttempt.attempted_at).label("last_mcq_attempt")
-    ).filter(
+    ).where(
         MCQAttempt.owner_id == user_id,
         MCQAttempt.course_id == course_id
     ).group_by(
         MCQAttempt.chapter_id,
         MCQAttempt.owner_id
-    ).all()
+    ))).all()
     
     mcq_list = [
         {
@@ -155,35 +167,45 @@ def _format_time(seconds):
         return f"{hours} hour{'s' if hours != 1 else ''}"
 
 
-def _generate_recommendation_message(chapter_name, mcq_avg_score, total_time, time_summary, time_ask, time_mcq, view_content, predicted_state, has_lower_score_chapters=False):
-    """Generate a descriptive recommendation message for a chapter."""
+def _activity_breakdown(view_content, time_summary, time_ask, time_mcq):
+    """Describe where a chapter's time went, e.g. "Viewing Content: 5 minutes, MCQ Practice: 30 seconds"; empty when there was none."""
+    times = (view_content, time_summary, time_ask, time_mcq)
+    return ", ".join(
+        f"{label}: {_format_time(time_sec)}"
+        for label, time_sec in zip(ACTIVITY_LABELS.values(), times)
+        if time_sec > 0
+    )
+
+
+def _activity_breakdowns(times):
+    """
+    _activity_breakdown for every chapter at once, from the per-activity seconds
+    (column name -> int array). Each distinct duration of a column is formatted only once.
+    """
+    parts = []
+    for name, label in ACTIVITY_LABELS.items():
+        values, inverse = np.unique(times[name], return_inverse=True)
+        texts = np.array([f"{label}: {_format_time(value)}" if value > 0 else "" for value in values.tolist()], dtype=object)
+        parts.append(texts[inverse.reshape(-1)])
+    return [", ".join(part for part in chapter_parts if part) for chapter_parts in zip(*parts)]
+
+
+def _generate_recommendation_message(chapter_name, mcq_avg_score, total_time, time_summary, time_ask, time_mcq, view_content, predicted_state, has_lower_score_chapters=False, activity_breakdown=None):
+    """
+    Generate a descriptive recommendation message for a chapter.
+    activity_breakdown is built from the times unless the caller precomputed it.
+    """
+    if activity_breakdown is None:
+        activity_breakdown = _activity_breakdown(view_content, time_summary, time_ask, time_mcq)
+
     # Special handling for chapters with excellent scores (>92%)
     if mcq_avg_score > 92:
-        # Calculate percentages for activity time distribution
-        activity_times = {
-            "Viewing Content": view_content,
-            "Summarizing": time_summary,
-            "Asking Questions": time_ask,
-            "MCQ Practice": time_mcq
-        }
-        
-        # Build activity breakdown message
-        activity_breakdown = []
-        for activity, time_sec in activity_times.items():
-            if time_sec > 0:
-                activity_breakdown.append(f"{activity}: {_format_time(time_sec)}")
-        
-        if not activity_breakdown:
-            activity_breakdown_str = "No activity recorded yet."
-        else:
-            activity_breakdown_str = ", ".join(activity_breakdown)
-        
         # Build message for excellent score chapters
         message_parts = [f"{chapter_name}"]
         message_parts.append(f"You have an excellent score of {mcq_avg_score:.1f}%")
         
-        if activity_breakdown_str != "No activity recorded yet.":
-            message_parts.append(f"You are spending time on: {activity_breakdown_str}")
+        if activity_breakdown:
+            message_parts.append(f"You are spending time on: {activity_breakdown}")
         
         if has_lower_score_chapters:
             message_parts.append("You can reduce time spent on this chapter and allocate it to chapters with lower scores to improve your overall performance")
@@ -193,25 +215,6 @@ def _generate_recommendation_message(chapter_name, mcq_avg_score, total_time, ti
         return ". ".join(message_parts) + "."
     
     # Regular recommendation logic for chapters with scores <= 92%
-    # Calculate percentages for activity time distribution
-    activity_times = {
-        "Viewing Content": view_content,
-        "Summarizing": time_summary,
-        "Asking Questions": time_ask,
-        "MCQ Practice": time_mcq
-    }
-    
-    # Build activity breakdown message
-    activity_breakdown = []
-    for activity, time_sec in activity_times.items():
-        if time_sec > 0:
-            activity_breakdown.append(f"{activity}: {_format_time(time_sec)}")
-    
-    if not activity_breakdown:
-        activity_breakdown_str = "No activity recorded yet."
-    else:
-        activity_breakdown_str = ", ".join(activity_breakdown)
-    
     # Generate suggestions based on predicted state and activity distribution
     suggestions = []
     
@@ -247,8 +250,8 @@ def _generate_recommendation_message(chapter_name, mcq_avg_score, total_time, ti
     else:
         message_parts.append("You haven't attempted any MCQs yet")
     
-    if activity_breakdown_str != "No activity recorded yet.":
-        message_parts.append(f"You are spending time on: {activity_breakdown_str}")
+    if activity_breakdown:
+        message_parts.append(f"You are spending time on: {activity_breakdown}")
     else:
         message_parts.append("You haven't spent any time on this chapter yet")
     
@@ -266,7 +269,10 @@ def _build_features(chapters_list, time_list, mcq_list):
     """
     Build features from raw data.
     Returns a DataFrame with features ready for model prediction.
+    The DataFrame form of _build_feature_arrays, for offline analysis; recommendations use the arrays.
     """
+    import pandas as pd
+    
     # Convert to DataFrames
     chapters_df = pd.DataFrame(chapters_list)
     time_df = pd.DataFrame(time_list)
@@ -290,16 +296,73 @@ def _build_features(chapters_list, time_list, mcq_list):
     df["total_time"] = df["time_summary"] + df["time_ask"] + df["time_mcq"] + df["view_content"]
     df["score_efficiency"] = df["mcq_avg_score"] / (df["total_time"] + 1)
     
-    # Calculate inactive_days
-    now = pd.Timestamp.now(tz=timezone.utc)
+    # Calculate inactive_days, in UTC calendar days like _inactive_days
+    today = pd.Timestamp.now(tz=timezone.utc).normalize()
     df["last_activity"] = pd.to_datetime(df["last_activity"], utc=True)
-    df["inactive_days"] = (now - df["last_activity"]).dt.days
+    df["inactive_days"] = (today - df["last_activity"].dt.normalize()).dt.days
     df["inactive_days"] = df["inactive_days"].fillna(999)
     
     return df
 
 
-def get_recommendations(db: Session, user_id: int, course_id: int):
+def _inactive_days(last_activity, today):
+    """
+    UTC calendar days since the day of the last activity, 999 if there was none. Naive
+    timestamps are UTC. Counting dates rather than 24-hour periods keeps the value fixed for
+    the whole UTC day, which the data ETags of the recommendation responses rely on.
+    """
+    if last_activity is None:
+        return 999
+    if last_activity.tzinfo is None:
+        last_activity = last_activity.replace(tzinfo=timezone.utc)
+    return (today - last_activity.astimezone(timezone.utc).date()).days
+
+
+def _build_feature_arrays(chapters_list, time_list, mcq_list):
+    """
+    Build features from raw data without pandas, for online inference.
+    Returns the RECORD_COLUMNS and FEATURE_COLUMNS of every chapter as arrays
+    (name -> array, in chapters_list order), with the same fills and derived values as
+    _build_features. The time and MCQ rows, one per chapter of the user, are joined to the
+    chapters by chapter_id through dict lookups.
+    """
+    times_by_chapter = {row["chapter_id"]: row for row in time_list}
+    mcq_by_chapter = {row["chapter_id"]: row for row in mcq_list}
+    chapter_ids = [chapter["chapter_id"] for chapter in chapters_list]
+    
+    # Chapters without activity or MCQ attempts join an empty row and are filled with 0
+    time_rows = [times_by_chapter.get(chapter_id, {}) for chapter_id in chapter_ids]
+    mcq_rows = [mcq_by_chapter.get(chapter_id, {}) for chapter_id in chapter_ids]
+    
+    features = {
+        "chapter_id": np.array(chapter_ids, dtype=np.int64),
+        "chapter_name": np.array([chapter["chapter_name"] for chapter in chapters_list], dtype=object),
+        "course_id": np.array([chapter["course_id"] for chapter in chapters_list], dtype=np.int64),
+    }
+    for name in ACTIVITY_LABELS:
+        features[name] = np.array([row.get(name) or 0 for row in time_rows], dtype=np.float64)
+    for name in ("mcq_attempts", "mcq_avg_score"):
+        features[name] = np.array([row.get(name) or 0 for row in mcq_rows], dtype=np.float64)
+    
+    # Calculate derived features
+    features["total_time"] = features["time_summary"] + features["time_ask"] + features["time_mcq"] + features["view_content"]
+    
+    today = datetime.now(timezone.utc).date()
+    features["inactive_days"] = np.array([_inactive_days(row.get("last_activity"), today) for row in time_rows], dtype=np.float64)
+    
+    return features
+
+
+def _predict(model, features):
+    """model.predict on the FEATURE_COLUMNS matrix of the chapters."""
+    fitted_columns = getattr(model, "feature_names_in_", None)
+    if fitted_columns is not None and list(fitted_columns) != FEATURE_COLUMNS:
+        raise ValueError(f"Model was fitted on {list(fitted_columns)}, expected {FEATURE_COLUMNS}")
+    X = np.column_stack([features[name] for name in FEATURE_COLUMNS])
+    return model.predict(X)
+
+
+async def get_recommendations(db: AsyncSession, user_id: int, course_id: int):
     """
     RecommendationService main function.
     
@@ -310,92 +373,107 @@ def get_recommendations(db: Session, user_id: int, course_id: int):
     4. Return recommendations
     
     Args:
-        db: Database session
+        db: Async database session
         user_id: ID of the user
         course_id: ID of the course to get recommendations for
     
     Returns:
-        List of recommendations sorted by priority for chapters in the specified course
+        List of recommendations sorted by priority for chapters in the specified course,
+        and the version of the model that made them
     """
     # Step 1: Fetch latest data from DB
-    chapters_list, time_list, mcq_list = _fetch_latest_data_from_db(db, user_id, course_id)
+    chapters_list, time_list, mcq_list = await _fetch_latest_data_from_db(db, user_id, course_id)
     
+    # Steps 2-4 are CPU-bound (feature building, model inference); run them off the event loop
+    return await anyio.to_thread.run_sync(recommend_from_data, chapters_list, time_list, mcq_list)
+
+
+def recommend_from_data(chapters_list, time_list, mcq_list):
+    """
+    Steps 2-4 of get_recommendations, for callers that already fetched the
+    chapter, time and MCQ rows in the shape _fetch_latest_data_from_db returns.
+    Returns the recommendations and the model version.
+    """
     if not chapters_list:
-        return []
+        return [], model_holder.version
     
     # Step 2: Build features
-    df = _build_features(chapters_list, time_list, mcq_list)
-    
-    # Step 3: Model.predict()
-    model, label_encoder = _load_model()
-    
-    # Select features for prediction
-    feature_columns = ["time_summary", "time_ask", "time_mcq", "mcq_attempts", "inactive_days"]
-    X = df[feature_columns]
+    features = _build_feature_arrays(chapters_list, time_list, mcq_list)
     
-    # Predict
-    predictions = model.predict(X)
-    predicted_states = label_encoder.inverse_transform(predictions)
-    df["predicted_state"] = predicted_states
+    # Step 3: Model.predict(), with the model and encoder of one load even if a reload swaps them meanwhile
+    loaded = model_holder.get()
+    predictions = _predict(loaded.model, features)
+    predicted_states = loaded.label_encoder.inverse_transform(predictions)
     
     # Step 4: Return recommendations
-    # Map states to priority (lower number = higher priority)
-    priority_map = {
-        "revise_urgent": 0,
-        "practice_more": 1,
-        "on_track": 2,
-        "mastered": 3
-    }
-    
-    df["priority"] = df["predicted_state"].map(priority_map)
-    
-    # Sort by priority and inactive_days
-    recommendations = df.sort_values(
-        by=["priority", "inactive_days"],
-        ascending=[True, False]
+    return _build_recommendations(features, predicted_states), loaded.version
+
+
+def _build_recommendations(features, predicted_states):
+    """
+    Recommendation records, most urgent first, from the chapters' columns (name -> array,
+    one entry per chapter; RECORD_COLUMNS) and their predicted states.
+
+    Priorities, the lower-score flags, the sort order and the activity texts are computed
+    column-wise; the records are then emitted in a single pass in sorted order.
+    """
+    predicted_states = np.asarray(predicted_states).astype(str)
+    
+    # Map states to priority, looking up each distinct state once
+    state_names, state_codes = np.unique(predicted_states, return_inverse=True)
+    priority = np.array([PRIORITY_MAP[name] for name in state_names.tolist()], dtype=np.int64)[state_codes.reshape(-1)]
+    
+    inactive_days = features["inactive_days"].astype(np.int64)
+    
+    # Sort by priority, then longest inactive first; lexsort is stable, so ties keep chapter order
+    order = np.lexsort((-inactive_days, priority))
+    
+    # Excellent (>92%) chapters are told to move time to lower scoring ones, if any chapter has one
+    mcq_avg_score = features["mcq_avg_score"].astype(float)
+    has_lower_score_chapters = bool(((mcq_avg_score > 0) & (mcq_avg_score < 92)).any())
+    lower_score_flags = (mcq_avg_score > 92) & has_lower_score_chapters
+    
+    times = {name: features[name].astype(np.int64) for name in ACTIVITY_LABELS}
+    activity_breakdowns = np.array(_activity_breakdowns(times), dtype=object)
+    
+    columns = zip(
+        features["chapter_id"].astype(np.int64)[order].tolist(),
+        features["chapter_name"][order].tolist(),
+        features["course_id"].astype(np.int64)[order].tolist(),
+        predicted_states[order].tolist(),
+        priority[order].tolist(),
+        inactive_days[order].tolist(),
+        mcq_avg_score[order].tolist(),
+        features["total_time"].astype(np.int64)[order].tolist(),
+        times["time_summary"][order].tolist(),
+        times["time_ask"][order].tolist(),
+        times["time_mcq"][order].tolist(),
+        times["view_content"][order].tolist(),
+        lower_score_flags[order].tolist(),
+        activity_breakdowns[order].tolist()
     )
     
-    # Convert to list of dictionaries with descriptive recommendations
-    # First, check if there are chapters with lower scores (for high-score chapter recommendations)
-    df_scores = df[df["mcq_avg_score"] > 0]["mcq_avg_score"]
-    has_lower_score_chapters = len(df_scores[df_scores < 92]) > 0 if len(df_scores) > 0 else False
-    
-    result = []
-    for _, row in recommendations.iterrows():
-        chapter_name = str(row["chapter_name"])
-        mcq_avg_score = float(row["mcq_avg_score"])
-        total_time = int(row["total_time"])
-        time_summary = int(row["time_summary"])
-        time_ask = int(row["time_ask"])
-        time_mcq = int(row["time_mcq"])
-        view_content = int(row["view_content"])
-        predicted_state = str(row["predicted_state"])
-        
-        # Check if this chapter has excellent score and if there are other chapters with lower scores
-        chapter_has_excellent_score = mcq_avg_score > 92
-        
-        # Generate descriptive recommendation message
-        recommendation_message = _generate_recommendation_message(
-            chapter_name=chapter_name,
-            mcq_avg_score=mcq_avg_score,
-            total_time=total_time,
-            time_summary=time_summary,
-            time_ask=time_ask,
-            time_mcq=time_mcq,
-            view_content=view_content,
-            predicted_state=predicted_state,
-            has_lower_score_chapters=has_lower_score_chapters if chapter_has_excellent_score else False
-        )
-        
-        result.append({
-            "chapter_id": int(row["chapter_id"]),
-            "chapter_name": chapter_name,
-            "course_id": int(row["course_id"]),
-            "recommendation": recommendation_message,
-            "predicted_state": predicted_state,
-            "priority": int(row["priority"]),
-            "inactive_days": int(row["inactive_days"])
-        })
-    
-    return result
-
+    return [
+        {
+            "chapter_id": chapter_id,
+            "chapter_name": str(chapter_name),
+            "course_id": course_id,
+            "recommendation": _generate_recommendation_message(
+                chapter_name=chapter_name,
+                mcq_avg_score=score,
+                total_time=total_time,
+                time_summary=time_summary,
+                time_ask=time_ask,
+                time_mcq=time_mcq,
+                view_content=view_content,
+                predicted_state=state,
+                has_lower_score_chapters=lower_score_flag,
+                activity_breakdown=activity_breakdown
+            ),
+            "predicted_state": state,
+            "priority": chapter_priority,
+            "inactive_days": chapter_inactive_days
+        }
+        for (chapter_id, chapter_name, course_id, state, chapter_priority, chapter_inactive_days, score,
+             total_time, time_summary, time_ask, time_mcq, view_content, lower_score_flag, activity_breakdown) in columns
+    ]
@@ -7,6 +7,13 @@ from app.models.chapters import Chapters
 from app.models.chapter_files import ChapterFiles
 from app.models.learning_sessions import LearningSessions
 from app.models.mcq_attempt import MCQAttempt
+from app.models.activity_rollups import ActivityRollups
+from app.models.daily_rollups import DailyActivityRollups, DailyMCQRollups
+from app.models.blobs import Blobs
+from app.models.file_index import FileDocuments, FilePages, FileTermPostings
+from app.models.upload_sessions import UploadSessions
+from app.models.purge_jobs import PurgeJobs
+from app.models.user_data_versions import UserDataVersions
 
 __all__ = [
     "Base",
@@ -16,5 +23,15 @@ __all__ = [
     "ChapterFiles",
     "LearningSessions",
     "MCQAttempt",
+    "ActivityRollups",
+    "DailyActivityRollups",
+    "DailyMCQRollups",
+    "Blobs",
+    "FileDocuments",
+    "FilePages",
+    "FileTermPostings",
+    "UploadSessions",
+    "PurgeJobs",
+    "UserDataVersions",
 ]
 
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime
+from app.database import Base
+
+
+class ActivityRollups(Base):
+    """ Running totals of valid learning sessions per chapter and activity. Maintained with every LearningSessions insert. """
+
+    __tablename__ = "activity_rollups"
+
+    owner_id                = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    course_id               = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    chapter_id              = Column(Integer, ForeignKey("chapters.id"), primary_key=True)
+    activity_type           = Column(String(50), primary_key=True)
+    total_duration_seconds  = Column(BigInteger, nullable=False, default=0)
+    session_count           = Column(Integer, nullable=False, default=0)
+    last_activity           = Column(DateTime(timezone=True), nullable=True)
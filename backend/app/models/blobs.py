@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, func
+from app.database import Base
+
+
+class Blobs(Base):
+    """ Content-addressed stored file, shared by every ChapterFiles row with the same SHA-256. """
+
+    __tablename__ = "blobs"
+
+    content_hash    = Column(String(64), primary_key=True)
+    storage_key     = Column(String(500), nullable=False)
+    file_size       = Column(BigInteger, nullable=False)
+    ref_count       = Column(Integer, nullable=False, default=0)
+    created_at      = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
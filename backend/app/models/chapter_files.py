@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func
+from sqlalchemy import Index, Column, Integer, String, ForeignKey, DateTime, func
 from app.database import Base
 
 
@@ -6,6 +6,10 @@ class ChapterFiles(Base):
     """Chapter files uploaded by users."""
 
     __tablename__ = "chapter_files"
+    __table_args__ = (
+        # Keyset pagination of the list endpoint
+        Index("ix_chapter_files_chapter_id_id", "chapter_id", "id"),
+    )
 
     id          = Column(Integer, primary_key=True, index=True)
     file_name   = Column(String(255), nullable=False)
@@ -13,6 +17,7 @@ class ChapterFiles(Base):
     file_type   = Column(String(50), nullable=False)
     mime_type   = Column(String(100), nullable=False)
     file_size   = Column(Integer, nullable=False)
+    content_hash = Column(String(64), ForeignKey("blobs.content_hash"), nullable=True, index=True)
 
     owner_id    = Column(Integer, ForeignKey("users.id"), nullable=False)
     chapter_id  = Column(Integer, ForeignKey("chapters.id"), nullable=False)
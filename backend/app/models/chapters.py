@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Index, Column, Integer, String, ForeignKey
 from app.database import Base
 
 
@@ -6,6 +6,10 @@ class Chapters(Base):
     """Chapters belonging to courses."""
 
     __tablename__ = "chapters"
+    __table_args__ = (
+        # Keyset pagination of the list endpoint
+        Index("ix_chapters_course_id_id", "course_id", "id"),
+    )
 
     id                  = Column(Integer, primary_key=True, index=True)
     chapter_title       = Column(String(255), nullable=False)
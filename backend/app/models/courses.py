@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Index, Column, Integer, String, ForeignKey
 from app.database import Base
 
 
@@ -6,6 +6,10 @@ class Courses(Base):
     """Courses created by users, one-to-many with chapters."""
 
     __tablename__ = "courses"
+    __table_args__ = (
+        # Keyset pagination of the list endpoint
+        Index("ix_courses_owner_id_id", "owner_id", "id"),
+    )
 
     id          = Column(Integer, primary_key=True, index=True)
     title       = Column(String(255), unique=True, nullable=False)
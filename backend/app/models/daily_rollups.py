@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, BigInteger, Float, String, Date, ForeignKey
+from app.database import Base
+
+
+class DailyActivityRollups(Base):
+    """ Valid learning session time per user, UTC day, chapter and activity. Feeds the date-range insights. """
+
+    __tablename__ = "daily_activity_rollups"
+
+    owner_id                = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    activity_date           = Column(Date, primary_key=True)
+    course_id               = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    chapter_id              = Column(Integer, ForeignKey("chapters.id"), primary_key=True)
+    activity_type           = Column(String(50), primary_key=True)
+    total_duration_seconds  = Column(BigInteger, nullable=False, default=0)
+    session_count           = Column(Integer, nullable=False, default=0)
+
+
+class DailyMCQRollups(Base):
+    """ MCQ attempt aggregates per user, UTC day and chapter. avg score is score_total / attempt_count. """
+
+    __tablename__ = "daily_mcq_rollups"
+
+    owner_id                = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    activity_date           = Column(Date, primary_key=True)
+    course_id               = Column(Integer, ForeignKey("courses.id"), primary_key=True)
+    chapter_id              = Column(Integer, ForeignKey("chapters.id"), primary_key=True)
+    attempt_count           = Column(Integer, nullable=False, default=0)
+    score_total             = Column(Float, nullable=False, default=0)
+    best_score              = Column(Float, nullable=True)
+    correct_answers         = Column(Integer, nullable=False, default=0)
+    total_questions         = Column(Integer, nullable=False, default=0)
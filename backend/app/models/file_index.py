@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index, func
+from app.database import Base
+
+
+class FileDocuments(Base):
+    """ Length statistics for an indexed blob. Built once per distinct content; text lives in FilePages. """
+
+    __tablename__ = "file_documents"
+
+    content_hash = Column(String(64), ForeignKey("blobs.content_hash"), primary_key=True)
+    token_count  = Column(Integer, nullable=False, default=0)
+    page_count   = Column(Integer, nullable=False, default=0)
+    indexed_at   = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+
+class FilePages(Base):
+    """ Extracted text of a blob stored page by page. char_offset is the page start within the full text. """
+
+    __tablename__ = "file_pages"
+    __table_args__ = (
+        Index("ix_file_pages_hash_page", "content_hash", "page_number", unique=True),
+    )
+
+    id           = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), ForeignKey("blobs.content_hash"), nullable=False)
+    page_number  = Column(Integer, nullable=False)
+    char_offset  = Column(Integer, nullable=False)
+    char_length  = Column(Integer, nullable=False)
+    content      = Column(Text, nullable=False)
+
+
+class FileTermPostings(Base):
+    """ Inverted index postings: one row per (blob, term) with the character offsets of every occurrence. """
+
+    __tablename__ = "file_term_postings"
+    __table_args__ = (
+        Index("ix_file_term_postings_hash_term", "content_hash", "term", unique=True),
+    )
+
+    id              = Column(Integer, primary_key=True, index=True)
+    content_hash    = Column(String(64), ForeignKey("blobs.content_hash"), nullable=False)
+    term            = Column(String(100), nullable=False)
+    term_frequency  = Column(Integer, nullable=False)
+    positions       = Column(Text, nullable=False)
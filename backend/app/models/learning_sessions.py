@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, func
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Index, func
 from app.database import Base
 
 
@@ -6,6 +6,17 @@ class LearningSessions(Base):
     """ Tracks intentional learning activity time per chapter. This is the foundation for progress analytics and ML. """
 
     __tablename__ = "learning_sessions"
+    __table_args__ = (
+        # Every insight and recommendation query filters on this prefix; the included columns
+        # let them aggregate from the index alone
+        Index(
+            "ix_learning_sessions_owner_course_chapter_activity",
+            "owner_id", "course_id", "chapter_id", "activity_type", "is_valid",
+            postgresql_include=["duration_seconds", "session_end"]
+        ),
+        # Idempotency key of events sent through the bulk events API; NULL for other writes
+        Index("ix_learning_sessions_owner_event", "owner_id", "client_event_id", unique=True),
+    )
 
     id                  = Column(Integer, primary_key=True, index=True)
     owner_id            = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -18,4 +29,5 @@ class LearningSessions(Base):
     is_valid            = Column(Boolean, default=True, nullable=False)
     created_at          = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at          = Column(DateTime(timezone=True), nullable=False)
+    client_event_id     = Column(String(64), nullable=True)
 
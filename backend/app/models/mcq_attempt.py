@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, ForeignKey, DateTime, func
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, DateTime, Index, func
 from app.database import Base
 
 
@@ -6,6 +6,15 @@ class MCQAttempt(Base):
     """ Stores MCQ performance per attempt. Used for chapter-wise score graphs, insights, and ML. """
 
     __tablename__ = "mcq_attempts"
+    __table_args__ = (
+        Index(
+            "ix_mcq_attempts_owner_course_chapter",
+            "owner_id", "course_id", "chapter_id",
+            postgresql_include=["score_percentage", "attempted_at"]
+        ),
+        # Set by the write-behind buffer so replaying its spool never inserts twice
+        Index("ix_mcq_attempts_owner_event", "owner_id", "client_event_id", unique=True),
+    )
 
     id                  = Column(Integer, primary_key=True, index=True)
     owner_id             = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -16,4 +25,5 @@ class MCQAttempt(Base):
     score_percentage    = Column(Float, nullable=False)
     time_spent_seconds  = Column(Integer, nullable=True)
     attempted_at        = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    client_event_id     = Column(String(64), nullable=True)
 
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, func
+from app.database import Base
+
+
+class PurgeJobs(Base):
+    """ Background deletion of a user, course or chapter with all dependent rows and stored objects. """
+
+    __tablename__ = "purge_jobs"
+
+    id                  = Column(String(36), primary_key=True)
+    # Not a foreign key: a user purge deletes the owner row itself
+    owner_id            = Column(Integer, nullable=False, index=True)
+    target_type         = Column(String(20), nullable=False)
+    target_id           = Column(Integer, nullable=False)
+    status              = Column(String(20), nullable=False, default="pending", index=True)
+    stage               = Column(String(50), nullable=True)
+    rows_deleted        = Column(Integer, nullable=False, default=0)
+    objects_deleted     = Column(Integer, nullable=False, default=0)
+    error               = Column(Text, nullable=True)
+    locked_until        = Column(DateTime(timezone=True), nullable=True)
+    created_at          = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    updated_at          = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now())
+    completed_at        = Column(DateTime(timezone=True), nullable=True)
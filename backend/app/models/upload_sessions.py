@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, func
+from app.database import Base
+
+
+class UploadSessions(Base):
+    """ Resumable chunked upload in progress, backed by an S3 multipart upload. """
+
+    __tablename__ = "upload_sessions"
+
+    id                  = Column(String(36), primary_key=True)
+    owner_id            = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    course_id           = Column(Integer, ForeignKey("courses.id"), nullable=False)
+    chapter_id          = Column(Integer, ForeignKey("chapters.id"), nullable=False)
+    file_name           = Column(String(255), nullable=False)
+    mime_type           = Column(String(100), nullable=False)
+    file_size           = Column(BigInteger, nullable=False)
+    part_size           = Column(Integer, nullable=False)
+    total_parts         = Column(Integer, nullable=False)
+    storage_key         = Column(String(500), nullable=False)
+    storage_upload_id   = Column(String(255), nullable=False)
+    status              = Column(String(20), nullable=False, default="active")
+    created_at          = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    expires_at          = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, Integer, BigInteger
+from app.database import Base
+
+
+class UserDataVersions(Base):
+    """ Per-user counter bumped by every write that changes the user's insights or lists. Drives ETags. """
+
+    __tablename__ = "user_data_versions"
+
+    # No foreign key: the row outlives a purged user harmlessly and never blocks the purge
+    owner_id    = Column(Integer, primary_key=True, autoincrement=False)
+    version     = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,37 @@
+"""Progress of background deletions started by the course, chapter and user delete endpoints."""
+
+from fastapi import APIRouter, HTTPException, status
+
+from app.models import PurgeJobs
+from app.routes.auth import db_dependency
+from app.routes.users import user_dependency
+from app.purge.services.purge import purge_job_response, PurgeJobResponse
+
+router = APIRouter(
+    prefix="/purge-jobs",
+    tags=["Purge Jobs"]
+)
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=list[PurgeJobResponse])
+def list_purge_jobs(db: db_dependency, user: user_dependency):
+    """ The authenticated user's purge jobs, newest first """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    jobs = db.query(PurgeJobs).filter(
+        PurgeJobs.owner_id == user.get("id")
+    ).order_by(PurgeJobs.created_at.desc()).limit(50).all()
+    return [purge_job_response(job) for job in jobs]
+
+
+@router.get("/{job_id}", status_code=status.HTTP_200_OK, response_model=PurgeJobResponse)
+def get_purge_job(db: db_dependency, user: user_dependency, job_id: str):
+    """ Status and progress of one purge job """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    job = db.query(PurgeJobs).filter(PurgeJobs.id == job_id, PurgeJobs.owner_id == user.get("id")).first()
+    if job is None:
+        raise HTTPException(status_code=404, detail="Purge Job Not Found")
+    return purge_job_response(job)
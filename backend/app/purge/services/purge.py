@@ -0,0 +1,334 @@
+"""
+Background cascade deletion of users, courses and chapters.
+
+A purge walks the dependent tables leaf first and deletes in small keyed batches, committing
+after each one, so no statement holds row locks on the hot activity tables for long. Stored
+objects are removed with batched deletes while the batch's blob rows are still locked; if the
+process dies mid-batch the transaction rolls back and the batch is simply redone on resume,
+since deleting an object twice is harmless. Progress is recorded on the job row.
+
+While a purge is unfinished its target is treated as gone: listings hide it and the ownership
+checks reject it (see not_purging), so no new rows are written under it. A row that still
+slips in, from a write already in flight, makes a stage fail; the job then stays running and
+is retried after PURGE_RETRY_DELAY, which deletes the late row on the way.
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from collections import Counter
+
+import anyio.to_thread
+from pydantic import BaseModel
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.data_versions import bump_data_version
+from app.models import (
+    Users,
+    Courses,
+    Chapters,
+    ChapterFiles,
+    LearningSessions,
+    MCQAttempt,
+    ActivityRollups,
+    DailyActivityRollups,
+    DailyMCQRollups,
+    UploadSessions,
+    PurgeJobs,
+)
+from app.storage import get_storage, run_sync
+from app.storage.blobs import release_blobs, unreferenced_keys
+
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+# Short pause between batches to leave room for foreground writes
+PURGE_BATCH_PAUSE_SECONDS = float(os.getenv("PURGE_BATCH_PAUSE_SECONDS", "0.05"))
+# A running job whose lease expired belongs to a dead worker and may be resumed
+PURGE_LEASE = timedelta(minutes=2)
+PURGE_POLL_SECONDS = 60
+# A job whose stage failed is tried again after this long instead of being given up
+PURGE_RETRY_DELAY = timedelta(minutes=5)
+
+TARGET_MODELS = {
+    "user": Users,
+    "course": Courses,
+    "chapter": Chapters,
+}
+
+# Column of each dependent table that scopes it to a purge target
+SCOPE_COLUMNS = {
+    "user": {
+        UploadSessions: UploadSessions.owner_id,
+        ChapterFiles: ChapterFiles.owner_id,
+        LearningSessions: LearningSessions.owner_id,
+        MCQAttempt: MCQAttempt.owner_id,
+        ActivityRollups: ActivityRollups.owner_id,
+        DailyActivityRollups: DailyActivityRollups.owner_id,
+        DailyMCQRollups: DailyMCQRollups.owner_id,
+        Chapters: Chapters.owner_id,
+        Courses: Courses.owner_id,
+        Users: Users.id,
+    },
+    "course": {
+        UploadSessions: UploadSessions.course_id,
+        ChapterFiles: ChapterFiles.course_id,
+        LearningSessions: LearningSessions.course_id,
+        MCQAttempt: MCQAttempt.course_id,
+        ActivityRollups: ActivityRollups.course_id,
+        DailyActivityRollups: DailyActivityRollups.course_id,
+        DailyMCQRollups: DailyMCQRollups.course_id,
+        Chapters: Chapters.course_id,
+        Courses: Courses.id,
+    },
+    "chapter": {
+        UploadSessions: UploadSessions.chapter_id,
+        ChapterFiles: ChapterFiles.chapter_id,
+        LearningSessions: LearningSessions.chapter_id,
+        MCQAttempt: MCQAttempt.chapter_id,
+        ActivityRollups: ActivityRollups.chapter_id,
+        DailyActivityRollups: DailyActivityRollups.chapter_id,
+        DailyMCQRollups: DailyMCQRollups.chapter_id,
+        Chapters: Chapters.id,
+    },
+}
+
+
+def create_purge_job(db: Session, owner_id: int, target_type: str, target_id: int) -> PurgeJobs:
+    """Queue a purge of the target, reusing an unfinished job for the same target. Commits."""
+    if target_type not in TARGET_MODELS:
+        raise ValueError(f"target_type must be one of {tuple(TARGET_MODELS)}, got: {target_type}")
+
+    job = db.query(PurgeJobs).filter(
+        PurgeJobs.target_type == target_type,
+        PurgeJobs.target_id == target_id,
+        PurgeJobs.status.in_(("pending", "running"))
+    ).first()
+    if job is not None:
+        return job
+
+    job = PurgeJobs(
+        id=str(uuid.uuid4()),
+        owner_id=owner_id,
+        target_type=target_type,
+        target_id=target_id,
+        status="pending",
+        rows_deleted=0,
+        objects_deleted=0
+    )
+    db.add(job)
+    # The target disappears from listings and insights right away
+    bump_data_version(db, owner_id)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def purging_ids(target_type: str):
+    """Subquery of target ids with an unfinished purge, for hiding them from listings meanwhile."""
+    return select(PurgeJobs.target_id).where(
+        PurgeJobs.target_type == target_type,
+        PurgeJobs.status.in_(("pending", "running"))
+    )
+
+
+def not_purging(owner_id=None, course_id=None, chapter_id=None) -> list:
+    """
+    Filters leaving out rows whose owner, course or chapter has an unfinished purge. Pass the
+    queried row's columns, e.g. not_purging(Chapters.owner_id, Chapters.course_id, Chapters.id).
+    """
+    clauses = []
+    for target_type, column in (("user", owner_id), ("course", course_id), ("chapter", chapter_id)):
+        if column is not None:
+            clauses.append(column.not_in(purging_ids(target_type)))
+    return clauses
+
+
+class PurgeJobResponse(BaseModel):
+    job_id: str
+    target_type: str
+    target_id: int
+    status: str
+    stage: str | None
+    rows_deleted: int
+    objects_deleted: int
+    error: str | None
+    created_at: datetime | None
+    completed_at: datetime | None
+
+
+def purge_job_response(job: PurgeJobs) -> dict:
+    return {
+        "job_id": job.id,
+        "target_type": job.target_type,
+        "target_id": job.target_id,
+        "status": job.status,
+        "stage": job.stage,
+        "rows_deleted": job.rows_deleted,
+        "objects_deleted": job.objects_deleted,
+        "error": job.error,
+        "created_at": job.created_at,
+        "completed_at": job.completed_at
+    }
+
+
+def _claim_job(db: Session, job_id: str):
+    """Take the lease on a pending job or one abandoned by a dead worker. Returns None if taken."""
+    now = datetime.now(timezone.utc)
+    claimed = db.query(PurgeJobs).filter(
+        PurgeJobs.id == job_id,
+        or_(
+            PurgeJobs.status == "pending",
+            (PurgeJobs.status == "running") & (PurgeJobs.locked_until < now)
+        )
+    ).update({
+        PurgeJobs.status: "running",
+        PurgeJobs.locked_until: now + PURGE_LEASE
+    }, synchronize_session=False)
+    db.commit()
+    if not claimed:
+        return None
+    return db.query(PurgeJobs).filter(PurgeJobs.id == job_id).first()
+
+
+def _record_progress(db: Session, job: PurgeJobs, stage: str, rows: int, objects: int = 0):
+    job.stage = stage  # type: ignore
+    job.rows_deleted = PurgeJobs.rows_deleted + rows  # type: ignore
+    job.objects_deleted = PurgeJobs.objects_deleted + objects  # type: ignore
+    job.locked_until = datetime.now(timezone.utc) + PURGE_LEASE  # type: ignore
+    db.commit()
+    if PURGE_BATCH_PAUSE_SECONDS:
+        time.sleep(PURGE_BATCH_PAUSE_SECONDS)
+
+
+def _purge_upload_sessions(db: Session, job: PurgeJobs, scope_column):
+    storage = get_storage()
+    while True:
+        uploads = db.query(UploadSessions).filter(
+            scope_column == job.target_id
+        ).order_by(UploadSessions.id).limit(PURGE_BATCH_SIZE).all()
+        if not uploads:
+            return
+        for upload in uploads:
+            if upload.status == "active":
+                run_sync(storage.abort_multipart, str(upload.storage_key), str(upload.storage_upload_id))
+            db.delete(upload)
+        _record_progress(db, job, "upload_sessions", len(uploads))
+
+
+def _purge_files(db: Session, job: PurgeJobs, scope_column):
+    storage = get_storage()
+    while True:
+        files = db.query(ChapterFiles.id, ChapterFiles.content_hash, ChapterFiles.file_path).filter(
+            scope_column == job.target_id
+        ).order_by(ChapterFiles.id).limit(PURGE_BATCH_SIZE).all()
+        if not files:
+            return
+
+        db.query(ChapterFiles).filter(
+            ChapterFiles.id.in_([f.id for f in files])
+        ).delete(synchronize_session=False)
+        db.flush()
+
+        references = Counter(f.content_hash for f in files if f.content_hash is not None)
+        storage_keys = release_blobs(db, dict(references))
+        # Files from before content addressing may share their key with same-named uploads
+        storage_keys.extend(str(f.file_path) for f in files if f.content_hash is None)
+        storage_keys = unreferenced_keys(db, storage_keys)
+
+        # Delete objects before committing: blob rows stay locked, and a crash here only
+        # means the batch is redone
+        if storage_keys:
+            run_sync(storage.delete_many, storage_keys)
+        _record_progress(db, job, "chapter_files", len(files), len(storage_keys))
+
+
+def _purge_rows(db: Session, job: PurgeJobs, model, scope_column):
+    if "id" not in model.__table__.c:
+        # Rollup tables are small next to the raw history; one statement is enough
+        deleted = db.query(model).filter(scope_column == job.target_id).delete(synchronize_session=False)
+        _record_progress(db, job, model.__tablename__, deleted)
+        return
+
+    while True:
+        ids = [row.id for row in db.query(model.id).filter(
+            scope_column == job.target_id
+        ).order_by(model.id).limit(PURGE_BATCH_SIZE).all()]
+        if not ids:
+            return
+        db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        _record_progress(db, job, model.__tablename__, len(ids))
+
+
+def run_purge_job(job_id: str):
+    """
+    Run (or resume) a purge job to completion. Every stage is idempotent, so a resumed job
+    starts again from the first stage and skips over whatever was already deleted.
+    Must be called from a worker thread started by the event loop (see run_sync).
+    """
+    db = SessionLocal()
+    try:
+        job = _claim_job(db, job_id)
+        if job is None:
+            return
+
+        try:
+            for model, scope_column in SCOPE_COLUMNS[str(job.target_type)].items():
+                if model is UploadSessions:
+                    _purge_upload_sessions(db, job, scope_column)
+                elif model is ChapterFiles:
+                    _purge_files(db, job, scope_column)
+                else:
+                    _purge_rows(db, job, model, scope_column)
+
+            job.status = "completed"  # type: ignore
+            job.stage = None  # type: ignore
+            job.error = None  # type: ignore
+            job.completed_at = datetime.now(timezone.utc)  # type: ignore
+            job.locked_until = None  # type: ignore
+            bump_data_version(db, int(job.owner_id))
+            db.commit()
+        except Exception as e:
+            # Keep the job (and its target hidden) and try again later; the stages are idempotent
+            db.rollback()
+            job.error = str(e)  # type: ignore
+            job.locked_until = datetime.now(timezone.utc) + PURGE_RETRY_DELAY  # type: ignore
+            db.commit()
+    finally:
+        db.close()
+
+
+def resumable_purge_job_ids(db: Session) -> list:
+    """Jobs that were queued or interrupted and should be picked up again."""
+    now = datetime.now(timezone.utc)
+    return [row.id for row in db.query(PurgeJobs.id).filter(
+        or_(
+            PurgeJobs.status == "pending",
+            (PurgeJobs.status == "running") & (PurgeJobs.locked_until < now)
+        )
+    ).order_by(PurgeJobs.created_at).all()]
+
+
+def _next_resumable_job_ids() -> list:
+    db = SessionLocal()
+    try:
+        return resumable_purge_job_ids(db)
+    finally:
+        db.close()
+
+
+async def purge_worker():
+    """
+    Startup task: runs queued jobs and resumes jobs whose worker died, then keeps polling so
+    that jobs interrupted by another process are picked up once their lease expires.
+    """
+    while True:
+        try:
+            for job_id in await anyio.to_thread.run_sync(_next_resumable_job_ids):
+                await anyio.to_thread.run_sync(run_purge_job, job_id)
+        except Exception:
+            # Database unavailable; try again on the next poll
+            pass
+        await asyncio.sleep(PURGE_POLL_SECONDS)
@@ -1,13 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Path
-from typing import Annotated
-from datetime import datetime, timezone, timedelta
+from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel
-from app.s3_config.s3_helper import get_text_from_s3
+from app.search.services.inverted_index import get_file_text
+from app.search.services.ingestion import ensure_file_indexed
 from app.rag.services.create_mcq_logic import generate_mcqs, parse_mcq_string
 
-from app.models import Chapters, LearningSessions, Users, Courses, ChapterFiles, MCQAttempt
+from app.models import Users, Courses
 from app.routes.auth import db_dependency
-from app.routes.users import user_dependency
+from app.routes.ownership import file_context_dependency
+from app.insights.services.write_behind import queue_learning_session, queue_mcq_attempt
 
 router = APIRouter(
     prefix='/courses/{course_id}/chapter/{chapter_id}/files/{file_id}/createMCQ',
@@ -19,37 +19,50 @@ class MCQSubmission(BaseModel):
     time_spent_seconds: int = 0
     full_questions: list = None  # Optional: full questions data from initial response
 
-@router.post('/', status_code=status.HTTP_200_OK)
-def create_mcq(db:db_dependency, user:user_dependency, course_id:Annotated[int, Path(gt=0)], chapter_id:Annotated[int, Path(gt=0)], file_id:Annotated[int, Path(gt=0)]):
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-    
-    # Verify chapter exists and belongs to user
-    chapter = db.query(Chapters).filter(
-        Chapters.id == chapter_id,
-        Chapters.course_id == course_id,
-        Chapters.owner_id == user.get('id')
-    ).first()
-    
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
-    file = db.query(ChapterFiles).filter(
-        ChapterFiles.id == file_id, 
-        ChapterFiles.chapter_id == chapter_id, 
-        ChapterFiles.course_id == course_id, 
-        ChapterFiles.owner_id == user.get('id')
-    ).first()
-
-    if file is None:
-        raise HTTPException(status_code=404, detail="File Not Found")
+
+class MCQQuestion(BaseModel):
+    question_number: int
+    question: str
+    options: dict[str, str]  # {"A": "...", "B": "..."}
+
+
+class MCQFullQuestion(MCQQuestion):
+    correct_answer: str | None
+    explanation: str | None = ""
+
+
+class MCQResponse(BaseModel):
+    file_key: str
+    questions: list[MCQQuestion]
+    full_questions: list[MCQFullQuestion]
+
+
+class MCQResult(MCQFullQuestion):
+    user_answer: str
+    is_correct: bool
+
+
+class MCQScore(BaseModel):
+    correct: int
+    total: int
+    percentage: float
+
+
+class MCQSubmissionResponse(BaseModel):
+    results: list[MCQResult]
+    score: MCQScore
+
+@router.post('/', status_code=status.HTTP_200_OK, response_model=MCQResponse)
+def create_mcq(db:db_dependency, context:file_context_dependency):
+    file = context.file
     
     # Get S3 key safely from DB
     file_key = file.file_path
 
     try:
-        # 1. Get extracted text from S3
-        text = get_text_from_s3(file_key)
+        # 1. Get extracted text from the page store (extracted once from storage)
+        ensure_file_indexed(db, file)
+        text = get_file_text(db, str(file.content_hash))
 
         if not text.strip():
             raise HTTPException(
@@ -90,38 +103,14 @@ def create_mcq(db:db_dependency, user:user_dependency, course_id:Annotated[int,
             detail=f"Failed to generate MCQs: {str(e)}"
         )
 
-@router.post('/submit', status_code=status.HTTP_200_OK)
+@router.post('/submit', status_code=status.HTTP_200_OK, response_model=MCQSubmissionResponse)
 def submit_mcq(
-    db: db_dependency, 
-    user: user_dependency, 
-    course_id: Annotated[int, Path(gt=0)], 
-    chapter_id: Annotated[int, Path(gt=0)], 
-    file_id: Annotated[int, Path(gt=0)],
+    db: db_dependency,
+    context: file_context_dependency,
     submission: MCQSubmission
 ):
     """Submit MCQ answers and get results with score"""
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-    
-    # Verify chapter exists and belongs to user
-    chapter = db.query(Chapters).filter(
-        Chapters.id == chapter_id,
-        Chapters.course_id == course_id,
-        Chapters.owner_id == user.get('id')
-    ).first()
-    
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
-    file = db.query(ChapterFiles).filter(
-        ChapterFiles.id == file_id, 
-        ChapterFiles.chapter_id == chapter_id, 
-        ChapterFiles.course_id == course_id, 
-        ChapterFiles.owner_id == user.get('id')
-    ).first()
-
-    if file is None:
-        raise HTTPException(status_code=404, detail="File Not Found")
+    file = context.file
     
     try:
         # Use provided full_questions if available, otherwise regenerate
@@ -129,8 +118,8 @@ def submit_mcq(
             full_questions = submission.full_questions
         else:
             # Fallback: regenerate MCQs (not ideal but works)
-            file_key = file.file_path
-            text = get_text_from_s3(file_key)
+            ensure_file_indexed(db, file)
+            text = get_file_text(db, str(file.content_hash))
             mcq_string = generate_mcqs(text)
             full_questions = parse_mcq_string(mcq_string)
         
@@ -192,37 +181,21 @@ def submit_mcq(
         # Calculate score percentage
         score_percentage = (correct_answers / total_questions * 100) if total_questions > 0 else 0
         
-        # Save MCQ attempt to database
-        mcq_attempt = MCQAttempt(
-            owner_id=user.get('id'),
-            course_id=course_id,
-            chapter_id=chapter_id,
+        # Save MCQ attempt to database (written behind, with its rollups)
+        queue_mcq_attempt(
+            db,
+            owner_id=context.owner_id,
+            course_id=context.course_id,
+            chapter_id=context.chapter_id,
             total_questions=total_questions,
             correct_answers=correct_answers,
             score_percentage=score_percentage,
             time_spent_seconds=submission.time_spent_seconds
         )
-        db.add(mcq_attempt)
         
         # Record learning session for MCQ activity if time is valid
         if submission.time_spent_seconds >= 1:
-            session_end = datetime.now(timezone.utc)
-            session_start = session_end - timedelta(seconds=submission.time_spent_seconds)
-            
-            learning_session = LearningSessions(
-                owner_id=user.get('id'),
-                course_id=course_id,
-                chapter_id=chapter_id,
-                activity_type="mcq",
-                session_start=session_start,
-                session_end=session_end,
-                duration_seconds=submission.time_spent_seconds,
-                is_valid=True,
-                updated_at=session_end
-            )
-            db.add(learning_session)
-        
-        db.commit()
+            queue_learning_session(db, context.owner_id, context.course_id, context.chapter_id, "mcq", submission.time_spent_seconds)
         
         return {
             "results": results,
@@ -0,0 +1,129 @@
+"""
+Routing of read-only sessions to read replicas.
+
+Read-only dependencies (insights, recommendations, list endpoints) ask pick_read_replica() for
+a replica. It returns one that is up and whose replication lag is within
+REPLICA_MAX_LAG_SECONDS, or None for the primary when there is no such replica or when the
+user wrote recently enough that a replica might not show the write yet (read-your-writes).
+
+Lag is measured per replica at most every REPLICA_CHECK_SECONDS, on the request that finds the
+last measurement stale. A replica that fails the check, or drops a connection during a
+request, is skipped until its next check.
+
+Read-your-writes is tracked in two ways: per worker process by user id, and across workers by
+the X-Last-Write response header, which the frontend echoes back as X-Read-After. Handlers
+that commit data the user reads back through a replica call mark_write(); activity tracking
+(events, heartbeats) does not, so it never pins an active user's reads to the primary.
+"""
+
+import asyncio
+import os
+import random
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from fastapi import Response
+
+from app.database import replica_engines
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_CHECK_SECONDS = float(os.getenv("REPLICA_CHECK_SECONDS", "5"))
+REPLICA_CHECK_TIMEOUT_SECONDS = float(os.getenv("REPLICA_CHECK_TIMEOUT_SECONDS", "1"))
+# How long a user's reads stay on the primary after they write
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+LAST_WRITE_HEADER = "X-Last-Write"
+READ_AFTER_HEADER = "X-Read-After"
+
+# Seconds behind the primary; 0 when the server is not in recovery (e.g. a primary used as replica)
+POSTGRES_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+""")
+
+
+class Replica:
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        # None while down or not measured yet
+        self.lag: float | None = None
+        self.checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def usable(self) -> bool:
+        return self.lag is not None and self.lag <= REPLICA_MAX_LAG_SECONDS
+
+    async def _measure_lag(self) -> float | None:
+        async with self.engine.connect() as conn:
+            if self.engine.dialect.name == "postgresql":
+                lag = await conn.scalar(POSTGRES_LAG_SQL)
+            else:
+                status = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+                # Not configured as a replica at all: treat like a primary
+                if status is None:
+                    return 0.0
+                lag = status.get("Seconds_Behind_Source")
+        # NULL means replication is stopped or has not replayed anything yet
+        return float(lag) if lag is not None else None
+
+    async def refresh(self):
+        if time.monotonic() - self.checked_at < REPLICA_CHECK_SECONDS:
+            return
+        async with self._lock:
+            if time.monotonic() - self.checked_at < REPLICA_CHECK_SECONDS:
+                return
+            try:
+                self.lag = await asyncio.wait_for(self._measure_lag(), REPLICA_CHECK_TIMEOUT_SECONDS)
+            except Exception:
+                self.lag = None
+            self.checked_at = time.monotonic()
+
+    def mark_down(self):
+        self.lag = None
+        self.checked_at = time.monotonic()
+
+
+replicas = [Replica(engine) for engine in replica_engines]
+
+# user id -> time.time() of their last write request in this process
+_last_writes: dict = {}
+
+
+def note_write(user_id: int) -> float:
+    """ Record that the user is writing now; returns the timestamp for the X-Last-Write header. """
+    now = time.time()
+    _last_writes[user_id] = now
+    # Forget users whose window passed, so the map only holds recent writers
+    if len(_last_writes) > 10000:
+        for stale in [uid for uid, at in _last_writes.items() if now - at > READ_YOUR_WRITES_SECONDS]:
+            del _last_writes[stale]
+    return now
+
+
+def mark_write(response: Response, user_id: int):
+    """
+    After a commit: keep the user's reads on the primary until replicas have the write. Pass
+    the response the handler returns, or the injected Response when it returns a model.
+    """
+    response.headers[LAST_WRITE_HEADER] = str(note_write(user_id))
+
+
+def _wrote_recently(user_id: int, read_after: float | None) -> bool:
+    now = time.time()
+    last_write = max(_last_writes.get(user_id, 0.0), read_after or 0.0)
+    return now - last_write < READ_YOUR_WRITES_SECONDS
+
+
+async def pick_read_replica(user_id: int, read_after: float | None = None) -> Replica | None:
+    """ A random usable replica for the user's read, or None to read from the primary. """
+    if not replicas or _wrote_recently(user_id, read_after):
+        return None
+    await asyncio.gather(*(replica.refresh() for replica in replicas))
+    usable = [replica for replica in replicas if replica.usable]
+    return random.choice(usable) if usable else None
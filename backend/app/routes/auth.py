@@ -1,9 +1,11 @@
 from datetime import timedelta, timezone
 import datetime
 from typing import Annotated, Optional, cast
-from fastapi import APIRouter, Depends, status, HTTPException
+from fastapi import APIRouter, Depends, status, HTTPException, Request
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import OperationalError, InterfaceError
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from jose import jwt, JWTError
@@ -11,8 +13,10 @@ from jose import jwt, JWTError
 import os
 from dotenv import load_dotenv
 
-from app.database import SessionLocal
+from app.database import SessionLocal, AsyncSessionLocal
 from app.models import Users
+from app.replicas import pick_read_replica, READ_AFTER_HEADER
+from app.purge.services.purge import not_purging
 
 router = APIRouter(
     prefix="/auth",
@@ -52,6 +56,23 @@ class Token(BaseModel):
     token_type: str
 
 
+class CreateUserResponse(BaseModel):
+    message: str
+    user_id: int
+
+
+class LoginUser(BaseModel):
+    id: int
+    email: str
+    username: str
+    first_name: str
+    last_name: str
+
+
+class LoginResponse(Token):
+    user: LoginUser
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -62,8 +83,15 @@ def get_db():
 db_dependency = Annotated[Session, Depends(get_db)]
 
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+
+
 # create new Users
-@router.post("/create", status_code=status.HTTP_201_CREATED)
+@router.post("/create", status_code=status.HTTP_201_CREATED, response_model=CreateUserResponse)
 def create_new_user(create_user_request: CreateUserRequest, db: db_dependency):
     """Register a new user ensuring unique email and username."""
     # Check if email already exists
@@ -108,7 +136,8 @@ def create_new_user(create_user_request: CreateUserRequest, db: db_dependency):
 
 
 def authenticate_user(username:str, password:str, db):
-    user = db.query(Users).filter(Users.username==username).first()
+    # An account being deleted cannot sign in anymore
+    user = db.query(Users).filter(Users.username==username, *not_purging(Users.id)).first()
     if not user:
         return None
     if not bcrypt_context.verify(password, user.hashed_password):
@@ -138,7 +167,29 @@ async def get_current_user(token: Annotated[str, Depends(outh2_bearer)]):
         return {'username':username, 'id':user_id}
     except JWTError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='could not validate user')
-        
+
+
+def _read_after(request: Request) -> float | None:
+    try:
+        return float(request.headers[READ_AFTER_HEADER])
+    except (KeyError, ValueError):
+        return None
+
+
+async def get_read_db(request: Request, user: Annotated[dict, Depends(get_current_user)]):
+    """ Async session for read-only routes: on a caught-up replica when there is one, else on the primary. """
+    replica = await pick_read_replica(user['id'], _read_after(request))
+    async with (AsyncSessionLocal(bind=replica.engine) if replica else AsyncSessionLocal()) as db:
+        try:
+            yield db
+        except (OperationalError, InterfaceError):
+            # Replica went away mid-request; route around it until its next health check
+            if replica is not None:
+                replica.mark_down()
+            raise
+
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+
 
 
 @router.post('/token', response_model=Token)
@@ -158,10 +209,10 @@ class LoginRequest(BaseModel):
     email: str
     password: str
 
-@router.post("/login")
+@router.post("/login", response_model=LoginResponse)
 def login_user(login_request: LoginRequest, db: db_dependency):
     """Authenticate by email and password and return a JWT plus user details."""
-    user = db.query(Users).filter(Users.email == login_request.email).first()
+    user = db.query(Users).filter(Users.email == login_request.email, *not_purging(Users.id)).first()
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
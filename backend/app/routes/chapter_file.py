@@ -1,14 +1,28 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, Path, status, UploadFile, File, Query, Body
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Path, status, UploadFile, File, Query, Body, Request
+from fastapi.responses import StreamingResponse, RedirectResponse, Response
 from pydantic import BaseModel
-from datetime import datetime, timezone, timedelta
+from datetime import datetime
+from sqlalchemy import select
 import io
+import orjson
 
-from app.models import Chapters, Users, Courses, ChapterFiles, LearningSessions
+from app.models import Users, Courses, ChapterFiles, FilePages
 from .auth import db_dependency
 from .users import user_dependency
-from app.s3_config.s3_helper import upload_file_to_s3, delete_file_from_s3, get_file_from_s3, get_text_from_s3
+from .ownership import chapter_context_dependency, file_access_dependency, file_context_dependency, forget_ownership
+from .etags import data_etag
+from .pagination import Page, DEFAULT_PAGE_SIZE, limit_query, cursor_query, fields_query, selected_fields, columns, paginate, build_page
+from app.database import SessionLocal
+from app.storage import get_storage, run_sync, StorageError, InvalidRangeError, ObjectNotFoundError
+from app.storage.files import upload_stream, extract_pages_from_file, FileTooLargeError
+from app.search.services.inverted_index import get_file_pages, get_file_text
+from app.search.services.ingestion import ensure_file_indexed, try_index_content
+from app.storage.blobs import acquire_blob, release_blob, temp_upload_key, unreferenced_keys
+from app.insights.services.write_behind import queue_learning_session
+from app.insights.services.sessionizer import sessionizer
+from app.data_versions import bump_data_version
+from app.purge.services.purge import not_purging
 
 
 router = APIRouter(
@@ -27,39 +41,76 @@ ALLOWED_MIME_TYPES = {
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 
 
+
 class RecordViewingDurationRequest(BaseModel):
     duration_seconds: int
 
 
-@router.get('/', status_code=status.HTTP_200_OK)
-def get_file(user:user_dependency, db:db_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)]):
-    """Get all files for a specific chapter"""
+class ViewingHeartbeatRequest(BaseModel):
+    ended: bool = False  # Sent when the file is closed, so the session is not extended to the idle timeout
 
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-    
 
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).first()
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
+class UploadFileResponse(BaseModel):
+    message: str
+    file_id: int
+    file_name: str
+    file_size: int
+    file_path: str
 
-    files = db.query(ChapterFiles).filter(ChapterFiles.chapter_id == chapter_id).all()
-    return files
 
+class FileContentResponse(BaseModel):
+    file_id: int
+    file_name: str
+    content: str
 
-@router.post("/uploadFile", status_code=status.HTTP_201_CREATED)
-async def upload_file(user:user_dependency, db:db_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], file: UploadFile = File(...)):
-    """Upload a file to S3 and store metadata in database"""
 
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-    
+class FilePage(BaseModel):
+    page_number: int
+    content: str
+
+
+class FilePagesResponse(BaseModel):
+    file_id: int
+    file_name: str
+    page_count: int
+    start: int
+    pages: list[FilePage]
+
+
+class RecordViewingResponse(BaseModel):
+    message: str
+    recorded: bool
+    duration_seconds: int | None = None
+
+
+class FileItem(BaseModel):
+    id: int
+    file_name: str | None = None
+    file_path: str | None = None
+    file_type: str | None = None
+    mime_type: str | None = None
+    file_size: int | None = None
+    content_hash: str | None = None
+    owner_id: int | None = None
+    chapter_id: int | None = None
+    course_id: int | None = None
+    uploaded_at: datetime | None = None
+
+
+@router.get('/', status_code=status.HTTP_200_OK, response_model=Page[FileItem], response_model_exclude_unset=True, dependencies=[data_etag])
+def get_file(db:db_dependency, chapter:chapter_context_dependency, cursor: cursor_query = None, limit: limit_query = DEFAULT_PAGE_SIZE, fields: fields_query = None):
+    """Get a page of the files of a specific chapter"""
+
+    names = selected_fields(FileItem, fields)
+    stmt = select(*columns(ChapterFiles, names)).where(ChapterFiles.chapter_id == chapter.chapter_id)
+    rows = db.execute(paginate(stmt, ChapterFiles, cursor, limit)).all()
+    return build_page(rows, names, FileItem, limit)
+
+
+@router.post("/uploadFile", status_code=status.HTTP_201_CREATED, response_model=UploadFileResponse)
+def upload_file(db:db_dependency, chapter:chapter_context_dependency, file: UploadFile = File(...)):
+    """Upload a file to storage and store metadata in database"""
 
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).first()
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
     # Validate MIME type
     if file.content_type not in ALLOWED_MIME_TYPES:
         raise HTTPException(
@@ -67,80 +118,90 @@ async def upload_file(user:user_dependency, db:db_dependency, course_id: Annotat
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_MIME_TYPES.keys())}"
         )
     
-    # Read file content
-    file_content = await file.read()
-    file_size = len(file_content)
+    # Generate unique filename
+    file_extension = ALLOWED_MIME_TYPES[file.content_type]
+    unique_filename = f"{file.filename}"
     
-    # Validate file size
-    if file_size > MAX_FILE_SIZE:
+    storage = get_storage()
+    temp_key = temp_upload_key()
+
+    try:
+        # Stream to a staging key part by part; the size limit is enforced while reading
+        file_size, content_hash = run_sync(upload_stream, file.read, temp_key, MAX_FILE_SIZE)
+    except FileTooLargeError:
         raise HTTPException(
             status_code=400,
             detail=f"File size exceeds maximum allowed size of {MAX_FILE_SIZE / (1024 * 1024)}MB"
         )
+    except StorageError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to upload file: {str(e)}"
+        )
+
+    def load_pages():
+        file.file.seek(0)
+        return extract_pages_from_file(file.file, unique_filename)
     
-    # Generate unique filename
-    file_extension = ALLOWED_MIME_TYPES[file.content_type]
-    unique_filename = f"{file.filename}"
-    
+    # Runs in the threadpool like complete_upload: the blob row lock held until the commit
+    # only ever blocks a worker thread, never the event loop. Nothing slow runs under it
+    # apart from the copy of new content, which must exist before the blob row is visible.
     try:
-        # Upload to S3
-        s3_file_path = upload_file_to_s3(
-            file_content=file_content,
-            file_name=unique_filename,
-            folder=f"users/{user.get('id')}/courses/{course_id}/chapters/{chapter_id}"
-        )
-        
+        # Identical content is stored once; a new hash promotes the staged object to its blob key
+        blob, is_new_blob = acquire_blob(db, content_hash, file_size)
+        if is_new_blob:
+            run_sync(storage.copy, temp_key, str(blob.storage_key))
+
         # Save metadata to database
         new_file = ChapterFiles(
             file_name=file.filename,
-            file_path=s3_file_path,
+            file_path=blob.storage_key,
             file_type=file_extension,
             mime_type=file.content_type,
             file_size=file_size,
-            owner_id=user.get('id'),
-            chapter_id=chapter_id,
-            course_id=course_id
+            content_hash=content_hash,
+            owner_id=chapter.owner_id,
+            chapter_id=chapter.chapter_id,
+            course_id=chapter.course_id
         )
         
         db.add(new_file)
+        bump_data_version(db, chapter.owner_id)
         db.commit()
-        db.refresh(new_file)
-        
-        return {
-            "message": "File uploaded successfully",
-            "file_id": new_file.id,
-            "file_name": new_file.file_name,
-            "file_size": new_file.file_size,
-            "file_path": new_file.file_path
-        }
     
     except Exception as e:
         db.rollback()
+        run_sync(storage.delete, temp_key)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to upload file: {str(e)}"
         )
 
+    # Build the search index from the spooled upload, once per distinct content, after the
+    # commit released the blob row
+    try_index_content(db, content_hash, load_pages)
+    db.refresh(new_file)
+    run_sync(storage.delete, temp_key)
+    
+    return {
+        "message": "File uploaded successfully",
+        "file_id": new_file.id,
+        "file_name": new_file.file_name,
+        "file_size": new_file.file_size,
+        "file_path": new_file.file_path
+    }
+
 
-@router.get('/{file_id}/content', status_code=status.HTTP_200_OK)
-def get_file_content(user:user_dependency, db:db_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], file_id: Annotated[int, Path(gt=0)]):
+@router.get('/{file_id}/content', status_code=status.HTTP_200_OK, response_model=FileContentResponse)
+def get_file_content(db:db_dependency, context:file_context_dependency):
     """Get the text content of a file"""
     
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-    
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).first()
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
-    file = db.query(ChapterFiles).filter(ChapterFiles.id == file_id, ChapterFiles.chapter_id == chapter_id, ChapterFiles.owner_id == user.get('id')).first()
-    if file is None:
-        raise HTTPException(status_code=404, detail="File Not Found")
+    file = context.file
     
     try:
-        # Get text content from S3
-        file_path: str = str(file.file_path)
-        text_content = get_text_from_s3(file_path)
+        # Extracted once and served from the page store afterwards
+        ensure_file_indexed(db, file)
+        text_content = get_file_text(db, str(file.content_hash))
         
         return {
             "file_id": file.id,
@@ -148,79 +209,149 @@ def get_file_content(user:user_dependency, db:db_dependency, course_id: Annotate
             "content": text_content
         }
     except Exception as e:
+        db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to retrieve file content: {str(e)}"
         )
 
 
-@router.post('/{file_id}/record-viewing', status_code=status.HTTP_201_CREATED)
+@router.get('/{file_id}/pages', status_code=status.HTTP_200_OK, response_model=FilePagesResponse)
+def get_file_page_range(
+    db: db_dependency,
+    context: file_context_dependency,
+    start: Annotated[int, Query(ge=1)] = 1,
+    count: Annotated[int, Query(ge=1, le=50)] = 5
+):
+    """Get a range of pages of a file's extracted text"""
+
+    file = context.file
+
+    try:
+        document = ensure_file_indexed(db, file)
+        pages = get_file_pages(db, str(document.content_hash), start_page=start, count=count)
+
+        return {
+            "file_id": file.id,
+            "file_name": file.file_name,
+            "page_count": document.page_count,
+            "start": start,
+            "pages": [{"page_number": page.page_number, "content": page.content} for page in pages]
+        }
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve file pages: {str(e)}"
+        )
+
+
+@router.get('/{file_id}/pages/stream', status_code=status.HTTP_200_OK, response_class=StreamingResponse)
+def stream_file_pages(
+    db: db_dependency,
+    context: file_context_dependency,
+    start: Annotated[int, Query(ge=1)] = 1
+):
+    """Stream the pages of a file in order as newline-delimited JSON"""
+
+    file = context.file
+
+    try:
+        content_hash = str(ensure_file_indexed(db, file).content_hash)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to retrieve file pages: {str(e)}"
+        )
+
+    def page_stream():
+        # The request session is closed once the response starts, so the stream owns its own
+        stream_db = SessionLocal()
+        try:
+            pages = stream_db.query(FilePages.page_number, FilePages.content).filter(
+                FilePages.content_hash == content_hash,
+                FilePages.page_number >= start
+            ).order_by(FilePages.page_number).yield_per(8)
+            for page in pages:
+                yield orjson.dumps({"page_number": page.page_number, "content": page.content}) + b"\n"
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(page_stream(), media_type="application/x-ndjson")
+
+
+@router.get('/{file_id}/download', response_class=StreamingResponse)
+def download_file(
+    request: Request,
+    context: file_context_dependency,
+    redirect: Annotated[bool, Query()] = False
+):
+    """Download the original file, streamed from storage with Range and ETag support"""
+
+    file = context.file
+
+    file_path: str = str(file.file_path)
+    file_name: str = str(file.file_name)
+    storage = get_storage()
+
+    # Let the client fetch straight from storage when the backend supports it
+    if redirect:
+        presigned_url = run_sync(storage.presign, file_path, file_name)
+        if presigned_url is not None:
+            return RedirectResponse(presigned_url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+
+    try:
+        stored = run_sync(storage.get_stream, file_path, request.headers.get("range"), request.headers.get("if-none-match"))
+    except InvalidRangeError as e:
+        raise HTTPException(status_code=416, detail=str(e))
+    except ObjectNotFoundError:
+        raise HTTPException(status_code=404, detail="File content not found in storage")
+
+    if stored is None:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": request.headers["if-none-match"]})
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": stored.etag,
+        "Content-Length": str(stored.content_length),
+        "Content-Disposition": f'inline; filename="{file_name}"',
+        "Cache-Control": "private, max-age=0, must-revalidate"
+    }
+    if stored.content_range:
+        headers["Content-Range"] = stored.content_range
+
+    return StreamingResponse(
+        stored.body,
+        status_code=status.HTTP_206_PARTIAL_CONTENT if stored.content_range else status.HTTP_200_OK,
+        media_type=str(file.mime_type),
+        headers=headers
+    )
+
+
+@router.post('/{file_id}/record-viewing', status_code=status.HTTP_201_CREATED, response_model=RecordViewingResponse, response_model_exclude_unset=True)
 def record_viewing_duration(
-    user: user_dependency,
     db: db_dependency,
-    course_id: Annotated[int, Path(gt=0)],
-    chapter_id: Annotated[int, Path(gt=0)],
-    file_id: Annotated[int, Path(gt=0)],
+    access: file_access_dependency,
     request: RecordViewingDurationRequest
 ):
     """Record the time spent viewing file content"""
     
-    if user is None:
-        raise HTTPException(status_code=401, detail="Authentication Failed")
-    
     # Validate duration
     if request.duration_seconds < 0:
         raise HTTPException(status_code=400, detail="Duration must be non-negative")
     
-    # Verify chapter exists and belongs to user
-    chapter = db.query(Chapters).filter(
-        Chapters.id == chapter_id,
-        Chapters.course_id == course_id,
-        Chapters.owner_id == user.get('id')
-    ).first()
-    
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
-    # Verify file exists and belongs to user
-    file = db.query(ChapterFiles).filter(
-        ChapterFiles.id == file_id,
-        ChapterFiles.chapter_id == chapter_id,
-        ChapterFiles.owner_id == user.get('id')
-    ).first()
-    
-    if file is None:
-        raise HTTPException(status_code=404, detail="File Not Found")
-    
     # Only record if duration is at least 1 second
     if request.duration_seconds < 1:
         return {"message": "Duration too short to record", "recorded": False}
     
     try:
-        # Calculate session times
-        session_end = datetime.now(timezone.utc)
-        session_start = session_end - timedelta(seconds=request.duration_seconds)
-        
-        # Create learning session record
-        learning_session = LearningSessions(
-            owner_id=user.get('id'),
-            course_id=course_id,
-            chapter_id=chapter_id,
-            activity_type="view_content",
-            session_start=session_start,
-            session_end=session_end,
-            duration_seconds=request.duration_seconds,
-            is_valid=True,
-            updated_at=session_end
-        )
-        
-        db.add(learning_session)
-        db.commit()
-        db.refresh(learning_session)
+        # Hand the session to the write-behind buffer, which also updates the activity rollups
+        queue_learning_session(db, access.owner_id, access.course_id, access.chapter_id, "view_content", request.duration_seconds)
         
         return {
             "message": "Viewing duration recorded successfully",
-            "session_id": learning_session.id,
+            "recorded": True,
             "duration_seconds": request.duration_seconds
         }
     
@@ -232,31 +363,60 @@ def record_viewing_duration(
         )
 
 
-@router.delete('/delete/{file_id}')
-def delete_file_by_id(db:db_dependency, user:user_dependency, course_id:Annotated[int, Path(gt=0)], chapter_id:Annotated[int, Path(gt=0)], file_id:Annotated[int, Path(gt=0)]):
+@router.post('/{file_id}/heartbeat', status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+def viewing_heartbeat(
+    user: user_dependency,
+    db: db_dependency,
+    course_id: Annotated[int, Path(gt=0)],
+    chapter_id: Annotated[int, Path(gt=0)],
+    file_id: Annotated[int, Path(gt=0)],
+    request: ViewingHeartbeatRequest = Body(default_factory=ViewingHeartbeatRequest)
+):
+    """Mark the file as being viewed now; the server measures viewing sessions from these heartbeats"""
+
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).first()
-    if chapter is None:
-        raise HTTPException(status_code=404, detail="Chapter Not Found")
-    
-    file = db.query(ChapterFiles).filter(ChapterFiles.id == file_id, ChapterFiles.chapter_id == chapter_id, ChapterFiles.owner_id == user.get('id')).first()
-    if file is None:
-        raise HTTPException(status_code=404, detail="File Not Found")
+
+    # Ownership is checked when a session opens; heartbeats of an open session skip the database
+    if not sessionizer.is_open(user.get('id'), file_id, course_id, chapter_id):
+        file = db.query(ChapterFiles.id).filter(
+            ChapterFiles.id == file_id,
+            ChapterFiles.chapter_id == chapter_id,
+            ChapterFiles.course_id == course_id,
+            ChapterFiles.owner_id == user.get('id'),
+            *not_purging(ChapterFiles.owner_id, ChapterFiles.course_id, ChapterFiles.chapter_id)
+        ).first()
+        if file is None:
+            raise HTTPException(status_code=404, detail="File Not Found")
+
+    sessionizer.heartbeat(user.get('id'), file_id, course_id, chapter_id, ended=request.ended)
+
+
+@router.delete('/delete/{file_id}', response_model=None)
+def delete_file_by_id(db:db_dependency, context:file_context_dependency):
+    file = context.file
     
     try:
-        # Delete from S3 
-        file_path: str = str(file.file_path)
-        delete_file_from_s3(file_path)
-        
-        # Delete from database
+        # Delete from database, dropping the blob reference last
+        content_hash = file.content_hash
+        storage_key = str(file.file_path)
         db.delete(file)
+        bump_data_version(db, context.owner_id)
+        db.flush()
+        if content_hash is not None:
+            storage_key = release_blob(db, str(content_hash))
+        storage_keys = unreferenced_keys(db, [storage_key] if storage_key is not None else [])
+        
+        # Delete the object before committing, like the purge: the blob row stays locked, so a
+        # re-upload of the same content cannot register it again and have its object deleted
+        if storage_keys:
+            run_sync(get_storage().delete_many, storage_keys)
         db.commit()
+        forget_ownership(context.owner_id)
         
     except Exception as e:
         db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Failed to delete file: {str(e)}"
-        )
\ No newline at end of file
+        )
@@ -1,10 +1,17 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Path
+from fastapi import APIRouter, HTTPException, status, Path, BackgroundTasks, Response
 from pydantic import BaseModel
+from sqlalchemy import select
 
 from app.models import Chapters, Users, Courses
-from .auth import db_dependency
+from .auth import async_db_dependency, read_db_dependency
 from .users import user_dependency
+from .ownership import forget_ownership
+from .etags import data_etag
+from .pagination import Page, DEFAULT_PAGE_SIZE, limit_query, cursor_query, fields_query, selected_fields, columns, paginate, build_page
+from app.data_versions import bump_data_version
+from app.replicas import mark_write
+from app.purge.services.purge import create_purge_job, run_purge_job, purge_job_response, not_purging, PurgeJobResponse
 
 router = APIRouter(
     prefix='/courses/{course_id}/chapter',
@@ -21,7 +28,7 @@ class CreateChapterRequest(BaseModel):
 class ChapterResponse(BaseModel):
     id: int
     chapter_title: str
-    chapter_description: str
+    chapter_description: str | None
     course_id: int
     owner_id: int
 
@@ -29,37 +36,58 @@ class ChapterResponse(BaseModel):
         from_attributes = True
 
 
-@router.get('', status_code=status.HTTP_200_OK)
-def get_course_chapters(db: db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)]):
-    """Return all chapters for a course that belongs to the authenticated user."""
+class CreateChapterResponse(BaseModel):
+    message: str
+    chapter_id: int
+    course_id: int
+
+
+class UpdateChapterResponse(BaseModel):
+    message: str
+    chapter_id: int
+    title: str
+
+
+class ChapterItem(BaseModel):
+    id: int
+    chapter_title: str | None = None
+    chapter_description: str | None = None
+    course_id: int | None = None
+    owner_id: int | None = None
+
+
+@router.get('', status_code=status.HTTP_200_OK, response_model=Page[ChapterItem], response_model_exclude_unset=True, dependencies=[data_etag])
+async def get_course_chapters(db: read_db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)], cursor: cursor_query = None, limit: limit_query = DEFAULT_PAGE_SIZE, fields: fields_query = None):
+    """Return a page of the chapters of a course that belongs to the authenticated user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses.id).where(Courses.id == course_id, Courses.owner_id == user.get('id'), *not_purging(Courses.owner_id, Courses.id)).limit(1))
     
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found" )
     
-    # Get all chapters for this course
-    chapters = db.query(Chapters).filter(Chapters.course_id == course_id).all()
-    return chapters
+    names = selected_fields(ChapterItem, fields)
+    stmt = select(*columns(Chapters, names)).where(Chapters.course_id == course_id, *not_purging(chapter_id=Chapters.id))
+    rows = (await db.execute(paginate(stmt, Chapters, cursor, limit))).all()
+    return build_page(rows, names, ChapterItem, limit)
 
 
-@router.get('/{chapter_id}', status_code=status.HTTP_200_OK)
-def get_course_chapters_by_chapterid(db: db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)]):
+@router.get('/{chapter_id}', status_code=status.HTTP_200_OK, response_model=ChapterResponse, dependencies=[data_etag])
+async def get_course_chapters_by_chapterid(db: read_db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)]):
     """Return a single chapter by id for a course owned by the authenticated user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id'), *not_purging(Courses.owner_id, Courses.id)).limit(1))
     
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
     
     # Get the specific chapter for this course
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id).first()
+    chapter = await db.scalar(select(Chapters).where(Chapters.id == chapter_id, Chapters.course_id == course_id, *not_purging(chapter_id=Chapters.id)).limit(1))
     
     if not chapter:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chapter not found")
@@ -68,20 +96,20 @@ def get_course_chapters_by_chapterid(db: db_dependency, user: user_dependency, c
 
 
 
-@router.post('/createChapter/', status_code=status.HTTP_201_CREATED)
-def add_chapter_to_course(db: db_dependency,  user: user_dependency,  course_id: Annotated[int, Path(gt=0)], add_chapter: CreateChapterRequest):
+@router.post('/createChapter/', status_code=status.HTTP_201_CREATED, response_model=CreateChapterResponse)
+async def add_chapter_to_course(db: async_db_dependency,  user: user_dependency,  course_id: Annotated[int, Path(gt=0)], add_chapter: CreateChapterRequest, response: Response):
     """Create a new chapter under a course owned by the authenticated user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id).filter(Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id).where(Courses.owner_id == user.get('id'), *not_purging(Courses.owner_id, Courses.id)))
     
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found" )
     
     # Check if chapter title already exists within this course
-    existing_chapter = db.query(Chapters).filter(Chapters.chapter_title == add_chapter.title, Chapters.course_id == course_id).first()
+    existing_chapter = await db.scalar(select(Chapters).where(Chapters.chapter_title == add_chapter.title, Chapters.course_id == course_id).limit(1))
     if existing_chapter:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chapter title already exists in this course")
     
@@ -95,63 +123,71 @@ def add_chapter_to_course(db: db_dependency,  user: user_dependency,  course_id:
     
     try:
         db.add(new_chapter)
-        db.commit()
-        db.refresh(new_chapter)
+        await db.run_sync(bump_data_version, user.get('id'))
+        await db.commit()
+        await db.refresh(new_chapter)
+        mark_write(response, user.get('id'))
         return {"message": "Chapter added to course successfully","chapter_id": new_chapter.id,"course_id": course_id
         }
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to add chapter to course: {str(e)}" )
 
 
 
-@router.put('/updateChapter/{chapter_id}', status_code=status.HTTP_202_ACCEPTED)
-def update_chapter(db:db_dependency, user:user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], update_chapter: CreateChapterRequest):
+@router.put('/updateChapter/{chapter_id}', status_code=status.HTTP_202_ACCEPTED, response_model=UpdateChapterResponse)
+async def update_chapter(db:async_db_dependency, user:user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], update_chapter: CreateChapterRequest, response: Response):
     """Update a chapter's title and description within a course owned by the user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id'), *not_purging(Courses.owner_id, Courses.id)).limit(1))
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
     
     # Verify that the chapter exists, belongs to the course, and belongs to the user
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).first()
+    chapter = await db.scalar(select(Chapters).where(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id'), *not_purging(chapter_id=Chapters.id)).limit(1))
     if chapter is None:
         raise HTTPException(status_code=404, detail="Chapter not found")
     
     # Check if the new title conflicts with another chapter in the same course
-    existing_chapter = db.query(Chapters).filter(Chapters.chapter_title == update_chapter.title, Chapters.course_id == course_id, Chapters.id != chapter_id).first()
+    existing_chapter = await db.scalar(select(Chapters).where(Chapters.chapter_title == update_chapter.title, Chapters.course_id == course_id, Chapters.id != chapter_id).limit(1))
     if existing_chapter:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chapter title already exists in this course")
     
     try:
         chapter.chapter_title = update_chapter.title  # type: ignore
         chapter.chapter_description = update_chapter.description  # type: ignore
-        db.commit()
-        db.refresh(chapter)
+        await db.run_sync(bump_data_version, user.get('id'))
+        await db.commit()
+        await db.refresh(chapter)
+        mark_write(response, user.get('id'))
         return {"message": "Chapter updated successfully", "chapter_id": chapter.id, "title": chapter.chapter_title}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to update chapter: {str(e)}")
 
 
-@router.delete('/deleteChapter/{chapter_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_chapter_from_course(db:db_dependency, user:user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)]):
-    """Delete a chapter from a course owned by the authenticated user."""
+@router.delete('/deleteChapter/{chapter_id}', status_code=status.HTTP_202_ACCEPTED, response_model=PurgeJobResponse)
+async def delete_chapter_from_course(db:async_db_dependency, user:user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], background_tasks: BackgroundTasks, response: Response):
+    """Delete a chapter from a course owned by the authenticated user with its files and activity, in the background."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
     # Verify that the course exists and belongs to the user
-    course = db.query(Courses).filter(Courses.id == course_id, Courses.owner_id == user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id, Courses.owner_id == user.get('id'), *not_purging(Courses.owner_id, Courses.id)).limit(1))
     if not course:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Course not found")
     
-    # Verify that the chapter exists, belongs to the course, and belongs to the user
-    chapter = db.query(Chapters).filter(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).first()
+    # Verify that the chapter exists, belongs to the course, and belongs to the user; a repeated
+    # delete answers with its unfinished purge job
+    chapter = await db.scalar(select(Chapters).where(Chapters.id == chapter_id, Chapters.course_id == course_id, Chapters.owner_id == user.get('id')).limit(1))
     if chapter is None:
         raise HTTPException(status_code=404, detail="Chapter Not Found")
     
-    db.delete(chapter)
-    db.commit()
\ No newline at end of file
+    job = await db.run_sync(create_purge_job, user.get('id'), "chapter", chapter_id)
+    background_tasks.add_task(run_purge_job, str(job.id))
+    forget_ownership(user.get('id'))
+    mark_write(response, user.get('id'))
+    return purge_job_response(job)
\ No newline at end of file
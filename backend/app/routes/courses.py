@@ -1,10 +1,17 @@
 from typing import Annotated
-from fastapi import APIRouter, HTTPException, status, Path
+from fastapi import APIRouter, HTTPException, status, Path, BackgroundTasks, Response
 from pydantic import BaseModel
+from sqlalchemy import select
 
 from app.models import Courses, Users
-from .auth import db_dependency
+from .auth import async_db_dependency, read_db_dependency
 from .users import user_dependency
+from .ownership import forget_ownership
+from .etags import data_etag
+from .pagination import Page, DEFAULT_PAGE_SIZE, limit_query, cursor_query, fields_query, selected_fields, columns, paginate, build_page
+from app.data_versions import bump_data_version
+from app.replicas import mark_write
+from app.purge.services.purge import create_purge_job, run_purge_job, purge_job_response, not_purging, PurgeJobResponse
 
 router = APIRouter(
     prefix='/courses',
@@ -16,22 +23,42 @@ class CreateCourseRequest(BaseModel):
     title: str
     description: str
 
-@router.get('/', status_code=status.HTTP_200_OK)
-def view_course(db:db_dependency, user:user_dependency):
-    """List all courses owned by the authenticated user."""
+
+class CourseWriteResponse(BaseModel):
+    message: str
+    course_id: int
+    title: str
+
+
+class CourseItem(BaseModel):
+    id: int
+    title: str | None = None
+    description: str | None = None
+    owner_id: int | None = None
+
+@router.get('/', status_code=status.HTTP_200_OK, response_model=Page[CourseItem], response_model_exclude_unset=True, dependencies=[data_etag])
+async def view_course(db:read_db_dependency, user:user_dependency, cursor: cursor_query = None, limit: limit_query = DEFAULT_PAGE_SIZE, fields: fields_query = None):
+    """List a page of the courses owned by the authenticated user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    courses = db.query(Courses).filter(Courses.owner_id == user.get('id')).all()
-    return courses
+    names = selected_fields(CourseItem, fields)
+    stmt = select(*columns(Courses, names)).where(Courses.owner_id == user.get('id'), *not_purging(Courses.owner_id, Courses.id))
+    rows = (await db.execute(paginate(stmt, Courses, cursor, limit))).all()
+    return build_page(rows, names, CourseItem, limit)
 
-@router.post('/createCourse', status_code=status.HTTP_201_CREATED)
-def create_course(user:user_dependency, db:db_dependency, add_course:CreateCourseRequest):
+@router.post('/createCourse', status_code=status.HTTP_201_CREATED, response_model=CourseWriteResponse)
+async def create_course(user:user_dependency, db:async_db_dependency, add_course:CreateCourseRequest, response: Response):
     """Create a new course for the authenticated user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
+    # An account being deleted takes no new courses
+    owner = await db.scalar(select(Users.id).where(Users.id == user.get('id'), *not_purging(Users.id)))
+    if owner is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
     # Check if course title already exists
-    existing_course = db.query(Courses).filter(Courses.title == add_course.title).first()
+    existing_course = await db.scalar(select(Courses).where(Courses.title == add_course.title).limit(1))
     if existing_course:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -45,43 +72,51 @@ def create_course(user:user_dependency, db:db_dependency, add_course:CreateCours
     )
     try:
         db.add(new_course)
-        db.commit()
-        db.refresh(new_course)
+        await db.run_sync(bump_data_version, user.get('id'))
+        await db.commit()
+        await db.refresh(new_course)
+        mark_write(response, user.get('id'))
         return {"message": "Course created successfully", "course_id": new_course.id, "title": new_course.title}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Failed to create new course: {str(e)}"
         )
 
 
-@router.put('/updateCourse/{course_id}', status_code=status.HTTP_202_ACCEPTED)
-def update_course(db:db_dependency, user:user_dependency, course_update:CreateCourseRequest, course_id: Annotated[int, Path(gt=0)]):
+@router.put('/updateCourse/{course_id}', status_code=status.HTTP_202_ACCEPTED, response_model=CourseWriteResponse)
+async def update_course(db:async_db_dependency, user:user_dependency, course_update:CreateCourseRequest, course_id: Annotated[int, Path(gt=0)], response: Response):
     """Update title and description of a course owned by the authenticated user."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    course = db.query(Courses).filter(Courses.id == course_id).filter(Courses.owner_id==user.get('id')).first()
+    course = await db.scalar(select(Courses).where(Courses.id == course_id).where(Courses.owner_id==user.get('id'), *not_purging(Courses.owner_id, Courses.id)))
     if course is None:
         raise HTTPException(status_code=404, detail="Course Not Found")
     try:
         course.title = course_update.title  # type: ignore
         course.description = course_update.description  # type: ignore
-        db.commit()
-        db.refresh(course)
+        await db.run_sync(bump_data_version, user.get('id'))
+        await db.commit()
+        await db.refresh(course)
+        mark_write(response, user.get('id'))
         return {"message": "Course updated successfully", "course_id": course.id, "title": course.title}
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Failed to edit course: {str(e)}")
 
 
-@router.delete('/deleteCourse/{course_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_course(db:db_dependency, user:user_dependency, course_id: Annotated[int, Path(gt=0)]):
-    """Delete a course owned by the authenticated user."""
+@router.delete('/deleteCourse/{course_id}', status_code=status.HTTP_202_ACCEPTED, response_model=PurgeJobResponse)
+async def delete_course(db:async_db_dependency, user:user_dependency, course_id: Annotated[int, Path(gt=0)], background_tasks: BackgroundTasks, response: Response):
+    """Delete a course owned by the authenticated user with all of its chapters, files and activity, in the background."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    course = db.query(Courses).filter(Courses.id == course_id).filter(Courses.owner_id==user.get('id')).first()
+    # A repeated delete of the course answers with its unfinished purge job
+    course = await db.scalar(select(Courses).where(Courses.id == course_id).where(Courses.owner_id==user.get('id'), *not_purging(Courses.owner_id)))
     if course is None:
         raise HTTPException(status_code=404, detail="Course Not Found")
-    db.query(Courses).filter(Courses.id == course_id).filter(Courses.owner_id==user.get('id')).delete()
-    db.commit()
\ No newline at end of file
+    job = await db.run_sync(create_purge_job, user.get('id'), "course", course_id)
+    background_tasks.add_task(run_purge_job, str(job.id))
+    forget_ownership(user.get('id'))
+    mark_write(response, user.get('id'))
+    return purge_job_response(job)
\ No newline at end of file
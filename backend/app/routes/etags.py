@@ -0,0 +1,67 @@
+"""
+ETag / 304 handling for responses derived from a user's data.
+
+Routes opt in with `dependencies=[data_etag]`, or with a dependency from data_etag_dependency()
+when their responses also depend on something other than the user's data (e.g. the
+recommendation model version). The dependency runs before the route: it reads the user's data
+version (app.data_versions) and derives a strong ETag from it, the request path and query,
+and the current UTC day. Responses may depend on the time only through the UTC date (default
+time series ranges, inactive days counted in calendar days); a value relative to the current
+time of day would go stale behind a 304. When If-None-Match matches, the request ends here
+with 304 and the route's queries never run; otherwise the ETag is set on the route's response.
+
+The version is read before, and on the same session as, the route's own queries, so a tag is
+never newer than the data it is served with. Browsers revalidate these responses on their own
+(Cache-Control: no-cache), so clients need no changes.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from typing import Annotated, Callable
+
+from fastapi import Depends, HTTPException, Request, Response, status
+
+from app.data_versions import get_data_version
+from .auth import read_db_dependency, get_current_user
+
+# Bump when a change to response shapes must invalidate tags already held by clients
+ETAG_FORMAT_VERSION = 1
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def data_etag_value(owner_id: int, version: int, request: Request, extra: str = "") -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    day = datetime.now(timezone.utc).date().isoformat()
+    digest = hashlib.sha256(f"{ETAG_FORMAT_VERSION}|{owner_id}|{version}|{day}|{extra}|{request.url.path}?{query}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def data_etag_dependency(extra: Callable[[], object] | None = None):
+    """ An ETag dependency; extra() returns whatever else the responses depend on, folded into the tag. """
+
+    async def check_data_etag(request: Request, response: Response, db: read_db_dependency, user: Annotated[dict, Depends(get_current_user)]) -> str:
+        if user is None:
+            raise HTTPException(status_code=401, detail="Authentication Failed")
+
+        version = await get_data_version(db, user.get('id'))
+        etag = data_etag_value(user.get('id'), version, request, str(extra()) if extra is not None else "")
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Authorization"}
+
+        if _matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return etag
+
+    return Depends(check_data_etag)
+
+
+data_etag = data_etag_dependency()
@@ -0,0 +1,160 @@
+"""
+Ownership resolution for the nested /courses/{course_id}/chapter/{chapter_id}/files/{file_id} routes.
+
+Each dependency authorizes the whole path in one joined query and hands the route a typed
+context, instead of the route looking up the course, chapter and file one after another.
+Ownership facts that were confirmed recently are kept in a small per-process cache, so
+chapter-scoped routes and file routes that do not need the file row skip the database
+altogether. Deleting a course, chapter or file calls forget_ownership() for its owner;
+other workers see the deletion when OWNERSHIP_CACHE_SECONDS runs out. A chapter whose
+chapter, course or owner is being purged counts as not found.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Annotated
+
+from fastapi import Depends, HTTPException, Path
+from sqlalchemy import and_
+
+from app.models import Chapters, ChapterFiles
+from app.purge.services.purge import not_purging
+from .auth import db_dependency, get_current_user
+
+OWNERSHIP_CACHE_SECONDS = float(os.getenv("OWNERSHIP_CACHE_SECONDS", "30"))
+OWNERSHIP_CACHE_SIZE = int(os.getenv("OWNERSHIP_CACHE_SIZE", "10000"))
+
+# Same dependency as users.user_dependency; users.py imports this module, so it is not imported from there
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+@dataclass(frozen=True)
+class ChapterContext:
+    owner_id: int
+    course_id: int
+    chapter_id: int
+
+
+@dataclass(frozen=True)
+class FileAccess(ChapterContext):
+    file_id: int
+
+
+@dataclass(frozen=True)
+class FileContext(FileAccess):
+    file: ChapterFiles
+
+
+class OwnershipCache:
+    """ Keys are (owner_id, course_id, chapter_id) or (owner_id, course_id, chapter_id, file_id). """
+
+    def __init__(self, ttl_seconds: float, max_size: int):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self._expiry: OrderedDict = OrderedDict()
+        # Sync routes resolve ownership from threadpool threads
+        self._lock = threading.Lock()
+
+    def known(self, key: tuple) -> bool:
+        with self._lock:
+            expires_at = self._expiry.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._expiry[key]
+                return False
+            return True
+
+    def remember(self, *keys: tuple):
+        with self._lock:
+            expires_at = time.monotonic() + self.ttl
+            for key in keys:
+                self._expiry[key] = expires_at
+                self._expiry.move_to_end(key)
+            while len(self._expiry) > self.max_size:
+                self._expiry.popitem(last=False)
+
+    def forget_owner(self, owner_id: int):
+        with self._lock:
+            for key in [key for key in self._expiry if key[0] == owner_id]:
+                del self._expiry[key]
+
+
+ownership_cache = OwnershipCache(OWNERSHIP_CACHE_SECONDS, OWNERSHIP_CACHE_SIZE)
+
+
+def forget_ownership(owner_id: int):
+    """ Drop cached ownership facts of a user after one of their courses, chapters or files is deleted. """
+    ownership_cache.forget_owner(owner_id)
+
+
+def _owner_id(user: dict) -> int:
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+    return user.get('id')
+
+
+def _load_file(db, owner_id: int, course_id: int, chapter_id: int, file_id: int) -> ChapterFiles:
+    """ The chapter and the file in one query; 404s say which of them is missing. """
+    row = db.query(Chapters.id, ChapterFiles).outerjoin(
+        ChapterFiles,
+        and_(
+            ChapterFiles.id == file_id,
+            ChapterFiles.chapter_id == Chapters.id,
+            ChapterFiles.course_id == course_id,
+            ChapterFiles.owner_id == owner_id
+        )
+    ).filter(
+        Chapters.id == chapter_id,
+        Chapters.course_id == course_id,
+        Chapters.owner_id == owner_id,
+        *not_purging(Chapters.owner_id, Chapters.course_id, Chapters.id)
+    ).first()
+
+    if row is None:
+        raise HTTPException(status_code=404, detail="Chapter Not Found")
+    ownership_cache.remember((owner_id, course_id, chapter_id))
+    if row.ChapterFiles is None:
+        raise HTTPException(status_code=404, detail="File Not Found")
+    ownership_cache.remember((owner_id, course_id, chapter_id, file_id))
+    return row.ChapterFiles
+
+
+def get_chapter_context(db: db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)]) -> ChapterContext:
+    """ Authorize a chapter-scoped route. """
+    owner_id = _owner_id(user)
+    key = (owner_id, course_id, chapter_id)
+    if not ownership_cache.known(key):
+        chapter = db.query(Chapters.id).filter(
+            Chapters.id == chapter_id,
+            Chapters.course_id == course_id,
+            Chapters.owner_id == owner_id,
+            *not_purging(Chapters.owner_id, Chapters.course_id, Chapters.id)
+        ).first()
+        if chapter is None:
+            raise HTTPException(status_code=404, detail="Chapter Not Found")
+        ownership_cache.remember(key)
+    return ChapterContext(owner_id=owner_id, course_id=course_id, chapter_id=chapter_id)
+
+
+def get_file_access(db: db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], file_id: Annotated[int, Path(gt=0)]) -> FileAccess:
+    """ Authorize a file route that does not need the file row itself. """
+    owner_id = _owner_id(user)
+    if not ownership_cache.known((owner_id, course_id, chapter_id, file_id)):
+        _load_file(db, owner_id, course_id, chapter_id, file_id)
+    return FileAccess(owner_id=owner_id, course_id=course_id, chapter_id=chapter_id, file_id=file_id)
+
+
+def get_file_context(db: db_dependency, user: user_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], file_id: Annotated[int, Path(gt=0)]) -> FileContext:
+    """ Authorize a file route and load the file row, in one query. """
+    owner_id = _owner_id(user)
+    file = _load_file(db, owner_id, course_id, chapter_id, file_id)
+    return FileContext(owner_id=owner_id, course_id=course_id, chapter_id=chapter_id, file_id=file_id, file=file)
+
+
+chapter_context_dependency = Annotated[ChapterContext, Depends(get_chapter_context)]
+file_access_dependency = Annotated[FileAccess, Depends(get_file_access)]
+file_context_dependency = Annotated[FileContext, Depends(get_file_context)]
@@ -0,0 +1,83 @@
+"""
+Keyset pagination and field selection for list endpoints.
+
+Lists are ordered by id and paged with an opaque cursor holding the last id returned, so a page
+costs the same index range scan however far into the list it is (no OFFSET). A `fields` query
+parameter narrows the columns that are selected and serialized; id is always included because
+the cursor is built from it.
+"""
+
+import base64
+import binascii
+import json
+from typing import Annotated, Generic, TypeVar
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    # Pass back as ?cursor= for the next page; None on the last page
+    next_cursor: str | None = None
+
+
+limit_query = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+cursor_query = Annotated[str | None, Query(description="next_cursor of the previous page")]
+fields_query = Annotated[str | None, Query(description="Comma-separated fields to return; all when omitted")]
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    """ The last id of the previous page, or None for the first page. """
+    if cursor is None:
+        return None
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["id"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return last_id
+
+
+def selected_fields(item_model: type[BaseModel], fields: str | None) -> list:
+    """ Field names to select for item_model, from a comma-separated `fields` parameter. """
+    available = list(item_model.model_fields)
+    if fields is None:
+        return available
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    return ["id"] + [name for name in available if name in requested and name != "id"]
+
+
+def columns(model, names: list) -> list:
+    return [getattr(model, name) for name in names]
+
+
+def paginate(stmt, model, cursor: str | None, limit: int):
+    """ Restrict a select over model to the page after cursor: limit rows plus one to detect a next page. """
+    after = decode_cursor(cursor)
+    if after is not None:
+        stmt = stmt.where(model.id > after)
+    return stmt.order_by(model.id).limit(limit + 1)
+
+
+def build_page(rows: list, names: list, item_model: type[BaseModel], limit: int) -> Page:
+    """ Page of item_model built from paginate()'s rows; unselected fields stay unset. """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return Page(
+        items=[item_model(**dict(zip(names, row))) for row in rows],
+        next_cursor=encode_cursor(rows[-1].id) if has_more else None
+    )
@@ -0,0 +1,319 @@
+"""Resumable chunked uploads: create a session, PUT numbered parts in any order, then finalize."""
+
+from typing import Annotated
+from fastapi import APIRouter, HTTPException, Path, status, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from datetime import datetime, timezone, timedelta
+import math
+import uuid
+
+from app.models import ChapterFiles, UploadSessions
+from .auth import db_dependency
+from .users import user_dependency
+from .ownership import chapter_context_dependency
+from .chapter_file import ALLOWED_MIME_TYPES, UploadFileResponse
+from app.storage import get_storage, run_sync, StorageError, ObjectNotFoundError
+from app.storage.files import download_to_tempfile, extract_pages_from_file
+from app.storage.blobs import acquire_blob, temp_upload_key
+from app.search.services.ingestion import try_index_content
+from app.data_versions import bump_data_version
+
+
+router = APIRouter(
+    prefix="/courses/{course_id}/chapter/{chapter_id}/files/uploads",
+    tags=["chapter_file"]
+)
+
+MAX_RESUMABLE_FILE_SIZE = 200 * 1024 * 1024  # 200MB
+RESUMABLE_PART_SIZE = 8 * 1024 * 1024  # 8MB; S3 needs >= 5MB for all but the last part
+UPLOAD_SESSION_TTL = timedelta(hours=24)
+
+
+class CreateUploadSessionRequest(BaseModel):
+    file_name: str
+    mime_type: str
+    file_size: int
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    part_size: int
+    total_parts: int
+    expires_at: str
+
+
+class UploadPartResponse(BaseModel):
+    upload_id: str
+    part_number: int
+    etag: str
+
+
+class UploadStatusResponse(UploadSessionResponse):
+    file_name: str
+    received_parts: list[int]
+    missing_parts: list[int]
+
+
+def _expected_part_size(upload: UploadSessions, part_number: int) -> int:
+    if part_number < upload.total_parts:
+        return upload.part_size
+    return upload.file_size - upload.part_size * (upload.total_parts - 1)
+
+
+def _get_active_upload(db, user_id: int, course_id: int, chapter_id: int, upload_id: str) -> UploadSessions:
+    upload = db.query(UploadSessions).filter(
+        UploadSessions.id == upload_id,
+        UploadSessions.owner_id == user_id,
+        UploadSessions.course_id == course_id,
+        UploadSessions.chapter_id == chapter_id
+    ).first()
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload Not Found")
+    if upload.status != "active":
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+    if upload.expires_at <= datetime.now(timezone.utc):
+        raise HTTPException(status_code=410, detail="Upload session expired")
+    return upload
+
+
+def _extend_upload(db, upload: UploadSessions):
+    # Sliding expiry: an upload stays alive while parts keep arriving
+    upload.expires_at = datetime.now(timezone.utc) + UPLOAD_SESSION_TTL  # type: ignore
+    db.commit()
+
+
+def _list_parts(db, upload: UploadSessions) -> list:
+    try:
+        return run_sync(get_storage().list_parts, str(upload.storage_key), str(upload.storage_upload_id))
+    except ObjectNotFoundError:
+        # Completed or aborted by an earlier request that did not get to record it
+        _fail_upload(db, upload)
+        raise HTTPException(status_code=410, detail="Upload no longer exists in storage")
+    except StorageError as e:
+        raise HTTPException(status_code=409, detail=f"Upload parts could not be listed: {str(e)}")
+
+
+def _fail_upload(db, upload: UploadSessions):
+    """
+    Give up on an upload whose multipart upload is gone, so it cannot be resumed. The assembled
+    object, if any, is deleted here: expiry only aborts multipart uploads, so nothing else would.
+    """
+    db.rollback()
+    upload.status = "failed"  # type: ignore
+    db.commit()
+    try:
+        run_sync(get_storage().delete, str(upload.storage_key))
+    except StorageError:
+        pass
+
+
+def expire_upload_sessions(db, owner_id: int | None = None) -> int:
+    """Abort the multipart uploads of expired active sessions and mark them expired."""
+    query = db.query(UploadSessions).filter(
+        UploadSessions.status == "active",
+        UploadSessions.expires_at <= datetime.now(timezone.utc)
+    )
+    if owner_id is not None:
+        query = query.filter(UploadSessions.owner_id == owner_id)
+
+    expired = query.all()
+    storage = get_storage()
+    for upload in expired:
+        run_sync(storage.abort_multipart, str(upload.storage_key), str(upload.storage_upload_id))
+        upload.status = "expired"  # type: ignore
+    db.commit()
+    return len(expired)
+
+
+@router.post("", status_code=status.HTTP_201_CREATED, response_model=UploadSessionResponse)
+def create_upload_session(db: db_dependency, chapter: chapter_context_dependency, request: CreateUploadSessionRequest):
+    """Start a resumable upload and return the part size and part count to send"""
+
+    if request.mime_type not in ALLOWED_MIME_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_MIME_TYPES.keys())}"
+        )
+
+    if request.file_size <= 0 or request.file_size > MAX_RESUMABLE_FILE_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"File size must be between 1 byte and {MAX_RESUMABLE_FILE_SIZE / (1024 * 1024)}MB"
+        )
+
+    # Clean up this user's abandoned uploads before starting another
+    expire_upload_sessions(db, owner_id=chapter.owner_id)
+
+    # Parts are assembled under a staging key; the final object is stored by content hash
+    storage_key = temp_upload_key()
+
+    try:
+        upload = UploadSessions(
+            id=str(uuid.uuid4()),
+            owner_id=chapter.owner_id,
+            course_id=chapter.course_id,
+            chapter_id=chapter.chapter_id,
+            file_name=request.file_name,
+            mime_type=request.mime_type,
+            file_size=request.file_size,
+            part_size=RESUMABLE_PART_SIZE,
+            total_parts=math.ceil(request.file_size / RESUMABLE_PART_SIZE),
+            storage_key=storage_key,
+            storage_upload_id=run_sync(get_storage().create_multipart, storage_key),
+            status="active",
+            expires_at=datetime.now(timezone.utc) + UPLOAD_SESSION_TTL
+        )
+        db.add(upload)
+        db.commit()
+
+        return {
+            "upload_id": upload.id,
+            "part_size": upload.part_size,
+            "total_parts": upload.total_parts,
+            "expires_at": upload.expires_at.isoformat()
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to create upload: {str(e)}")
+
+
+@router.put("/{upload_id}/parts/{part_number}", status_code=status.HTTP_200_OK, response_model=UploadPartResponse)
+async def upload_part(
+    http_request: Request,
+    user: user_dependency,
+    db: db_dependency,
+    course_id: Annotated[int, Path(gt=0)],
+    chapter_id: Annotated[int, Path(gt=0)],
+    upload_id: str,
+    part_number: Annotated[int, Path(gt=0, le=10000)]
+):
+    """Upload one numbered part. Parts may arrive in any order, in parallel, and may be re-sent"""
+
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    # The body read and the storage call stay on the event loop; the session work runs in the threadpool
+    upload = await run_in_threadpool(_get_active_upload, db, user.get('id'), course_id, chapter_id, upload_id)
+    if part_number > upload.total_parts:
+        raise HTTPException(status_code=400, detail=f"Part number must be between 1 and {upload.total_parts}")
+
+    body = await http_request.body()
+    expected_size = _expected_part_size(upload, part_number)
+    if len(body) != expected_size:
+        raise HTTPException(status_code=400, detail=f"Part {part_number} must be exactly {expected_size} bytes")
+
+    try:
+        etag = await get_storage().upload_part(str(upload.storage_key), str(upload.storage_upload_id), part_number, body)
+    except ObjectNotFoundError:
+        raise HTTPException(status_code=410, detail="Upload no longer exists in storage")
+
+    await run_in_threadpool(_extend_upload, db, upload)
+
+    return {"upload_id": upload_id, "part_number": part_number, "etag": etag}
+
+
+@router.get("/{upload_id}", status_code=status.HTTP_200_OK, response_model=UploadStatusResponse)
+def get_upload_status(user: user_dependency, db: db_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], upload_id: str):
+    """Report which parts have been received so a client can resume"""
+
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    upload = _get_active_upload(db, user.get('id'), course_id, chapter_id, upload_id)
+    received = [part["PartNumber"] for part in _list_parts(db, upload)]
+    received_set = set(received)
+
+    return {
+        "upload_id": upload.id,
+        "file_name": upload.file_name,
+        "part_size": upload.part_size,
+        "total_parts": upload.total_parts,
+        "received_parts": received,
+        "missing_parts": [n for n in range(1, upload.total_parts + 1) if n not in received_set],
+        "expires_at": upload.expires_at.isoformat()
+    }
+
+
+@router.post("/{upload_id}/complete", status_code=status.HTTP_201_CREATED, response_model=UploadFileResponse)
+def complete_upload(user: user_dependency, db: db_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], upload_id: str):
+    """Assemble all parts into the final file, index it and store its metadata"""
+
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    upload = _get_active_upload(db, user.get('id'), course_id, chapter_id, upload_id)
+    storage_key = str(upload.storage_key)
+
+    storage = get_storage()
+    parts = _list_parts(db, upload)
+    received_set = {part["PartNumber"] for part in parts}
+    missing = [n for n in range(1, upload.total_parts + 1) if n not in received_set]
+    if missing:
+        raise HTTPException(status_code=409, detail=f"Missing parts: {missing}")
+
+    try:
+        run_sync(storage.complete_multipart, storage_key, str(upload.storage_upload_id), parts)
+    except StorageError as e:
+        raise HTTPException(status_code=409, detail=f"Upload parts could not be assembled: {str(e)}")
+
+    # The multipart upload is gone from here on, so a failure cannot be retried: the session
+    # is marked failed and the assembled object deleted
+    file_obj = None
+    try:
+        # Read the assembled object back once to hash it and index its content
+        file_obj, content_hash = run_sync(download_to_tempfile, storage_key)
+        blob, is_new_blob = acquire_blob(db, content_hash, int(upload.file_size))
+        if is_new_blob:
+            run_sync(storage.copy, storage_key, str(blob.storage_key))
+
+        new_file = ChapterFiles(
+            file_name=upload.file_name,
+            file_path=blob.storage_key,
+            file_type=ALLOWED_MIME_TYPES[str(upload.mime_type)],
+            mime_type=upload.mime_type,
+            file_size=upload.file_size,
+            content_hash=content_hash,
+            owner_id=user.get('id'),
+            chapter_id=chapter_id,
+            course_id=course_id
+        )
+        db.add(new_file)
+        bump_data_version(db, user.get('id'))
+        upload.status = "completed"  # type: ignore
+        db.commit()
+    except Exception as e:
+        if file_obj is not None:
+            file_obj.close()
+        _fail_upload(db, upload)
+        raise HTTPException(status_code=500, detail=f"Failed to complete upload: {str(e)}")
+
+    # Index after the commit released the blob row, so same-content uploads and deletes do not wait on extraction
+    with file_obj:
+        try_index_content(db, content_hash, lambda: extract_pages_from_file(file_obj, str(upload.file_name)))
+
+    db.refresh(new_file)
+    run_sync(storage.delete, storage_key)
+
+    return {
+        "message": "File uploaded successfully",
+        "file_id": new_file.id,
+        "file_name": new_file.file_name,
+        "file_size": new_file.file_size,
+        "file_path": new_file.file_path
+    }
+
+
+@router.delete("/{upload_id}", status_code=status.HTTP_204_NO_CONTENT, response_class=Response)
+def abort_upload(user: user_dependency, db: db_dependency, course_id: Annotated[int, Path(gt=0)], chapter_id: Annotated[int, Path(gt=0)], upload_id: str):
+    """Abandon an upload and discard its parts"""
+
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    upload = _get_active_upload(db, user.get('id'), course_id, chapter_id, upload_id)
+    run_sync(get_storage().abort_multipart, str(upload.storage_key), str(upload.storage_upload_id))
+    upload.status = "aborted"  # type: ignore
+    db.commit()
@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Path
+from fastapi import APIRouter, Depends, status, HTTPException, Path, BackgroundTasks
 from typing import Annotated, List
 from passlib.context import CryptContext  # type: ignore[reportMissingImports]
 from sqlalchemy.orm import Session
+from sqlalchemy import select
 from pydantic import BaseModel
 
 from app.models import Users
-from .auth import get_db, get_current_user
+from .auth import get_db, get_current_user, async_db_dependency
+from .ownership import forget_ownership
+from app.purge.services.purge import create_purge_job, run_purge_job, purge_job_response, not_purging, PurgeJobResponse
 
 router = APIRouter(
     prefix='/user',
@@ -33,11 +36,11 @@ class UserResponse(BaseModel):
 
 
 @router.get('/', response_model=UserResponse, status_code=status.HTTP_200_OK)
-def get_users(db: db_dependency, user:user_dependency):
+async def get_users(db: async_db_dependency, user:user_dependency):
     """Return the authenticated user's profile details."""
     if user is None :
         raise HTTPException(status_code=401, detail="Authentication Failed")
-    user_obj = db.query(Users).filter(Users.id == user.get('id')).first()
+    user_obj = await db.scalar(select(Users).where(Users.id == user.get('id'), *not_purging(Users.id)))
     if user_obj is None:
         raise HTTPException(status_code=404, detail="User not found")
     return user_obj
@@ -47,15 +50,18 @@ def get_users(db: db_dependency, user:user_dependency):
 
 
 ## delete the use
-@router.delete('/deleteuser/{user_id}', status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(db: db_dependency, user:user_dependency):
+@router.delete('/deleteuser/{user_id}', status_code=status.HTTP_202_ACCEPTED, response_model=PurgeJobResponse)
+async def delete_user(db: async_db_dependency, user:user_dependency, background_tasks: BackgroundTasks):
+    """Delete the authenticated user's account and everything they own, in the background."""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
     
-    user_obj = db.query(Users).filter(Users.id == user.get('id')).first()
+    user_obj = await db.scalar(select(Users).where(Users.id == user.get('id')))
     
     if user_obj is None:
         raise HTTPException(status_code=404, detail="User Not Found")
     
-    db.delete(user_obj)
-    db.commit()
\ No newline at end of file
+    job = await db.run_sync(create_purge_job, user_obj.id, "user", user_obj.id)
+    background_tasks.add_task(run_purge_job, str(job.id))
+    forget_ownership(user.get('id'))
+    return purge_job_response(job)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""Full-text search over the authenticated user's course material."""
+
+from typing import Annotated
+from fastapi import APIRouter, HTTPException, Query, status
+from pydantic import BaseModel
+
+from app.routes.auth import db_dependency
+from app.routes.users import user_dependency
+from app.search.services.inverted_index import search_documents
+
+router = APIRouter(
+    prefix="/search",
+    tags=["Search"]
+)
+
+
+class SearchHit(BaseModel):
+    file_id: int
+    file_name: str
+    chapter_id: int
+    course_id: int
+    score: float
+    matched_terms: list[str]
+    snippet: str
+
+
+class SearchResponse(BaseModel):
+    query: str
+    page: int
+    page_size: int
+    total: int
+    results: list[SearchHit]
+
+
+@router.get("/", status_code=status.HTTP_200_OK, response_model=SearchResponse)
+def search_files(
+    db: db_dependency,
+    user: user_dependency,
+    q: Annotated[str, Query(min_length=1, max_length=500)],
+    course_id: Annotated[int | None, Query(gt=0)] = None,
+    chapter_id: Annotated[int | None, Query(gt=0)] = None,
+    page: Annotated[int, Query(ge=1)] = 1,
+    page_size: Annotated[int, Query(ge=1, le=100)] = 20
+):
+    """ Ranked search over all indexed files, optionally scoped to a course or chapter """
+    if user is None:
+        raise HTTPException(status_code=401, detail="Authentication Failed")
+
+    result = search_documents(
+        db=db,
+        owner_id=user.get("id"),
+        query=q,
+        course_id=course_id,
+        chapter_id=chapter_id,
+        page=page,
+        page_size=page_size
+    )
+
+    return {
+        "query": q,
+        "page": page,
+        "page_size": page_size,
+        "total": result["total"],
+        "results": result["results"]
+    }
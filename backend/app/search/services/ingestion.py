@@ -0,0 +1,64 @@
+"""Ingestion of stored files into the page store and inverted index, once per distinct content."""
+
+from sqlalchemy.orm import Session
+
+from app.models.chapter_files import ChapterFiles
+from app.models.file_index import FileDocuments
+from app.search.services.inverted_index import index_content, get_document
+from app.storage import get_storage, run_sync
+from app.storage.blobs import adopt_blob
+from app.storage.files import download_to_tempfile, extract_pages_from_file, read_pages
+
+
+def try_index_content(db: Session, content_hash: str, pages_loader):
+    """
+    Index a blob unless it already is, and commit. Call it once the file row is committed, so
+    the extraction does not run while the blob row is locked. pages_loader() returns the
+    extracted pages and is only called when needed. Failures (including a concurrent upload
+    indexing the same content) are swallowed: unextractable files are still stored and get
+    indexed lazily on first view.
+    """
+    if get_document(db, content_hash) is not None:
+        return
+    try:
+        index_content(db, content_hash, pages_loader())
+        db.commit()
+    except Exception:
+        db.rollback()
+
+
+def ensure_file_indexed(db: Session, file: ChapterFiles) -> FileDocuments:
+    """
+    Return the index header for a file's content, extracting and indexing it from storage
+    first if needed. Files uploaded before content addressing are hashed and registered as
+    blobs on the way; if their content already exists, the duplicate object is deleted.
+    Must be called from a sync route (threadpool).
+    """
+    redundant_key = None
+
+    if file.content_hash is None:
+        legacy_key = str(file.file_path)
+        file_obj, content_hash = run_sync(download_to_tempfile, legacy_key)
+        try:
+            blob, is_new = adopt_blob(db, content_hash, legacy_key, int(file.file_size))
+            file.content_hash = content_hash  # type: ignore
+            file.file_path = blob.storage_key  # type: ignore
+            db.flush()
+            # Old uploads with the same name shared one key; only drop it once nothing points at it
+            if not is_new and db.query(ChapterFiles.id).filter(ChapterFiles.file_path == legacy_key).first() is None:
+                redundant_key = legacy_key
+            if get_document(db, content_hash) is None:
+                index_content(db, content_hash, extract_pages_from_file(file_obj, str(file.file_name)))
+        finally:
+            file_obj.close()
+        db.commit()
+    else:
+        content_hash = str(file.content_hash)
+        if get_document(db, content_hash) is None:
+            index_content(db, content_hash, run_sync(read_pages, str(file.file_path), str(file.file_name)))
+            db.commit()
+
+    if redundant_key is not None:
+        run_sync(get_storage().delete, redundant_key)
+
+    return get_document(db, content_hash)
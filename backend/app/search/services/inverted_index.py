@@ -0,0 +1,249 @@
+"""Inverted index and per-page text store over extracted blob text: indexing, paging and ranked search."""
+
+import math
+import re
+from collections import defaultdict
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, and_, or_, delete, insert
+
+from app.models.chapter_files import ChapterFiles
+from app.models.file_index import FileDocuments, FilePages, FileTermPostings
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "if", "in", "into", "is", "it",
+    "no", "not", "of", "on", "or", "such", "that", "the", "their", "then", "there", "these",
+    "they", "this", "to", "was", "will", "with",
+})
+
+MAX_TERM_LENGTH = 100
+MAX_POSITIONS_PER_POSTING = 1000
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_BEFORE = 80
+SNIPPET_LENGTH = 240
+
+
+def tokenize(text: str):
+    """Yield (term, char_offset) pairs for every indexable token in the text."""
+    for match in TOKEN_PATTERN.finditer(text.lower()):
+        term = match.group()
+        if len(term) < 2 or term in STOPWORDS or len(term) > MAX_TERM_LENGTH:
+            continue
+        yield term, match.start()
+
+
+def index_content(db: Session, content_hash: str, pages: list):
+    """
+    Build (or rebuild) the page store and postings for one blob's extracted pages.
+    Rows are added to the current transaction; the caller commits.
+    """
+    positions = defaultdict(list)
+    token_count = 0
+    page_rows = []
+    offset = 0
+    for page_number, page_text in enumerate(pages, start=1):
+        page_rows.append({
+            "content_hash": content_hash,
+            "page_number": page_number,
+            "char_offset": offset,
+            "char_length": len(page_text),
+            "content": page_text
+        })
+        for term, page_offset in tokenize(page_text):
+            positions[term].append(offset + page_offset)
+            token_count += 1
+        # Pages are joined with a single newline in the full text
+        offset += len(page_text) + 1
+
+    remove_index(db, content_hash)
+
+    db.add(FileDocuments(
+        content_hash=content_hash,
+        token_count=token_count,
+        page_count=len(page_rows)
+    ))
+    db.flush()
+
+    if page_rows:
+        db.execute(insert(FilePages), page_rows)
+
+    if positions:
+        db.execute(insert(FileTermPostings), [
+            {
+                "content_hash": content_hash,
+                "term": term,
+                "term_frequency": len(offsets),
+                "positions": ",".join(str(o) for o in offsets[:MAX_POSITIONS_PER_POSTING])
+            }
+            for term, offsets in positions.items()
+        ])
+
+
+def remove_index(db: Session, content_hash: str):
+    """Drop all index rows for a blob. The caller commits."""
+    db.execute(delete(FileTermPostings).where(FileTermPostings.content_hash == content_hash))
+    db.execute(delete(FilePages).where(FilePages.content_hash == content_hash))
+    db.execute(delete(FileDocuments).where(FileDocuments.content_hash == content_hash))
+
+
+def get_document(db: Session, content_hash: str):
+    return db.query(FileDocuments).filter(FileDocuments.content_hash == content_hash).first()
+
+
+def get_file_pages(db: Session, content_hash: str, start_page: int = 1, count: int = None):
+    """Return pages [start_page, start_page + count) in order; all remaining pages if count is None."""
+    query = db.query(FilePages.page_number, FilePages.content).filter(
+        FilePages.content_hash == content_hash,
+        FilePages.page_number >= start_page
+    )
+    if count is not None:
+        query = query.filter(FilePages.page_number < start_page + count)
+    return query.order_by(FilePages.page_number).all()
+
+
+def get_file_text(db: Session, content_hash: str) -> str:
+    return "\n".join(row.content for row in get_file_pages(db, content_hash))
+
+
+def search_documents(db: Session, owner_id: int, query: str, course_id: int = None, chapter_id: int = None, page: int = 1, page_size: int = 20):
+    """
+    Rank the owner's indexed files against the query with BM25.
+
+    Returns a dict with the total number of matching files and one page of results,
+    each carrying a snippet around the earliest hit.
+    """
+    terms = list(dict.fromkeys(term for term, _ in tokenize(query)))
+    if not terms:
+        return {"total": 0, "results": []}
+
+    # 1. Collection statistics for the owner (document count and average length)
+    stats_query = db.query(
+        func.count(ChapterFiles.id).label("doc_count"),
+        func.avg(FileDocuments.token_count).label("avg_length")
+    ).join(
+        FileDocuments, FileDocuments.content_hash == ChapterFiles.content_hash
+    ).filter(ChapterFiles.owner_id == owner_id)
+    if course_id is not None:
+        stats_query = stats_query.filter(ChapterFiles.course_id == course_id)
+    if chapter_id is not None:
+        stats_query = stats_query.filter(ChapterFiles.chapter_id == chapter_id)
+    stats = stats_query.one()
+
+    doc_count = stats.doc_count or 0
+    avg_length = float(stats.avg_length or 0) or 1.0
+    if doc_count == 0:
+        return {"total": 0, "results": []}
+
+    # 2. Postings for the query terms of the owner's files, with document length and file name.
+    #    Shared blobs are indexed once, so postings are reached through the owner's ChapterFiles.
+    postings_query = db.query(
+        ChapterFiles.id.label("file_id"),
+        ChapterFiles.course_id,
+        ChapterFiles.chapter_id,
+        ChapterFiles.file_name,
+        ChapterFiles.content_hash,
+        FileTermPostings.term,
+        FileTermPostings.term_frequency,
+        FileTermPostings.positions,
+        FileDocuments.token_count
+    ).join(
+        FileTermPostings, FileTermPostings.content_hash == ChapterFiles.content_hash
+    ).join(
+        FileDocuments, FileDocuments.content_hash == ChapterFiles.content_hash
+    ).filter(
+        ChapterFiles.owner_id == owner_id,
+        FileTermPostings.term.in_(terms)
+    )
+    if course_id is not None:
+        postings_query = postings_query.filter(ChapterFiles.course_id == course_id)
+    if chapter_id is not None:
+        postings_query = postings_query.filter(ChapterFiles.chapter_id == chapter_id)
+    postings = postings_query.all()
+
+    document_frequency = defaultdict(int)
+    for row in postings:
+        document_frequency[row.term] += 1
+
+    hits = {}
+    for row in postings:
+        idf = math.log(1 + (doc_count - document_frequency[row.term] + 0.5) / (document_frequency[row.term] + 0.5))
+        tf = row.term_frequency
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * row.token_count / avg_length)
+        first_offset = int(row.positions.split(",", 1)[0])
+
+        hit = hits.get(row.file_id)
+        if hit is None:
+            hit = hits[row.file_id] = {
+                "file_id": row.file_id,
+                "file_name": row.file_name,
+                "content_hash": row.content_hash,
+                "chapter_id": row.chapter_id,
+                "course_id": row.course_id,
+                "score": 0.0,
+                "matched_terms": [],
+                "first_offset": first_offset
+            }
+        hit["score"] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        hit["matched_terms"].append(row.term)
+        hit["first_offset"] = min(hit["first_offset"], first_offset)
+
+    ranked = sorted(hits.values(), key=lambda h: (-len(h["matched_terms"]), -h["score"], h["file_id"]))
+    start = (page - 1) * page_size
+    page_hits = ranked[start:start + page_size]
+
+    # 3. Snippets for the current page of results only, in a single query
+    snippets = _fetch_snippets(db, page_hits)
+
+    results = []
+    for hit in page_hits:
+        results.append({
+            "file_id": hit["file_id"],
+            "file_name": hit["file_name"],
+            "chapter_id": hit["chapter_id"],
+            "course_id": hit["course_id"],
+            "score": round(hit["score"], 4),
+            "matched_terms": hit["matched_terms"],
+            "snippet": snippets.get(hit["content_hash"], {}).get(hit["first_offset"], "")
+        })
+
+    return {"total": len(ranked), "results": results}
+
+
+def _fetch_snippets(db: Session, hits):
+    """
+    Cut a window of text around the first hit of every result, reading only the page that holds it.
+    Returns {content_hash: {offset: snippet}}.
+    """
+    if not hits:
+        return {}
+
+    first_offsets = {(hit["content_hash"], hit["first_offset"]) for hit in hits}
+    rows = db.query(
+        FilePages.content_hash,
+        FilePages.char_offset,
+        FilePages.char_length,
+        FilePages.content
+    ).filter(or_(*[
+        and_(
+            FilePages.content_hash == content_hash,
+            FilePages.char_offset <= offset,
+            FilePages.char_offset + FilePages.char_length >= offset
+        )
+        for content_hash, offset in first_offsets
+    ])).all()
+
+    snippets = defaultdict(dict)
+    for content_hash, offset in first_offsets:
+        for row in rows:
+            if row.content_hash == content_hash and row.char_offset <= offset <= row.char_offset + row.char_length:
+                start = max(0, offset - row.char_offset - SNIPPET_BEFORE)
+                snippets[content_hash][offset] = " ".join(row.content[start:start + SNIPPET_LENGTH].split())
+                break
+    return snippets
@@ -0,0 +1,72 @@
+"""Object storage package: backend selection and a sync bridge for threadpool routes."""
+
+import os
+from dotenv import load_dotenv
+import anyio.from_thread
+
+from app.storage.base import (
+    StorageBackend,
+    StoredObject,
+    StorageError,
+    ObjectNotFoundError,
+    InvalidRangeError,
+)
+
+load_dotenv()
+
+# "s3" (default) or "local"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "./storage_data")
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "50"))
+
+_storage: StorageBackend | None = None
+
+
+def get_storage() -> StorageBackend:
+    """Return the process-wide storage backend, creating it on first use."""
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            from app.storage.local_backend import LocalStorage
+            _storage = LocalStorage(LOCAL_STORAGE_ROOT)
+        elif STORAGE_BACKEND == "s3":
+            from app.storage.s3_backend import S3Storage
+            _storage = S3Storage(
+                bucket=os.getenv("S3_BUCKET_NAME"),
+                region=os.getenv("AWS_REGION"),
+                access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+                secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+                endpoint_url=os.getenv("S3_ENDPOINT_URL"),
+                max_pool_connections=S3_MAX_POOL_CONNECTIONS
+            )
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+    return _storage
+
+
+async def close_storage():
+    global _storage
+    if _storage is not None:
+        await _storage.close()
+        _storage = None
+
+
+def run_sync(async_fn, *args):
+    """
+    Run a storage coroutine function from a sync route or dependency.
+    Must be called from a worker thread started by the event loop (FastAPI's threadpool,
+    BackgroundTasks); the call executes on that loop so the pooled client is shared.
+    """
+    return anyio.from_thread.run(async_fn, *args)
+
+
+__all__ = [
+    "StorageBackend",
+    "StoredObject",
+    "StorageError",
+    "ObjectNotFoundError",
+    "InvalidRangeError",
+    "get_storage",
+    "close_storage",
+    "run_sync",
+]
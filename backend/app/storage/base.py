@@ -0,0 +1,115 @@
+"""Storage backend interface shared by the S3 and local filesystem implementations."""
+
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import AsyncIterator, Optional
+
+
+DEFAULT_CHUNK_SIZE = 64 * 1024  # 64KB per streamed chunk
+
+# Single byte range only: "bytes=start-end", "bytes=start-" or "bytes=-suffix"
+RANGE_HEADER_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class StorageError(Exception):
+    """Base error for storage backends."""
+
+
+class ObjectNotFoundError(StorageError):
+    """The requested key (or multipart upload) does not exist."""
+
+
+class InvalidRangeError(StorageError):
+    """The requested byte range cannot be satisfied."""
+
+
+@dataclass
+class StoredObject:
+    """An open, streaming read of a stored object (or a byte range of it)."""
+    body: AsyncIterator[bytes]
+    content_length: int
+    etag: str
+    content_range: Optional[str] = None
+
+
+def parse_byte_range(byte_range: str, total_size: int):
+    """
+    Resolve an HTTP Range value against an object size.
+    Returns the inclusive (start, end) offsets or raises InvalidRangeError.
+    """
+    match = RANGE_HEADER_PATTERN.match(byte_range.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        raise InvalidRangeError("Only a single byte range is supported")
+
+    first, last = match.group(1), match.group(2)
+    if first == "":
+        # Suffix range: the last N bytes
+        start = max(0, total_size - int(last))
+        end = total_size - 1
+    else:
+        start = int(first)
+        end = min(int(last), total_size - 1) if last else total_size - 1
+
+    if start >= total_size or start > end:
+        raise InvalidRangeError(f"Range {byte_range} not satisfiable for {total_size} bytes")
+    return start, end
+
+
+class StorageBackend(ABC):
+    """Object storage operations used by the application. All methods are coroutines."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> str:
+        """Store data under key and return its ETag."""
+
+    @abstractmethod
+    async def get_stream(self, key: str, byte_range: Optional[str] = None, if_none_match: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Optional[StoredObject]:
+        """
+        Open a streaming read. byte_range is an HTTP Range value; returns None if the
+        object's ETag equals if_none_match.
+        """
+
+    async def get_bytes(self, key: str) -> bytes:
+        """Read a whole object. Only for small objects; prefer get_stream."""
+        stored = await self.get_stream(key)
+        return b"".join([chunk async for chunk in stored.body])
+
+    @abstractmethod
+    async def copy(self, source_key: str, destination_key: str):
+        """Copy an object server-side without streaming it through the application."""
+
+    @abstractmethod
+    async def delete(self, key: str):
+        """Delete a single object. Missing keys are ignored."""
+
+    @abstractmethod
+    async def delete_many(self, keys: list) -> int:
+        """Delete many objects in as few calls as the backend allows. Returns the number of keys sent."""
+
+    @abstractmethod
+    async def presign(self, key: str, file_name: str, expires_in: int = 300) -> Optional[str]:
+        """Return a short-lived direct download URL, or None if the backend has none."""
+
+    @abstractmethod
+    async def create_multipart(self, key: str) -> str:
+        """Start a multipart upload and return its id."""
+
+    @abstractmethod
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Store one part and return its ETag."""
+
+    @abstractmethod
+    async def list_parts(self, key: str, upload_id: str) -> list:
+        """List received parts as dicts with PartNumber, ETag and Size, ordered by part number."""
+
+    @abstractmethod
+    async def complete_multipart(self, key: str, upload_id: str, parts: list):
+        """Assemble the given parts into the final object."""
+
+    @abstractmethod
+    async def abort_multipart(self, key: str, upload_id: str):
+        """Discard a multipart upload. Unknown uploads are ignored."""
+
+    async def close(self):
+        """Release pooled connections."""
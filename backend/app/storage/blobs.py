@@ -0,0 +1,118 @@
+"""Content-addressed blob registry: one stored object per distinct SHA-256, reference counted by ChapterFiles."""
+
+import uuid
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.blobs import Blobs
+from app.models.chapter_files import ChapterFiles
+from app.search.services.inverted_index import remove_index
+
+
+def blob_key(content_hash: str) -> str:
+    return f"blobs/{content_hash[:2]}/{content_hash}"
+
+
+def temp_upload_key() -> str:
+    """Staging key for an upload whose hash is not known yet."""
+    return f"uploads/tmp/{uuid.uuid4()}"
+
+
+def acquire_blob(db: Session, content_hash: str, file_size: int):
+    """
+    Take a reference on the blob with this hash, registering it if it is new.
+    Returns (blob, is_new). When is_new the caller must copy the staged upload to
+    blob.storage_key before committing. Commits nothing itself; the insert runs in a
+    savepoint, so losing the race against a concurrent upload of the same content only
+    rolls that back, and the reference is then taken on the blob the other upload registered.
+    The blob row stays locked until the caller commits, so commit before slow work.
+    """
+    for _ in range(2):
+        blob = db.query(Blobs).filter(Blobs.content_hash == content_hash).with_for_update().first()
+        if blob is not None:
+            blob.ref_count = Blobs.ref_count + 1  # type: ignore
+            db.flush()
+            return blob, False
+
+        blob = Blobs(
+            content_hash=content_hash,
+            storage_key=blob_key(content_hash),
+            file_size=file_size,
+            ref_count=1
+        )
+        try:
+            with db.begin_nested():
+                db.add(blob)
+            return blob, True
+        except IntegrityError:
+            # Registered by a concurrent upload; take a reference on that one instead
+            continue
+    raise RuntimeError(f"Could not acquire blob {content_hash}")
+
+
+def adopt_blob(db: Session, content_hash: str, storage_key: str, file_size: int):
+    """
+    Register an object uploaded before content addressing existed, keeping its key.
+    Returns (blob, is_new) like acquire_blob; when not new, the caller's copy is redundant.
+    """
+    blob = db.query(Blobs).filter(Blobs.content_hash == content_hash).with_for_update().first()
+    if blob is not None:
+        blob.ref_count = Blobs.ref_count + 1  # type: ignore
+        db.flush()
+        return blob, False
+
+    blob = Blobs(content_hash=content_hash, storage_key=storage_key, file_size=file_size, ref_count=1)
+    db.add(blob)
+    db.flush()
+    return blob, True
+
+
+def release_blob(db: Session, content_hash: str):
+    """
+    Drop one reference. When it was the last one, remove the blob row and every derived
+    artifact and return the storage key to delete once the transaction commits; otherwise None.
+    """
+    storage_keys = release_blobs(db, {content_hash: 1})
+    return storage_keys[0] if storage_keys else None
+
+
+def release_blobs(db: Session, reference_counts: dict) -> list:
+    """
+    Drop many references at once, given as {content_hash: references_dropped}. The blob rows
+    are locked in one query; returns the storage keys of blobs that lost their last reference.
+    """
+    if not reference_counts:
+        return []
+
+    blobs = db.query(Blobs).filter(
+        Blobs.content_hash.in_(list(reference_counts.keys()))
+    ).order_by(Blobs.content_hash).with_for_update().all()
+
+    storage_keys = []
+    for blob in blobs:
+        dropped = reference_counts[blob.content_hash]
+        if blob.ref_count > dropped:
+            blob.ref_count = Blobs.ref_count - dropped  # type: ignore
+            continue
+        storage_keys.append(str(blob.storage_key))
+        remove_index(db, str(blob.content_hash))
+        db.delete(blob)
+    db.flush()
+    return storage_keys
+
+
+def unreferenced_keys(db: Session, storage_keys: list) -> list:
+    """
+    The keys that no remaining ChapterFiles row points at; call it after deleting the rows and
+    before deleting their objects. Content-addressed keys are only ever handed out by
+    release_blobs, but files uploaded before content addressing were stored under their name,
+    so same-named uploads share one key.
+    """
+    legacy_keys = {key for key in storage_keys if not key.startswith("blobs/")}
+    referenced = set()
+    if legacy_keys:
+        referenced = {row.file_path for row in db.query(ChapterFiles.file_path).filter(
+            ChapterFiles.file_path.in_(legacy_keys)
+        ).distinct()}
+    return [key for key in dict.fromkeys(storage_keys) if key not in referenced]
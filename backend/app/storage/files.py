@@ -0,0 +1,143 @@
+"""File-level helpers on top of the storage backend: streamed uploads, downloads and text extraction."""
+
+import hashlib
+import tempfile
+from io import BytesIO
+
+import anyio.to_thread
+import PyPDF2
+import docx
+from fastapi import HTTPException
+
+from app.storage import get_storage
+
+
+# Multipart part size; S3 requires at least 5MB for every part but the last
+MULTIPART_PART_SIZE = 5 * 1024 * 1024
+
+PAGE_CHAR_TARGET = 3000  # pseudo-page size for formats without real pages
+
+
+class FileTooLargeError(Exception):
+    """Raised when a streamed upload exceeds its size limit."""
+
+
+async def upload_stream(read, file_key: str, max_size: int, part_size: int = MULTIPART_PART_SIZE):
+    """
+    Stream to storage in fixed-size parts, hashing as it goes. `read` is an async
+    read(n) callable such as UploadFile.read. At most two parts are held in memory.
+    Files that fit in one part use a single put, larger ones a multipart upload that is
+    aborted on any failure.
+    Raises FileTooLargeError as soon as more than max_size bytes have been read.
+    Returns (file_size, sha256 hex digest).
+    """
+    storage = get_storage()
+    sha256 = hashlib.sha256()
+    total_size = 0
+
+    async def read_part():
+        nonlocal total_size
+        chunk = await read(part_size)
+        total_size += len(chunk)
+        if total_size > max_size:
+            raise FileTooLargeError(f"File exceeds {max_size} bytes")
+        sha256.update(chunk)
+        return chunk
+
+    chunk = await read_part()
+    next_chunk = await read_part() if len(chunk) == part_size else b""
+
+    # Small file: one request
+    if not next_chunk:
+        await storage.put(file_key, chunk)
+        return total_size, sha256.hexdigest()
+
+    upload_id = await storage.create_multipart(file_key)
+    parts = []
+    try:
+        part_number = 1
+        while chunk:
+            etag = await storage.upload_part(file_key, upload_id, part_number, chunk)
+            parts.append({"PartNumber": part_number, "ETag": etag})
+            part_number += 1
+            chunk, next_chunk = next_chunk, (await read_part() if next_chunk else b"")
+
+        await storage.complete_multipart(file_key, upload_id, parts)
+    except BaseException:
+        await storage.abort_multipart(file_key, upload_id)
+        raise
+
+    return total_size, sha256.hexdigest()
+
+
+async def download_to_tempfile(file_key: str):
+    """
+    Copy a stored object into a spooled temporary file chunk by chunk, hashing as it goes.
+    Returns (file_obj positioned at 0, sha256 hex digest); the caller closes the file.
+    """
+    stored = await get_storage().get_stream(file_key, chunk_size=1024 * 1024)
+    sha256 = hashlib.sha256()
+    file_obj = tempfile.SpooledTemporaryFile(max_size=MULTIPART_PART_SIZE)
+    async for chunk in stored.body:
+        sha256.update(chunk)
+        file_obj.write(chunk)
+    file_obj.seek(0)
+    return file_obj, sha256.hexdigest()
+
+
+def _group_into_pages(blocks) -> list:
+    """Group text blocks (paragraphs or lines) into pages of roughly PAGE_CHAR_TARGET characters."""
+    pages = []
+    current = []
+    current_length = 0
+    for block in blocks:
+        if current and current_length + len(block) > PAGE_CHAR_TARGET:
+            pages.append("\n".join(current))
+            current = []
+            current_length = 0
+        current.append(block)
+        current_length += len(block) + 1
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
+def extract_pages_from_file(file_obj, filename: str) -> list:
+    """
+    Extract text page by page from a seekable file-like object. PDFs keep their real pages;
+    DOCX and TXT are split into pseudo-pages on paragraph/line boundaries.
+    Joining the pages with "\n" gives the full text.
+    """
+    if filename.lower().endswith(".pdf"):
+        reader = PyPDF2.PdfReader(file_obj)
+        return [page.extract_text() or "" for page in reader.pages]
+
+    elif filename.lower().endswith(".docx"):
+        document = docx.Document(file_obj)
+        return _group_into_pages(p.text for p in document.paragraphs if p.text.strip())
+
+    elif filename.lower().endswith(".txt"):
+        return _group_into_pages(file_obj.read().decode("utf-8").split("\n"))
+
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Unsupported file type"
+        )
+
+
+def extract_pages_from_bytes(file_bytes: bytes, filename: str) -> list:
+    return extract_pages_from_file(BytesIO(file_bytes), filename)
+
+
+def extract_text_from_bytes(file_bytes: bytes, filename: str) -> str:
+    return "\n".join(extract_pages_from_bytes(file_bytes, filename))
+
+
+async def read_pages(file_key: str, filename: str) -> list:
+    """Download a stored file to a temporary file and extract its pages off the event loop."""
+    file_obj, _ = await download_to_tempfile(file_key)
+    try:
+        return await anyio.to_thread.run_sync(extract_pages_from_file, file_obj, filename)
+    finally:
+        file_obj.close()
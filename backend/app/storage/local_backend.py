@@ -0,0 +1,164 @@
+"""Local filesystem storage backend for on-prem deployments and offline tests."""
+
+import asyncio
+import mmap
+import os
+import shutil
+import uuid
+from typing import Optional
+
+from app.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    ObjectNotFoundError,
+    StorageBackend,
+    StorageError,
+    StoredObject,
+    parse_byte_range,
+)
+
+MULTIPART_DIR = ".multipart"
+
+
+class LocalStorage(StorageBackend):
+    """
+    Objects are files under root_dir named by their key. Reads are served from an mmap of
+    the file, so streaming a range never copies more than one chunk at a time.
+    Multipart uploads keep one file per part until they are completed.
+    """
+
+    def __init__(self, root_dir: str):
+        self.root_dir = os.path.abspath(root_dir)
+        os.makedirs(self.root_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root_dir, key))
+        if not path.startswith(self.root_dir + os.sep):
+            raise StorageError(f"Invalid key: {key}")
+        return path
+
+    def _upload_dir(self, upload_id: str) -> str:
+        return self._path(f"{MULTIPART_DIR}/{uuid.UUID(upload_id)}")
+
+    @staticmethod
+    def _etag(path: str) -> str:
+        stat = os.stat(path)
+        return f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    async def put(self, key: str, data: bytes) -> str:
+        path = self._path(key)
+        await asyncio.to_thread(self._write_atomic, path, data)
+        return self._etag(path)
+
+    async def get_stream(self, key: str, byte_range: Optional[str] = None, if_none_match: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Optional[StoredObject]:
+        path = self._path(key)
+        if not os.path.isfile(path):
+            raise ObjectNotFoundError(key)
+
+        etag = self._etag(path)
+        if if_none_match and if_none_match == etag:
+            return None
+
+        total_size = os.path.getsize(path)
+        start, end = 0, total_size - 1
+        content_range = None
+        if byte_range:
+            start, end = parse_byte_range(byte_range, total_size)
+            content_range = f"bytes {start}-{end}/{total_size}"
+
+        async def iterate():
+            # mmap cannot map an empty file
+            if total_size == 0:
+                return
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                position = start
+                while position <= end:
+                    next_position = min(position + chunk_size, end + 1)
+                    yield mapped[position:next_position]
+                    position = next_position
+
+        return StoredObject(
+            body=iterate(),
+            content_length=max(0, end - start + 1),
+            etag=etag,
+            content_range=content_range
+        )
+
+    def _copy_atomic(self, source_path: str, destination_path: str):
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        tmp_path = f"{destination_path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, destination_path)
+
+    async def copy(self, source_key: str, destination_key: str):
+        source_path = self._path(source_key)
+        if not os.path.isfile(source_path):
+            raise ObjectNotFoundError(source_key)
+        await asyncio.to_thread(self._copy_atomic, source_path, self._path(destination_key))
+
+    async def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    async def delete_many(self, keys: list) -> int:
+        for key in keys:
+            await self.delete(key)
+        return len(keys)
+
+    async def presign(self, key: str, file_name: str, expires_in: int = 300) -> Optional[str]:
+        # No direct URLs; callers stream through the API instead
+        return None
+
+    async def create_multipart(self, key: str) -> str:
+        upload_id = str(uuid.uuid4())
+        upload_dir = self._upload_dir(upload_id)
+        os.makedirs(upload_dir)
+        with open(os.path.join(upload_dir, "key"), "w") as f:
+            f.write(key)
+        return upload_id
+
+    def _existing_upload_dir(self, upload_id: str) -> str:
+        upload_dir = self._upload_dir(upload_id)
+        if not os.path.isdir(upload_dir):
+            raise ObjectNotFoundError(upload_id)
+        return upload_dir
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        part_path = os.path.join(self._existing_upload_dir(upload_id), f"{part_number:05d}.part")
+        await asyncio.to_thread(self._write_atomic, part_path, data)
+        return self._etag(part_path)
+
+    async def list_parts(self, key: str, upload_id: str) -> list:
+        upload_dir = self._existing_upload_dir(upload_id)
+        parts = []
+        for name in sorted(os.listdir(upload_dir)):
+            if name.endswith(".part"):
+                part_path = os.path.join(upload_dir, name)
+                parts.append({"PartNumber": int(name[:-5]), "ETag": self._etag(part_path), "Size": os.path.getsize(part_path)})
+        return parts
+
+    def _assemble(self, upload_dir: str, path: str, parts: list):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as out:
+            for part in sorted(parts, key=lambda p: p["PartNumber"]):
+                with open(os.path.join(upload_dir, f"{part['PartNumber']:05d}.part"), "rb") as f:
+                    shutil.copyfileobj(f, out)
+        os.replace(tmp_path, path)
+        shutil.rmtree(upload_dir)
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: list):
+        upload_dir = self._existing_upload_dir(upload_id)
+        await asyncio.to_thread(self._assemble, upload_dir, self._path(key), parts)
+
+    async def abort_multipart(self, key: str, upload_id: str):
+        shutil.rmtree(self._upload_dir(upload_id), ignore_errors=True)
@@ -0,0 +1,206 @@
+"""Asynchronous S3 storage backend with a shared, size-limited connection pool."""
+
+import asyncio
+from contextlib import AsyncExitStack
+from typing import Optional
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.exceptions import ClientError
+
+from app.storage.base import (
+    DEFAULT_CHUNK_SIZE,
+    InvalidRangeError,
+    ObjectNotFoundError,
+    StorageBackend,
+    StorageError,
+    StoredObject,
+)
+
+# S3 DeleteObjects accepts at most 1000 keys per request
+DELETE_BATCH_SIZE = 1000
+
+
+def _error_code(error: ClientError) -> str:
+    return str(error.response.get("Error", {}).get("Code", ""))
+
+
+class S3Storage(StorageBackend):
+    """
+    One aiobotocore client per process, created on first use and shared by all requests.
+    max_pool_connections bounds the number of concurrent HTTP connections to S3.
+    """
+
+    def __init__(self, bucket: str, region: Optional[str] = None, access_key_id: Optional[str] = None, secret_access_key: Optional[str] = None, endpoint_url: Optional[str] = None, max_pool_connections: int = 50):
+        self.bucket = bucket
+        self._client_kwargs = {
+            "region_name": region,
+            "aws_access_key_id": access_key_id,
+            "aws_secret_access_key": secret_access_key,
+            "endpoint_url": endpoint_url,
+            "config": AioConfig(max_pool_connections=max_pool_connections),
+        }
+        self._client = None
+        self._exit_stack = None
+        self._lock = asyncio.Lock()
+
+    async def _get_client(self):
+        if self._client is None:
+            async with self._lock:
+                if self._client is None:
+                    exit_stack = AsyncExitStack()
+                    self._client = await exit_stack.enter_async_context(
+                        get_session().create_client("s3", **self._client_kwargs)
+                    )
+                    self._exit_stack = exit_stack
+        return self._client
+
+    async def close(self):
+        if self._exit_stack is not None:
+            await self._exit_stack.aclose()
+            self._client = None
+            self._exit_stack = None
+
+    async def put(self, key: str, data: bytes) -> str:
+        client = await self._get_client()
+        try:
+            response = await client.put_object(Bucket=self.bucket, Key=key, Body=data)
+            return response["ETag"]
+        except ClientError as e:
+            raise StorageError(f"Failed to upload {key}: {str(e)}") from e
+
+    async def get_stream(self, key: str, byte_range: Optional[str] = None, if_none_match: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Optional[StoredObject]:
+        client = await self._get_client()
+        params = {"Bucket": self.bucket, "Key": key}
+        if byte_range:
+            params["Range"] = byte_range
+        if if_none_match:
+            params["IfNoneMatch"] = if_none_match
+
+        try:
+            response = await client.get_object(**params)
+        except ClientError as e:
+            code = _error_code(e)
+            if code in ("304", "NotModified"):
+                return None
+            if code in ("416", "InvalidRange"):
+                raise InvalidRangeError(f"Range {byte_range} not satisfiable") from e
+            if code in ("404", "NoSuchKey"):
+                raise ObjectNotFoundError(key) from e
+            raise StorageError(f"Failed to read {key}: {str(e)}") from e
+
+        body = response["Body"]
+
+        async def iterate():
+            try:
+                while True:
+                    chunk = await body.read(chunk_size)
+                    if not chunk:
+                        break
+                    yield chunk
+            finally:
+                body.close()
+
+        return StoredObject(
+            body=iterate(),
+            content_length=response["ContentLength"],
+            etag=response["ETag"],
+            content_range=response.get("ContentRange")
+        )
+
+    async def copy(self, source_key: str, destination_key: str):
+        client = await self._get_client()
+        try:
+            await client.copy_object(Bucket=self.bucket, Key=destination_key, CopySource={"Bucket": self.bucket, "Key": source_key})
+        except ClientError as e:
+            if _error_code(e) in ("404", "NoSuchKey"):
+                raise ObjectNotFoundError(source_key) from e
+            raise StorageError(f"Failed to copy {source_key}: {str(e)}") from e
+
+    async def delete(self, key: str):
+        client = await self._get_client()
+        try:
+            await client.delete_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            raise StorageError(f"Failed to delete {key}: {str(e)}") from e
+
+    async def delete_many(self, keys: list) -> int:
+        client = await self._get_client()
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            try:
+                response = await client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True}
+                )
+            except ClientError as e:
+                raise StorageError(f"Failed to delete objects: {str(e)}") from e
+            errors = response.get("Errors", [])
+            if errors:
+                raise StorageError(f"Failed to delete {len(errors)} objects, first: {errors[0].get('Key')} ({errors[0].get('Code')})")
+        return len(keys)
+
+    async def presign(self, key: str, file_name: str, expires_in: int = 300) -> Optional[str]:
+        client = await self._get_client()
+        return await client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ResponseContentDisposition": f'inline; filename="{file_name}"'
+            },
+            ExpiresIn=expires_in
+        )
+
+    async def create_multipart(self, key: str) -> str:
+        client = await self._get_client()
+        try:
+            response = await client.create_multipart_upload(Bucket=self.bucket, Key=key)
+            return response["UploadId"]
+        except ClientError as e:
+            raise StorageError(f"Failed to start upload of {key}: {str(e)}") from e
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        client = await self._get_client()
+        try:
+            response = await client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data)
+            return response["ETag"]
+        except ClientError as e:
+            if _error_code(e) == "NoSuchUpload":
+                raise ObjectNotFoundError(upload_id) from e
+            raise StorageError(f"Failed to upload part {part_number} of {key}: {str(e)}") from e
+
+    async def list_parts(self, key: str, upload_id: str) -> list:
+        client = await self._get_client()
+        parts = []
+        try:
+            paginator = client.get_paginator("list_parts")
+            async for page in paginator.paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+                for part in page.get("Parts", []):
+                    parts.append({"PartNumber": part["PartNumber"], "ETag": part["ETag"], "Size": part["Size"]})
+        except ClientError as e:
+            if _error_code(e) == "NoSuchUpload":
+                raise ObjectNotFoundError(upload_id) from e
+            raise StorageError(f"Failed to list parts of {key}: {str(e)}") from e
+        return parts
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: list):
+        client = await self._get_client()
+        try:
+            await client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": [{"PartNumber": p["PartNumber"], "ETag": p["ETag"]} for p in parts]}
+            )
+        except ClientError as e:
+            raise StorageError(f"Failed to complete upload of {key}: {str(e)}") from e
+
+    async def abort_multipart(self, key: str, upload_id: str):
+        client = await self._get_client()
+        try:
+            await client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+        except ClientError as e:
+            # Already aborted or completed
+            if _error_code(e) != "NoSuchUpload":
+                raise StorageError(f"Failed to abort upload of {key}: {str(e)}") from e
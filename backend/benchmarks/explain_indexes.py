@@ -0,0 +1,178 @@
+"""
+EXPLAIN check: the insights and recommendation queries must read the activity history through
+indexes, never by scanning a whole history or rollup table.
+
+Inside one transaction that is rolled back at the end, the script seeds a synthetic history
+(many users, so that one user's rows are a small fraction of each table) and ANALYZEs it. It
+then runs the app's own query functions for one seeded user, captures every statement they
+send, and EXPLAINs each one. It fails if any plan has a sequential scan on learning_sessions,
+mcq_attempts or a rollup table, and lists the indexes the plans use. Nothing is left in the
+database.
+
+PostgreSQL only. Run from backend/ against a database migrated to head (alembic upgrade head):
+    python -m benchmarks.explain_indexes [--users N] [--sessions-per-chapter N] [--attempts-per-chapter N]
+"""
+
+import argparse
+import asyncio
+import json
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_engine
+from app.ml.service.recommendation_service import _fetch_latest_data_from_db
+from app.insights.services.dashboard import get_dashboard
+from app.insights.services.event_ingestion import _seen_event_ids
+from app.insights.services.activity_rollups import rebuild_activity_rollups, rebuild_daily_rollups
+from app.insights.routes.activity_insights import activity_time_insights
+from app.insights.routes.total_time_insights import total_time_insights
+from app.insights.routes.mcq_insights import mcq_attempts_insights
+from app.insights.routes.timeseries_insights import activity_timeseries, mcq_timeseries
+
+# Tables that grow with activity history; a sequential scan on any of them fails the check
+HISTORY_TABLES = {"learning_sessions", "mcq_attempts", "activity_rollups", "daily_activity_rollups", "daily_mcq_rollups"}
+
+PREFIX = "explain-check-"
+
+SEED_SQL = [
+    """
+    INSERT INTO users (email, username, first_name, last_name, phone_number, active_status, hashed_password)
+    SELECT :prefix || g || '@example.invalid', :prefix || g, 'Explain', 'Check', '0', true, 'x'
+    FROM generate_series(1, :users) g
+    """,
+    """
+    INSERT INTO courses (title, description, owner_id)
+    SELECT :prefix || u.id || '-' || c, NULL, u.id
+    FROM users u, generate_series(1, :courses) c
+    WHERE u.username LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO chapters (chapter_title, chapter_description, course_id, owner_id)
+    SELECT 'Chapter ' || n, NULL, co.id, co.owner_id
+    FROM courses co, generate_series(1, :chapters) n
+    WHERE co.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO learning_sessions (owner_id, course_id, chapter_id, activity_type, session_start, session_end,
+                                   duration_seconds, is_valid, updated_at, client_event_id)
+    SELECT ch.owner_id, ch.course_id, ch.id,
+           (ARRAY['view_content', 'summary', 'ask_question', 'mcq'])[1 + n % 4],
+           now() - make_interval(hours => n * 7) - interval '10 minutes',
+           now() - make_interval(hours => n * 7),
+           600, n % 10 <> 0, now(), md5(ch.id || '-' || n)
+    FROM chapters ch JOIN courses co ON co.id = ch.course_id, generate_series(1, :sessions) n
+    WHERE co.title LIKE :prefix || '%'
+    """,
+    """
+    INSERT INTO mcq_attempts (owner_id, course_id, chapter_id, total_questions, correct_answers, score_percentage,
+                              time_spent_seconds, attempted_at, client_event_id)
+    SELECT ch.owner_id, ch.course_id, ch.id, 10, n % 11, (n % 11) * 10.0, 300,
+           now() - make_interval(hours => n * 13), md5('mcq-' || ch.id || '-' || n)
+    FROM chapters ch JOIN courses co ON co.id = ch.course_id, generate_series(1, :attempts) n
+    WHERE co.title LIKE :prefix || '%'
+    """,
+]
+
+
+def _plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def checks(owner_id: int, course_id: int) -> list:
+    """ (name, function running the app's queries for one user on a session) """
+    user = {"id": owner_id, "username": f"{PREFIX}{owner_id}"}
+    events = [{"event_id": f"{PREFIX}{n}"} for n in range(20)]
+    return [
+        ("recommendation data", lambda db: _fetch_latest_data_from_db(db, owner_id, course_id)),
+        ("dashboard", lambda db: get_dashboard(db, owner_id, course_id, include_recommendations=False)),
+        ("activity insights", lambda db: activity_time_insights(db, user, course_id, "summary")),
+        ("total time insights", lambda db: total_time_insights(db, user)),
+        ("MCQ insights", lambda db: mcq_attempts_insights(db, user, course_id)),
+        ("activity timeseries", lambda db: activity_timeseries(db, user, None, None, "day", course_id)),
+        ("MCQ timeseries", lambda db: mcq_timeseries(db, user, None, None, "day", course_id)),
+        ("event id dedupe", lambda db: db.run_sync(_seen_event_ids, owner_id, events)),
+        ("rollup rebuild (one user)", lambda db: db.run_sync(rebuild_activity_rollups, owner_id)),
+        ("daily rollup rebuild (one user)", lambda db: db.run_sync(rebuild_daily_rollups, owner_id)),
+    ]
+
+
+async def run(args) -> bool:
+    if async_engine.dialect.name != "postgresql":
+        raise SystemExit("The EXPLAIN check supports PostgreSQL only")
+
+    async with async_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            params = {"prefix": PREFIX, "users": args.users, "courses": 2, "chapters": 10,
+                      "sessions": args.sessions_per_chapter, "attempts": args.attempts_per_chapter}
+            for sql in SEED_SQL:
+                await conn.execute(text(sql), params)
+
+            # Sessions commit through a savepoint, so the rebuilds' commits stay inside the transaction
+            db = AsyncSession(bind=conn, join_transaction_mode="create_savepoint", expire_on_commit=False)
+            await db.run_sync(rebuild_activity_rollups)
+            await db.run_sync(rebuild_daily_rollups)
+            for table in HISTORY_TABLES | {"users", "courses", "chapters"}:
+                await conn.execute(text(f"ANALYZE {table}"))
+
+            owner_id, course_id = (await conn.execute(text(
+                "SELECT co.owner_id, co.id FROM courses co WHERE co.title LIKE :prefix || '%' ORDER BY co.id LIMIT 1"
+            ), params)).one()
+            sessions = await conn.scalar(text("SELECT count(*) FROM learning_sessions"))
+            attempts = await conn.scalar(text("SELECT count(*) FROM mcq_attempts"))
+            print(f"{sessions} learning sessions, {attempts} MCQ attempts; checking user {owner_id}, course {course_id}\n")
+
+            captured = []
+
+            def capture(connection, cursor, statement, parameters, context, executemany):
+                captured.append((statement, parameters))
+
+            passed = True
+            print(f"{'query':<34}{'statements':>11}  result  indexes used")
+            for name, query in checks(owner_id, course_id):
+                captured.clear()
+                event.listen(conn.sync_connection, "before_cursor_execute", capture)
+                try:
+                    await query(db)
+                finally:
+                    event.remove(conn.sync_connection, "before_cursor_execute", capture)
+
+                indexes, scanned = set(), set()
+                statements = [(s, p) for s, p in captured if s.lstrip().split(None, 1)[0].upper() in ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")]
+                for statement, parameters in statements:
+                    plan = (await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)).scalar()
+                    plan = json.loads(plan) if isinstance(plan, str) else plan
+                    for node in _plan_nodes(plan[0]["Plan"]):
+                        if "Index Name" in node:
+                            indexes.add(node["Index Name"])
+                        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in HISTORY_TABLES:
+                            scanned.add(node["Relation Name"])
+
+                result = "ok" if not scanned else "FAIL"
+                passed = passed and not scanned
+                print(f"{name:<34}{len(statements):>11}  {result:<6}  {', '.join(sorted(indexes)) or '-'}")
+                if scanned:
+                    print(f"{'':<47}sequential scan on {', '.join(sorted(scanned))}")
+            await db.close()
+        finally:
+            await transaction.rollback()
+    await async_engine.dispose()
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000, help="seeded users, each with 2 courses of 10 chapters")
+    parser.add_argument("--sessions-per-chapter", type=int, default=15)
+    parser.add_argument("--attempts-per-chapter", type=int, default=4)
+    args = parser.parse_args()
+
+    if not asyncio.run(run(args)):
+        raise SystemExit("Some queries scan a history table; see above")
+
+
+if __name__ == "__main__":
+    main()
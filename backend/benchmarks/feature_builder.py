@@ -0,0 +1,84 @@
+"""
+Recommendation feature building: pandas (_build_features) vs NumPy (_build_feature_arrays).
+
+First checks parity: for every course size, both builders must give the same values for each
+record column and the same FEATURE_COLUMNS matrix, and the same recommendations for the same
+predicted states. Then times, per course size, building the feature matrix from the query rows,
+and the cost of importing pandas vs numpy in a fresh interpreter.
+
+Run from backend/ with the app's environment (.env), since the service module is imported:
+    python -m benchmarks.feature_builder [--chapters N ...] [--repeat N]
+"""
+
+import argparse
+import subprocess
+import sys
+import timeit
+
+import numpy as np
+
+from app.ml.service.recommendation_service import (
+    FEATURE_COLUMNS,
+    PRIORITY_MAP,
+    RECORD_COLUMNS,
+    _build_feature_arrays,
+    _build_features,
+    _build_recommendations,
+)
+from benchmarks.recommendation_postprocessing import course_data, rng
+
+
+def matrix_before(chapters_list, time_list, mcq_list):
+    return _build_features(chapters_list, time_list, mcq_list)[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+
+
+def matrix_after(chapters_list, time_list, mcq_list):
+    features = _build_feature_arrays(chapters_list, time_list, mcq_list)
+    return np.column_stack([features[name] for name in FEATURE_COLUMNS])
+
+
+def check_parity(rows) -> list:
+    """ Names of what differs between the two builders; empty when they agree. """
+    df = _build_features(*rows)
+    features = _build_feature_arrays(*rows)
+    differences = [name for name in RECORD_COLUMNS if df[name].tolist() != features[name].tolist()]
+    if not np.array_equal(matrix_before(*rows), matrix_after(*rows)):
+        differences.append("feature matrix")
+
+    predicted_states = np.array([rng.choice(list(PRIORITY_MAP)) for _ in range(len(df))])
+    pandas_features = {name: df[name].to_numpy() for name in RECORD_COLUMNS}
+    if _build_recommendations(pandas_features, predicted_states) != _build_recommendations(features, predicted_states):
+        differences.append("recommendations")
+    return differences
+
+
+def import_seconds(module: str) -> float:
+    """ Wall time of importing a module in a fresh interpreter, minus the interpreter's own startup. """
+    def run(code):
+        return min(timeit.repeat(lambda: subprocess.run([sys.executable, "-c", code], check=True), number=1, repeat=3))
+    return run(f"import {module}") - run("pass")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, nargs="+", default=[5, 50, 1000], help="chapters per course")
+    parser.add_argument("--repeat", type=int, default=20, help="builds per measurement (best of 5 is reported)")
+    args = parser.parse_args()
+
+    print(f"{'chapters':>10}{'pandas ms':>12}{'numpy ms':>12}{'speedup':>10}")
+    for chapters in args.chapters:
+        rows = course_data(chapters)
+
+        differences = check_parity(rows)
+        if differences:
+            raise SystemExit(f"Feature builders differ at {chapters} chapters: {', '.join(differences)}")
+
+        before = min(timeit.repeat(lambda: matrix_before(*rows), number=args.repeat, repeat=5)) / args.repeat * 1000
+        after = min(timeit.repeat(lambda: matrix_after(*rows), number=args.repeat, repeat=5)) / args.repeat * 1000
+        print(f"{chapters:>10}{before:>12.3f}{after:>12.3f}{before / after:>9.1f}x")
+
+    print(f"\nimport pandas: {import_seconds('pandas') * 1000:.0f} ms, import numpy: {import_seconds('numpy') * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Recommendation post-processing benchmark: everything after model.predict, for one course.
+
+  before: priority map and sort in pandas, then iterrows() building each record and message
+  after:  _build_recommendations (column-wise priorities, flags, order and activity texts,
+          records emitted in one pass)
+
+Predicted states are drawn at random, so no trained model is needed. Both paths are checked
+to return the same records before timing.
+
+Run from backend/ with the app's environment (.env), since the service module is imported:
+    python -m benchmarks.recommendation_postprocessing [--chapters N ...] [--repeat N]
+"""
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.ml.service.recommendation_service import (
+    PRIORITY_MAP,
+    RECORD_COLUMNS,
+    _build_features,
+    _build_recommendations,
+    _generate_recommendation_message,
+)
+
+rng = random.Random(42)
+
+
+def course_data(chapters: int):
+    """ Rows as _fetch_latest_data_from_db returns them; some chapters without activity or MCQs. """
+    now = datetime.now(timezone.utc)
+    chapters_list = [
+        {"chapter_id": n, "chapter_name": f"Chapter {n}", "course_id": 1, "user_id": 1}
+        for n in range(1, chapters + 1)
+    ]
+    time_list = [
+        {
+            "chapter_id": n, "user_id": 1,
+            "view_content": rng.choice([0, rng.randint(1, 20000)]),
+            "time_summary": rng.choice([0, rng.randint(1, 5000)]),
+            "time_ask": rng.choice([0, rng.randint(1, 5000)]),
+            "time_mcq": rng.choice([0, rng.randint(1, 8000)]),
+            "last_activity": now - timedelta(days=rng.randint(0, 90), seconds=rng.randint(0, 86399))
+        }
+        for n in range(1, chapters + 1) if rng.random() < 0.85
+    ]
+    mcq_list = [
+        {
+            "chapter_id": n, "user_id": 1,
+            "mcq_attempts": rng.randint(1, 30),
+            "mcq_avg_score": round(rng.uniform(20, 100), 2),
+            "last_mcq_attempt": now - timedelta(days=rng.randint(0, 90))
+        }
+        for n in range(1, chapters + 1) if rng.random() < 0.6
+    ]
+    return chapters_list, time_list, mcq_list
+
+
+def postprocess_before(df, predicted_states):
+    """ The iterrows implementation _build_recommendations replaced. """
+    df = df.copy()
+    df["predicted_state"] = predicted_states
+    df["priority"] = df["predicted_state"].map(PRIORITY_MAP)
+    recommendations = df.sort_values(by=["priority", "inactive_days"], ascending=[True, False])
+
+    df_scores = df[df["mcq_avg_score"] > 0]["mcq_avg_score"]
+    has_lower_score_chapters = len(df_scores[df_scores < 92]) > 0 if len(df_scores) > 0 else False
+
+    result = []
+    for _, row in recommendations.iterrows():
+        chapter_name = str(row["chapter_name"])
+        mcq_avg_score = float(row["mcq_avg_score"])
+        predicted_state = str(row["predicted_state"])
+        result.append({
+            "chapter_id": int(row["chapter_id"]),
+            "chapter_name": chapter_name,
+            "course_id": int(row["course_id"]),
+            "recommendation": _generate_recommendation_message(
+                chapter_name=chapter_name,
+                mcq_avg_score=mcq_avg_score,
+                total_time=int(row["total_time"]),
+                time_summary=int(row["time_summary"]),
+                time_ask=int(row["time_ask"]),
+                time_mcq=int(row["time_mcq"]),
+                view_content=int(row["view_content"]),
+                predicted_state=predicted_state,
+                has_lower_score_chapters=has_lower_score_chapters if mcq_avg_score > 92 else False
+            ),
+            "predicted_state": predicted_state,
+            "priority": int(row["priority"]),
+            "inactive_days": int(row["inactive_days"])
+        })
+    return result
+
+
+def postprocess_after(df, predicted_states):
+    features = {name: df[name].to_numpy() for name in RECORD_COLUMNS}
+    return _build_recommendations(features, predicted_states)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chapters", type=int, nargs="+", default=[100, 1000, 5000], help="chapters per course")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best of 5 is reported)")
+    args = parser.parse_args()
+
+    print(f"{'chapters':>10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for chapters in args.chapters:
+        df = _build_features(*course_data(chapters))
+        predicted_states = np.array([rng.choice(list(PRIORITY_MAP)) for _ in range(len(df))])
+
+        if postprocess_before(df, predicted_states) != postprocess_after(df, predicted_states):
+            raise SystemExit(f"Recommendations differ at {chapters} chapters")
+
+        before = min(timeit.repeat(lambda: postprocess_before(df, predicted_states), number=args.repeat, repeat=5)) / args.repeat * 1000
+        after = min(timeit.repeat(lambda: postprocess_after(df, predicted_states), number=args.repeat, repeat=5)) / args.repeat * 1000
+        print(f"{chapters:>10}{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Serialization micro-benchmark for the large JSON responses.
+
+Compares, per payload, what FastAPI does to render a response:
+  before: no response model, jsonable_encoder() then the stdlib JSONResponse
+  after:  validation into the route's response model, pydantic-core serialization, ORJSONResponse
+
+Run from backend/ with the app's environment (.env), since the route modules are imported:
+    python -m benchmarks.serialization [--repeat N]
+"""
+
+import argparse
+import random
+import string
+import timeit
+from datetime import datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.routes.chapter_file import FileContentResponse, FilePagesResponse, FileItem
+from app.routes.pagination import Page
+from app.rag.routes.create_mcq import MCQResponse
+from app.ml.route.recommendation import RecommendationsResponse
+from app.insights.routes.dashboard_insights import DashboardResponse
+
+rng = random.Random(42)
+
+
+def _text(length: int) -> str:
+    return "".join(rng.choice(string.ascii_letters + "      .,\n") for _ in range(length))
+
+
+def _question(number: int) -> dict:
+    return {
+        "question_number": number,
+        "question": _text(200),
+        "options": {letter: _text(120) for letter in "ABCD"},
+        "correct_answer": rng.choice("ABCD"),
+        "explanation": _text(400)
+    }
+
+
+def _recommendation(chapter_id: int) -> dict:
+    return {
+        "chapter_id": chapter_id,
+        "chapter_name": f"Chapter {chapter_id}",
+        "course_id": 1,
+        "recommendation": _text(300),
+        "predicted_state": rng.choice(["revise_urgent", "practice_more", "on_track", "mastered"]),
+        "priority": rng.randint(0, 3),
+        "inactive_days": rng.randint(0, 60)
+    }
+
+
+def _dashboard_chapter(chapter_id: int) -> dict:
+    seconds = [rng.randint(0, 20000) for _ in range(4)]
+    return {
+        "chapter_id": chapter_id,
+        "chapter_name": f"Chapter {chapter_id}",
+        "view_content_seconds": seconds[0],
+        "summary_seconds": seconds[1],
+        "ask_seconds": seconds[2],
+        "mcq_seconds": seconds[3],
+        "total_seconds": sum(seconds),
+        "mcq_attempts": rng.randint(0, 30),
+        "mcq_avg_score": round(rng.uniform(0, 100), 2),
+        "mcq_best_score": round(rng.uniform(0, 100), 2),
+        "last_mcq_attempt": datetime.now(timezone.utc).isoformat(),
+        "last_activity": datetime.now(timezone.utc).isoformat()
+    }
+
+
+def _file_item(file_id: int) -> dict:
+    return {
+        "id": file_id,
+        "file_name": f"notes-{file_id}.pdf",
+        "file_path": f"blobs/{file_id:064x}",
+        "file_type": "pdf",
+        "mime_type": "application/pdf",
+        "file_size": rng.randint(1000, 10_000_000),
+        "content_hash": f"{file_id:064x}",
+        "owner_id": 1,
+        "chapter_id": 1,
+        "course_id": 1,
+        "uploaded_at": datetime.now(timezone.utc)
+    }
+
+
+def payloads() -> list:
+    """ (name, response model, payload as the route returns it) """
+    questions = [_question(n) for n in range(1, 31)]
+    chapters = [_dashboard_chapter(n) for n in range(1, 301)]
+    recommendations = [_recommendation(n) for n in range(1, 301)]
+    return [
+        ("createMCQ (30 questions)", MCQResponse, {
+            "file_key": "blobs/abc",
+            "questions": [{k: q[k] for k in ("question_number", "question", "options")} for q in questions],
+            "full_questions": questions
+        }),
+        ("file content (2 MB)", FileContentResponse, {"file_id": 1, "file_name": "book.pdf", "content": _text(2_000_000)}),
+        ("file pages (50 x 8 KB)", FilePagesResponse, {
+            "file_id": 1, "file_name": "book.pdf", "page_count": 400, "start": 1,
+            "pages": [{"page_number": n, "content": _text(8000)} for n in range(1, 51)]
+        }),
+        ("recommendations (300)", RecommendationsResponse, {"recommendations": recommendations, "count": len(recommendations), "model_version": "3f2a9c1b7d4e"}),
+        ("dashboard (300 chapters)", DashboardResponse, {
+            "course_id": 1, "course_title": "Course", "chapters": chapters,
+            "totals": {key: 0 for key in ("view_content_seconds", "summary_seconds", "ask_seconds", "mcq_seconds", "total_seconds", "mcq_attempts")} | {"mcq_avg_score": 0.0},
+            "recommendations": recommendations, "recommendations_error": None, "model_version": "3f2a9c1b7d4e"
+        }),
+        ("file list page (200)", Page[FileItem], {"items": [_file_item(n) for n in range(1, 201)], "next_cursor": "eyJpZCI6IDIwMH0"}),
+    ]
+
+
+def render_before(payload) -> bytes:
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def render_after(adapter: TypeAdapter, payload) -> bytes:
+    return ORJSONResponse(adapter.dump_python(adapter.validate_python(payload), mode="json")).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="renders per measurement (best of 5 is reported)")
+    args = parser.parse_args()
+
+    print(f"{'payload':<28}{'size':>10}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, model, payload in payloads():
+        adapter = TypeAdapter(model)
+        size = len(render_after(adapter, payload))
+        before = min(timeit.repeat(lambda: render_before(payload), number=args.repeat, repeat=5)) / args.repeat * 1000
+        after = min(timeit.repeat(lambda: render_after(adapter, payload), number=args.repeat, repeat=5)) / args.repeat * 1000
+        print(f"{name:<28}{size / 1024:>8.0f}KB{before:>12.2f}{after:>12.2f}{before / after:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,8 @@ import { useParams, useNavigate } from 'react-router-dom';
 import NavBar from '../NavBar';
 import { chaptersAPI, coursesAPI, chapterFilesAPI } from '../../services/api';
 
+const HEARTBEAT_INTERVAL_MS = 30000; // Matches the server's HEARTBEAT_INTERVAL_SECONDS
+
 const Chapters = () => {
   const { courseId } = useParams();
   const navigate = useNavigate();
@@ -22,7 +24,7 @@ const Chapters = () => {
   const [editForm, setEditForm] = useState({ title: '', description: '' });
   const [showCreateForm, setShowCreateForm] = useState(false);
   const [uploadingChapterId, setUploadingChapterId] = useState(null);
-  const [viewingFileContent, setViewingFileContent] = useState(null); // { fileId, content, fileName, chapterId, startTime }
+  const [viewingFileContent, setViewingFileContent] = useState(null); // { fileId, content, fileName, chapterId }
   const [loadingFileContent, setLoadingFileContent] = useState(null); // fileId being loaded
   const [deletingFileId, setDeletingFileId] = useState(null); // fileId being deleted
   const viewingFileContentRef = useRef(null); // Ref to track viewing state for cleanup
@@ -37,31 +39,32 @@ const Chapters = () => {
     }
   }, [courseId]);
 
-  // Cleanup effect: Record time when component unmounts or user navigates away
+  // Viewing time is measured by the server from heartbeats sent while a file is open and visible
   useEffect(() => {
-    // Update ref whenever viewingFileContent changes
     viewingFileContentRef.current = viewingFileContent;
+    if (!viewingFileContent || !viewingFileContent.chapterId || !courseId) {
+      return undefined;
+    }
 
-    // Cleanup function runs when component unmounts or before navigation
-    return () => {
-      const currentViewing = viewingFileContentRef.current;
-      if (currentViewing && currentViewing.startTime && courseId) {
-        const durationSeconds = Math.floor((Date.now() - currentViewing.startTime) / 1000);
-        
-        // Record viewing duration if it's at least 1 second
-        if (durationSeconds > 0 && currentViewing.chapterId) {
-          // Use a fire-and-forget approach for cleanup
-          chapterFilesAPI.recordViewingDuration(
-            parseInt(courseId),
-            currentViewing.chapterId,
-            currentViewing.fileId,
-            durationSeconds
-          ).catch(err => {
-            // Silently fail - don't show error to user for tracking
-            console.error('Failed to record viewing duration on cleanup:', err);
-          });
-        }
+    const { chapterId, fileId } = viewingFileContent;
+    const sendHeartbeat = (ended = false) => {
+      chapterFilesAPI.heartbeat(parseInt(courseId), chapterId, fileId, ended).catch(err => {
+        // Silently fail - don't show error to user for tracking
+        console.error('Failed to send viewing heartbeat:', err);
+      });
+    };
+
+    sendHeartbeat();
+    const interval = setInterval(() => {
+      if (document.visibilityState === 'visible') {
+        sendHeartbeat();
       }
+    }, HEARTBEAT_INTERVAL_MS);
+
+    // Runs when the file is closed, another file is opened or the component unmounts
+    return () => {
+      clearInterval(interval);
+      sendHeartbeat(true);
     };
   }, [viewingFileContent, courseId]);
 
@@ -192,8 +195,7 @@ const Chapters = () => {
         fileId,
         fileName: response.file_name || fileName,
         content: response.content,
-        chapterId: chapterId,
-        startTime: Date.now() // Record when viewing started
+        chapterId: chapterId
       });
     } catch (err) {
       setError(err.response?.data?.detail || `Failed to load file content: ${err.message}`);
@@ -202,26 +204,7 @@ const Chapters = () => {
     }
   };
 
-  const closeFileContent = async () => {
-    if (viewingFileContent && viewingFileContent.startTime && courseId) {
-      // Calculate duration in seconds
-      const durationSeconds = Math.floor((Date.now() - viewingFileContent.startTime) / 1000);
-      
-      // Record viewing duration if it's at least 1 second
-      if (durationSeconds > 0 && viewingFileContent.chapterId) {
-        try {
-          await chapterFilesAPI.recordViewingDuration(
-            parseInt(courseId),
-            viewingFileContent.chapterId,
-            viewingFileContent.fileId,
-            durationSeconds
-          );
-        } catch (err) {
-          // Silently fail - don't show error to user for tracking
-          console.error('Failed to record viewing duration:', err);
-        }
-      }
-    }
+  const closeFileContent = () => {
     setViewingFileContent(null);
     viewingFileContentRef.current = null;
   };
@@ -1,7 +1,7 @@
 import { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import NavBar from '../NavBar';
-import { coursesAPI, insightsAPI, chaptersAPI } from '../../services/api';
+import { coursesAPI, insightsAPI } from '../../services/api';
 import {
   LineChart,
   Line,
@@ -64,73 +64,51 @@ const Insights = () => {
   const fetchCourseData = async (courseId) => {
     setError('');
     try {
-      // Fetch chapters
-      const chaptersData = await chaptersAPI.listByCourse(courseId);
-      setChapters(Array.isArray(chaptersData) ? chaptersData : []);
-
-      // Fetch activity time data
-      const [viewContent, summary, ask, mcq] = await Promise.all([
-        insightsAPI.getActivityTimeByChapter(courseId, 'view_content'),
-        insightsAPI.getActivityTimeByChapter(courseId, 'summary'),
-        insightsAPI.getActivityTimeByChapter(courseId, 'ask'),
-        insightsAPI.getActivityTimeByChapter(courseId, 'mcq')
-      ]);
-
-      // Convert time from seconds to minutes
-      const convertToMinutes = (data) => {
-        return (data || []).map(item => ({
-          ...item,
-          time_spent_seconds: Math.round(item.time_spent_seconds / 60)
-        }));
-      };
-
-      setViewContentData(convertToMinutes(viewContent));
-      setSummaryData(convertToMinutes(summary));
-      setAskData(convertToMinutes(ask));
-      setMcqData(convertToMinutes(mcq));
-      
-
-      // Calculate total time per chapter (convert to minutes)
-      const chapterMap = new Map();
-      chaptersData.forEach(ch => {
-        chapterMap.set(ch.id, { chapter_id: ch.id, chapter_name: ch.chapter_title, total: 0 });
-      });
-
-      [...viewContent, ...summary, ...ask, ...mcq].forEach(item => {
-        if (chapterMap.has(item.chapter_id)) {
-          chapterMap.get(item.chapter_id).total += item.time_spent_seconds || 0;
-        }
-      });
-
-      // Convert total seconds to minutes
-      const totalTimeDataInMinutes = Array.from(chapterMap.values()).map(item => ({
-        ...item,
-        total: Math.round(item.total / 60)
+      // One request returns every chart's data for the course
+      const dashboard = await insightsAPI.getDashboard(courseId);
+      const chapterRows = dashboard.chapters || [];
+      setChapters(chapterRows);
+
+      // Per-activity series with time converted from seconds to minutes
+      const activitySeries = (key) => chapterRows.map(ch => ({
+        chapter_id: ch.chapter_id,
+        chapter_name: ch.chapter_name,
+        time_spent_seconds: Math.round(ch[key] / 60)
       }));
-      setTotalTimeData(totalTimeDataInMinutes);
-
-      // Fetch MCQ attempts
-      const mcqAttemptsData = await insightsAPI.getMCQAttempts(courseId);
-      setMcqAttempts(mcqAttemptsData || []);
 
-      // Calculate MCQ accuracy data from the API response
-      const accuracyData = (mcqAttemptsData || []).map(item => ({
+      setViewContentData(activitySeries('view_content_seconds'));
+      setSummaryData(activitySeries('summary_seconds'));
+      setAskData(activitySeries('ask_seconds'));
+      setMcqData(activitySeries('mcq_seconds'));
+
+      // Total time per chapter in minutes
+      setTotalTimeData(chapterRows.map(ch => ({
+        chapter_id: ch.chapter_id,
+        chapter_name: ch.chapter_name,
+        total: Math.round(ch.total_seconds / 60)
+      })));
+
+      // MCQ attempts and accuracy per chapter
+      const mcqAttemptsData = chapterRows.map(ch => ({
+        chapter_id: ch.chapter_id,
+        chapter_name: ch.chapter_name,
+        attempts: ch.mcq_attempts,
+        avg_score: ch.mcq_avg_score,
+        last_attempt: ch.last_mcq_attempt
+      }));
+      setMcqAttempts(mcqAttemptsData);
+      setMcqAccuracyData(mcqAttemptsData.map(item => ({
         chapter_id: item.chapter_id,
         chapter_name: item.chapter_name,
         attempts: item.attempts || 0,
         avgScore: item.avg_score || 0
-      }));
-
-      setMcqAccuracyData(accuracyData);
+      })));
 
-      // Fetch ML recommendations
-      try {
-        const recommendationsData = await insightsAPI.getRecommendations(courseId);
-        setRecommendations(recommendationsData.recommendations || []);
-      } catch (recErr) {
-        console.error('Failed to load recommendations:', recErr);
-        setRecommendations([]);
+      // ML recommendations
+      if (dashboard.recommendations_error) {
+        console.error('Failed to load recommendations:', dashboard.recommendations_error);
       }
+      setRecommendations(dashboard.recommendations || []);
     } catch (err) {
       setError(err.response?.data?.detail || 'Failed to load insights data');
     }
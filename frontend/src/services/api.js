@@ -16,6 +16,11 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    // Lets any backend worker keep our reads on the primary right after a write
+    const lastWrite = sessionStorage.getItem('lastWrite');
+    if (lastWrite) {
+      config.headers['X-Read-After'] = lastWrite;
+    }
     return config;
   },
   (error) => {
@@ -23,9 +28,15 @@ api.interceptors.request.use(
   }
 );
 
-// Handle token expiration
+// Remember the last write and handle token expiration
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const lastWrite = response.headers['x-last-write'];
+    if (lastWrite) {
+      sessionStorage.setItem('lastWrite', lastWrite);
+    }
+    return response;
+  },
   (error) => {
     if (error.response?.status === 401) {
       localStorage.removeItem('token');
@@ -36,6 +47,18 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints return pages of { items, next_cursor }; follow the cursors and return every item
+const listAll = async (url, params = {}) => {
+  const items = [];
+  let cursor;
+  do {
+    const response = await api.get(url, { params: { ...params, cursor } });
+    items.push(...response.data.items);
+    cursor = response.data.next_cursor;
+  } while (cursor);
+  return items;
+};
+
 export const authAPI = {
   login: async (email, password) => {
     const response = await api.post('/auth/login', { email, password });
@@ -49,9 +72,8 @@ export const authAPI = {
 };
 
 export const coursesAPI = {
-  list: async () => {
-    const response = await api.get('/courses/');
-    return response.data;
+  list: async (params) => {
+    return listAll('/courses/', params);
   },
   create: async (course) => {
     const response = await api.post('/courses/createCourse', course);
@@ -68,9 +90,8 @@ export const coursesAPI = {
 };
 
 export const chaptersAPI = {
-  listByCourse: async (courseId) => {
-    const response = await api.get(`/courses/${courseId}/chapter`);
-    return response.data;
+  listByCourse: async (courseId, params) => {
+    return listAll(`/courses/${courseId}/chapter`, params);
   },
   getById: async (courseId, chapterId) => {
     const response = await api.get(`/courses/${courseId}/chapter/${chapterId}`);
@@ -91,9 +112,8 @@ export const chaptersAPI = {
 };
 
 export const chapterFilesAPI = {
-  list: async (courseId, chapterId) => {
-    const response = await api.get(`/courses/${courseId}/chapter/${chapterId}/files/`);
-    return response.data;
+  list: async (courseId, chapterId, params) => {
+    return listAll(`/courses/${courseId}/chapter/${chapterId}/files/`, params);
   },
   upload: async (courseId, chapterId, file) => {
     const formData = new FormData();
@@ -120,6 +140,12 @@ export const chapterFilesAPI = {
     );
     return response.data;
   },
+  heartbeat: async (courseId, chapterId, fileId, ended = false) => {
+    await api.post(
+      `/courses/${courseId}/chapter/${chapterId}/files/${fileId}/heartbeat`,
+      { ended }
+    );
+  },
   delete: async (courseId, chapterId, fileId) => {
     const response = await api.delete(`/courses/${courseId}/chapter/${chapterId}/files/delete/${fileId}`);
     return response.data;
@@ -184,6 +210,13 @@ export const insightsAPI = {
       params: { course_id: courseId }
     });
     return response.data;
+  },
+  // Chapter-wise activity, MCQ stats, totals and recommendations in one request
+  getDashboard: async (courseId) => {
+    const response = await api.get('/insights/dashboard', {
+      params: { course_id: courseId }
+    });
+    return response.data;
   }
 };
 